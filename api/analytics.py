@@ -1,48 +1,41 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from typing import List, Dict
 from datetime import datetime, timedelta
 import random
 import math
+import threading
+import time
+
+import numpy as np
+
+from candle_store import candle_store, candles_to_records, rollup_candles, RESOLUTIONS
+from copy_trading import copy_trader, job_fill
+from indicators import indicator_engine
+from volume_rollup import volume_rollup, WINDOWS
+from token_index import token_index, SORT_FIELDS
 
 router = APIRouter()
 
+# Timeframe -> (candle resolution, number of candles)
+TIMEFRAMES = {
+    "1H": ("1m", 60),
+    "1D": ("1h", 24),
+    "1W": ("1d", 7),
+    "1M": ("1d", 30)
+}
+
 @router.get("/api/analytics/price/{symbol}")
 async def get_price_data(symbol: str, timeframe: str = "1D"):
     """Get price data for a token"""
+    check_symbol(symbol)
+    resolution, points = TIMEFRAMES.get(timeframe, TIMEFRAMES["1M"])
+    interval = RESOLUTIONS[resolution]
     
-    # Determine data points based on timeframe
-    if timeframe == "1H":
-        points = 60
-        interval_minutes = 1
-    elif timeframe == "1D":
-        points = 24
-        interval_minutes = 60
-    elif timeframe == "1W":
-        points = 7
-        interval_minutes = 24 * 60
-    else:  # 1M
-        points = 30
-        interval_minutes = 24 * 60
-    
-    # Generate mock price data
-    base_price = get_base_price(symbol)
-    price_data = []
+    ensure_price_history(symbol)
     
-    for i in range(points):
-        timestamp = datetime.now() - timedelta(minutes=(points - i) * interval_minutes)
-        
-        # Add some realistic price movement
-        volatility = 0.02 if symbol == "SOL" else 0.05
-        change = math.sin(i * 0.1) * volatility + random.uniform(-volatility/2, volatility/2)
-        price = base_price * (1 + change * (i / points))
-        
-        volume = random.uniform(10000000, 100000000)
-        
-        price_data.append({
-            "timestamp": timestamp.isoformat(),
-            "price": round(price, 4),
-            "volume": round(volume, 2)
-        })
+    now = int(time.time())
+    candles = candle_store.query(symbol, resolution, start=now - points * interval, limit=points)
+    price_data = candles_to_records(candles)
     
     return {
         "symbol": symbol,
@@ -52,112 +45,272 @@ async def get_price_data(symbol: str, timeframe: str = "1D"):
         "change_24h": ((price_data[-1]["price"] - price_data[0]["price"]) / price_data[0]["price"]) * 100
     }
 
+# Mock history length per resolution; coarser candles are rolled up from the minutes
+HISTORY_DAYS = 60
+BACKFILL = {"1m": 60 * 2, "1h": 24 * 30, "1d": HISTORY_DAYS}
+
+def check_symbol(symbol: str):
+    """Only tracked tokens get candle history, so arbitrary paths cannot allocate series"""
+    if symbol not in TRACKED_SYMBOLS:
+        raise HTTPException(404, f"Unknown symbol: {symbol}")
+
+def ensure_price_history(symbol: str):
+    """Backfill mock candle history for a tracked symbol the first time it is requested"""
+    with _seed_lock:
+        if candle_store.has_symbol(symbol) or symbol not in TRACKED_SYMBOLS:
+            return
+        seed_price_history(symbol)
+
+def seed_price_history(symbol: str):
+    """Generate the mock random-walk history; caller holds the seed lock"""
+    base_price = get_base_price(symbol)
+    volatility = 0.02 if symbol == "SOL" else 0.05  # Daily
+    now = int(time.time())
+    
+    # One minute-level random walk ending at the base price; every resolution is cut from it
+    start = now - now % 86400 - (HISTORY_DAYS - 1) * 86400
+    timestamps = np.arange(start, now - now % 60, 60, dtype=np.int64)
+    count = len(timestamps)
+    steps = np.random.normal(0, volatility / math.sqrt(1440), count)
+    close = base_price * np.exp(np.cumsum(steps) - steps.sum())
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(np.random.normal(0, volatility / 40, count)) * close
+    minutes = {
+        "timestamp": timestamps,
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": np.random.uniform(10000000, 100000000, count) / 1440
+    }
+    
+    for resolution, keep in BACKFILL.items():
+        candles = rollup_candles(minutes, RESOLUTIONS[resolution]) if resolution != "1m" else minutes
+        candle_store.backfill(symbol, resolution, {name: values[-keep:] for name, values in candles.items()},
+                              synthetic=True)
+
+_seed_lock = threading.Lock()
+
+# Seconds between mock ticks; reads never advance the candles themselves
+PRICE_TICK_INTERVAL = 5
+
+def tick_prices():
+    """Advance every tracked symbol's mock price by one random-walk step"""
+    for symbol in TRACKED_SYMBOLS:
+        ensure_price_history(symbol)
+        volatility = 0.02 if symbol == "SOL" else 0.05  # Daily
+        last = candle_store.query(symbol, "1m", limit=1)
+        step = random.gauss(0, volatility * math.sqrt(PRICE_TICK_INTERVAL / 86400))
+        volume = random.uniform(10000000, 100000000) * PRICE_TICK_INTERVAL / 86400
+        candle_store.add_tick(symbol, float(last["close"][-1]) * math.exp(step), volume)
+
+def start_price_feed():
+    """Produce mock ticks from a background thread so the rollups keep advancing"""
+    def run():
+        while True:
+            try:
+                tick_prices()
+            except Exception as e:
+                print(f"Price feed error: {e}")
+            time.sleep(PRICE_TICK_INTERVAL)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+@router.get("/api/analytics/indicators/{symbol}")
+async def get_indicators(symbol: str, timeframe: str = "1h", period: int = 14,
+                         std_dev: float = 2.0, history: bool = False, limit: int = 200):
+    """Get technical indicators (SMA, EMA, RSI, VWAP, Bollinger, volatility) for a token"""
+    if timeframe not in RESOLUTIONS:
+        raise HTTPException(400, f"Unsupported timeframe: {timeframe}")
+    if period < 2:
+        raise HTTPException(400, "Period must be at least 2")
+    if limit < 1:
+        raise HTTPException(400, "Limit must be positive")
+    check_symbol(symbol)
+    
+    ensure_price_history(symbol)
+    
+    response = {
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "period": period,
+        "indicators": indicator_engine.latest(symbol, timeframe, period, std_dev),
+        "updated_at": datetime.now().isoformat()
+    }
+    if history:
+        response["series"] = indicator_engine.series(symbol, timeframe, period, std_dev, limit)
+    return response
+
 @router.get("/api/analytics/market-stats")
 async def get_market_stats():
     """Get overall market statistics"""
+    ensure_token_index()
     
     tokens = ["SOL", "USDC", "RAY", "ORCA", "MNGO"]
     market_data = []
     
-    for token in tokens:
-        base_price = get_base_price(token)
-        change_24h = random.uniform(-15, 15)
-        volume_24h = random.uniform(5000000, 500000000)
-        
+    for symbol in tokens:
+        token = token_index.get(symbol)
         market_data.append({
-            "symbol": token,
-            "price": base_price,
-            "change_24h": round(change_24h, 2),
-            "volume_24h": round(volume_24h, 2),
-            "market_cap": round(base_price * get_supply(token), 2)
+            "symbol": symbol,
+            "price": token["price"],
+            "change_24h": round(token["change_24h"], 2),
+            "volume_24h": round(token["volume_24h"], 2),
+            "market_cap": round(token["market_cap"], 2)
         })
     
-    total_market_cap = sum(token["market_cap"] for token in market_data)
-    total_volume = sum(token["volume_24h"] for token in market_data)
-    
+    # Totals cover the tokens listed, not everything the index tracks
     return {
         "tokens": market_data,
-        "total_market_cap": total_market_cap,
-        "total_volume_24h": total_volume,
+        "total_market_cap": sum(token["market_cap"] for token in market_data),
+        "total_volume_24h": sum(token["volume_24h"] for token in market_data),
         "updated_at": datetime.now().isoformat()
     }
 
 @router.get("/api/analytics/volume")
 async def get_volume_analysis():
     """Get volume analysis data"""
+    ensure_volume_history()
     
-    # Generate 24 hours of volume data
-    volume_data = []
+    volume_data = volume_rollup.distribution(WINDOWS["24h"])
+    day = volume_rollup.summary(WINDOWS["24h"])
+    week = volume_rollup.summary(WINDOWS["7d"])
+    month = volume_rollup.summary(WINDOWS["30d"])
     
-    for i in range(24):
-        timestamp = datetime.now() - timedelta(hours=24-i)
+    return {
+        "volume_data": volume_data,
+        "total_volume_24h": day["total_volume"],
+        "total_trades_24h": day["total_trades"],
+        "avg_trade_size": day["avg_trade_size"],
+        "total_volume_7d": week["total_volume"],
+        "total_trades_7d": week["total_trades"],
+        "avg_hourly_volume_7d": week["avg_volume_per_bucket"],
+        "total_volume_30d": month["total_volume"],
+        "total_trades_30d": month["total_trades"],
+        "avg_hourly_volume_30d": month["avg_volume_per_bucket"]
+    }
+
+def record_trade_volume(job: dict):
+    """Count each confirmed copy-trade swap's USD value towards platform volume"""
+    fill = job_fill(job)
+    if fill is not None:
+        volume_rollup.add_trade(fill[4], job["updated_at"])
+
+copy_trader.subscribe(record_trade_volume)
+
+def ensure_volume_history():
+    """Backfill mock hourly volume buckets once so the rollup has history"""
+    global _volume_seeded
+    if _volume_seeded:
+        return
+    _volume_seeded = True
+    
+    now = int(time.time())
+    current = now - now % volume_rollup.bucket_seconds
+    for i in range(volume_rollup.capacity):
+        bucket_start = current - (volume_rollup.capacity - 1 - i) * volume_rollup.bucket_seconds
+        hour = (bucket_start // 3600) % 24
         
         # Simulate trading volume patterns (higher during certain hours)
         base_volume = 50000000
-        hour_multiplier = 1 + 0.5 * math.sin((i - 6) * math.pi / 12)  # Peak around noon UTC
+        hour_multiplier = 1 + 0.5 * math.sin((hour - 6) * math.pi / 12)  # Peak around noon UTC
         volume = base_volume * hour_multiplier * random.uniform(0.7, 1.3)
-        
-        volume_data.append({
-            "timestamp": timestamp.isoformat(),
-            "volume": round(volume, 2),
-            "trades": random.randint(1000, 5000)
-        })
-    
-    return {
-        "volume_data": volume_data,
-        "total_volume_24h": sum(v["volume"] for v in volume_data),
-        "total_trades_24h": sum(v["trades"] for v in volume_data),
-        "avg_trade_size": sum(v["volume"] for v in volume_data) / sum(v["trades"] for v in volume_data)
-    }
+        trades = random.randint(1000, 5000)
+        volume_rollup.load_bucket(bucket_start, volume, trades, volume / trades * 0.1, volume / trades * 10)
+
+_volume_seeded = False
 
 @router.get("/api/analytics/top-tokens")
-async def get_top_tokens(limit: int = 10):
-    """Get top tokens by market cap"""
-    
-    tokens = [
-        {"symbol": "SOL", "name": "Solana"},
-        {"symbol": "USDC", "name": "USD Coin"},
-        {"symbol": "RAY", "name": "Raydium"},
-        {"symbol": "ORCA", "name": "Orca"},
-        {"symbol": "MNGO", "name": "Mango"},
-        {"symbol": "SRM", "name": "Serum"},
-        {"symbol": "COPE", "name": "Cope"},
-        {"symbol": "STEP", "name": "Step Finance"},
-        {"symbol": "MEDIA", "name": "Media Network"},
-        {"symbol": "ROPE", "name": "Rope Token"}
-    ]
-    
-    top_tokens = []
+async def get_top_tokens(limit: int = 10, sort_by: str = "market_cap"):
+    """Get top tokens by market cap, volume or 24h change"""
+    if sort_by not in SORT_FIELDS:
+        raise HTTPException(400, f"Unsupported sort field: {sort_by}")
+    if limit < 1:
+        raise HTTPException(400, "Limit must be positive")
+    ensure_token_index()
     
-    for i, token in enumerate(tokens[:limit]):
-        price = get_base_price(token["symbol"])
-        supply = get_supply(token["symbol"])
-        market_cap = price * supply
-        change_24h = random.uniform(-20, 20)
-        volume_24h = random.uniform(1000000, 100000000)
-        
-        top_tokens.append({
-            "rank": i + 1,
+    top_tokens = [
+        {
+            "rank": token["rank"],
             "symbol": token["symbol"],
             "name": token["name"],
-            "price": price,
-            "market_cap": market_cap,
-            "change_24h": round(change_24h, 2),
-            "volume_24h": round(volume_24h, 2)
-        })
-    
-    # Sort by market cap
-    top_tokens.sort(key=lambda x: x["market_cap"], reverse=True)
-    
-    # Update ranks
-    for i, token in enumerate(top_tokens):
-        token["rank"] = i + 1
+            "price": token["price"],
+            "market_cap": token["market_cap"],
+            "change_24h": round(token["change_24h"], 2),
+            "volume_24h": round(token["volume_24h"], 2)
+        }
+        for token in token_index.top(limit, sort_by)
+    ]
     
     return {
         "tokens": top_tokens,
+        "total_tracked": len(token_index),
         "updated_at": datetime.now().isoformat()
     }
 
+@router.get("/api/analytics/rank/{symbol}")
+async def get_token_rank(symbol: str):
+    """Get a token's rank by market cap, volume and 24h change"""
+    ensure_token_index()
+    
+    token = token_index.get(symbol)
+    if token is None:
+        raise HTTPException(404, "Token not tracked")
+    
+    return {
+        "symbol": symbol,
+        "ranks": {field: token_index.rank(symbol, field) for field in SORT_FIELDS},
+        "total_tracked": len(token_index)
+    }
+
+TOKENS = [
+    {"symbol": "SOL", "name": "Solana"},
+    {"symbol": "USDC", "name": "USD Coin"},
+    {"symbol": "RAY", "name": "Raydium"},
+    {"symbol": "ORCA", "name": "Orca"},
+    {"symbol": "MNGO", "name": "Mango"},
+    {"symbol": "SRM", "name": "Serum"},
+    {"symbol": "COPE", "name": "Cope"},
+    {"symbol": "STEP", "name": "Step Finance"},
+    {"symbol": "MEDIA", "name": "Media Network"},
+    {"symbol": "ROPE", "name": "Rope Token"}
+]
+TRACKED_SYMBOLS = {token["symbol"] for token in TOKENS}
+
+def ensure_token_index():
+    """Seed the token index with the tracked tokens on first use; prices follow their candles"""
+    if len(token_index):
+        return
+    
+    for token in TOKENS:
+        token_index.update_token(
+            token["symbol"],
+            name=token["name"],
+            price=get_base_price(token["symbol"]),
+            supply=get_supply(token["symbol"])
+        )
+        ensure_price_history(token["symbol"])
+        refresh_token(token["symbol"])
+
+def refresh_token(symbol: str):
+    """Update a token's price, 24h change and 24h volume from its hourly candles"""
+    if token_index.get(symbol) is None:
+        return
+    candles = candle_store.query(symbol, "1h", start=int(time.time()) - 86400)
+    if not len(candles["close"]):
+        return
+    first_open, price = float(candles["open"][0]), float(candles["close"][-1])
+    token_index.update_token(
+        symbol,
+        price=price,
+        change_24h=(price - first_open) / first_open * 100 if first_open else 0.0,
+        volume_24h=float(candles["volume"].sum())
+    )
+
+candle_store.subscribe(refresh_token)
+
 def get_base_price(symbol: str) -> float:
     """Get base price for a token symbol"""
     prices = {
@@ -188,4 +341,6 @@ def get_supply(symbol: str) -> float:
         "MEDIA": 100000000,
         "ROPE": 1000000000000
     }
-    return supplies.get(symbol, 1000000)
\ No newline at end of file
+    return supplies.get(symbol, 1000000)
+
+start_price_feed()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Historical balance reconstruction
+Walks a wallet's signatures newest to oldest, undoes each transaction's
+lamport and token balance deltas from the current holdings, and writes the
+per-mint timeline plus valued series into the portfolio history store
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from portfolio_history import PortfolioHistoryStore, history_store
+from solana_rpc_cache import rpc_cache, TOKEN_2022_PROGRAM_ID, TOKEN_PROGRAM_ID
+
+CHECKPOINT_DIR = os.getenv("RECONSTRUCTION_CHECKPOINT_DIR", "reconstruction_checkpoints")
+SIGNATURE_PAGE = 1000         # Signatures fetched per page (RPC maximum)
+RPC_CONCURRENCY = 8           # Concurrent getTransaction calls across all wallets
+WALLET_CONCURRENCY = 4        # Wallets reconstructed in parallel
+TX_ATTEMPTS = 4               # getTransaction tries before a page is abandoned
+TX_RETRY_DELAY = 1.0          # Seconds before the first retry, doubling after
+SOL_MINT = "So11111111111111111111111111111111111111112"
+NATIVE_SOL = "native"         # Lamports on the wallet itself; wrapped SOL stays under SOL_MINT
+
+RpcCall = Callable[[str, List], Dict]
+
+_rpc_slots = threading.BoundedSemaphore(RPC_CONCURRENCY)
+
+
+def default_rpc(method: str, params: List) -> Dict:
+    """Uncached RPC call bounded by the shared concurrency limit"""
+    with _rpc_slots:
+        return rpc_cache.call(method, params, cache_ttl=0)
+
+
+def transaction_deltas(tx: Dict, wallet: str) -> Tuple[Optional[int], Dict[str, int], Dict[str, int]]:
+    """Return (block_time, {mint: raw delta}, {mint: decimals}) for the wallet in one transaction"""
+    meta = tx.get("meta") or {}
+    deltas: Dict[str, int] = {}
+    decimals: Dict[str, int] = {}
+
+    keys = tx["transaction"]["message"]["accountKeys"]
+    keys = [k["pubkey"] if isinstance(k, dict) else k for k in keys]
+    if wallet in keys:
+        i = keys.index(wallet)
+        lamports = meta["postBalances"][i] - meta["preBalances"][i]
+        if lamports:
+            deltas[NATIVE_SOL] = lamports
+            decimals[NATIVE_SOL] = 9
+
+    for sign, field in ((-1, "preTokenBalances"), (1, "postTokenBalances")):
+        for balance in meta.get(field) or []:
+            if balance.get("owner") != wallet:
+                continue
+            mint = balance["mint"]
+            amount = balance["uiTokenAmount"]
+            deltas[mint] = deltas.get(mint, 0) + sign * int(amount["amount"])
+            decimals[mint] = int(amount["decimals"])
+
+    return tx.get("blockTime"), {m: d for m, d in deltas.items() if d}, decimals
+
+
+class ReconstructionJob:
+    """Checkpointed reconstruction of one wallet's balance history"""
+
+    def __init__(self, wallet: str, rpc: RpcCall = default_rpc, store: PortfolioHistoryStore = history_store,
+                 checkpoint_dir: str = CHECKPOINT_DIR, pool: Optional[ThreadPoolExecutor] = None):
+        self.wallet = wallet
+        self.rpc = rpc
+        self.store = store
+        self.pool = pool
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.checkpoint_path = os.path.join(checkpoint_dir, f"{wallet}.json")
+        self.timeline_path = os.path.join(checkpoint_dir, f"{wallet}.timeline.csv")
+
+    def _load_checkpoint(self) -> Optional[Dict]:
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, "r") as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, state: Dict):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    def _initial_state(self) -> Dict:
+        """Current holdings across both token programs, plus native lamports"""
+        from portfolio_valuation import holdings_from_token_accounts
+
+        balances: Dict[str, int] = {}
+        decimals: Dict[str, int] = {}
+        # postTokenBalances cover Token-2022 accounts too, so the opening holdings must as well
+        for program in (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID):
+            result = self.rpc("getTokenAccountsByOwner", [self.wallet, {"programId": program},
+                                                          {"encoding": "jsonParsed"}])
+            for mint, amount, decimal in zip(*holdings_from_token_accounts(result["result"]["value"])):
+                balances[mint] = balances.get(mint, 0) + amount
+                decimals[mint] = decimal
+        balances[NATIVE_SOL] = int(self.rpc("getBalance", [self.wallet])["result"]["value"])
+        decimals[NATIVE_SOL] = 9
+        return {
+            "before": None,
+            "balances": {m: str(a) for m, a in balances.items()},
+            "decimals": decimals,
+            "timeline_bytes": 0,
+            "transactions": 0,
+            "done": False
+        }
+
+    def _fetch_transactions(self, signatures: List[str]) -> List[Dict]:
+        def fetch(sig: str) -> Dict:
+            # A skipped transaction would shift every earlier balance, so a gap fails the page
+            for attempt in range(TX_ATTEMPTS):
+                result = self.rpc("getTransaction", [sig, {
+                    "encoding": "jsonParsed",
+                    "maxSupportedTransactionVersion": 0
+                }]).get("result")
+                if result is not None:
+                    return result
+                if attempt + 1 < TX_ATTEMPTS:
+                    time.sleep(TX_RETRY_DELAY * 2 ** attempt)
+            raise RuntimeError(f"Transaction {sig} unavailable after {TX_ATTEMPTS} attempts")
+
+        if self.pool is not None:
+            return list(self.pool.map(fetch, signatures))
+        with ThreadPoolExecutor(max_workers=RPC_CONCURRENCY) as pool:
+            return list(pool.map(fetch, signatures))
+
+    def run(self) -> Dict:
+        """Process remaining signature pages, checkpointing after each page"""
+        state = self._load_checkpoint() or self._initial_state()
+        if state["done"]:
+            return state
+
+        # Drop timeline rows written after the last checkpoint
+        with open(self.timeline_path, "a+b") as f:
+            f.truncate(state["timeline_bytes"])
+
+        while True:
+            options = {"limit": SIGNATURE_PAGE}
+            if state["before"]:
+                options["before"] = state["before"]
+            page = self.rpc("getSignaturesForAddress", [self.wallet, options]).get("result") or []
+            if not page:
+                break
+
+            signatures = [entry["signature"] for entry in page]
+            transactions = self._fetch_transactions(signatures)
+            balances = {m: int(a) for m, a in state["balances"].items()}
+            rows = []
+
+            for entry, tx in zip(page, transactions):
+                block_time, deltas, decimals = transaction_deltas(tx, self.wallet)
+                block_time = block_time or entry.get("blockTime")
+                if not deltas or block_time is None:
+                    continue
+                state["decimals"].update(decimals)
+                # Record balances and value after this transaction, then step back to before it
+                for mint in deltas:
+                    rows.append(f"{block_time},{mint},{balances.get(mint, 0)}\n")
+                rows.append(f"{block_time},*,{self._value(balances, state['decimals'])}\n")
+                for mint, delta in deltas.items():
+                    balances[mint] = balances.get(mint, 0) - delta
+
+            with open(self.timeline_path, "ab") as f:
+                f.write("".join(rows).encode())
+                f.flush()
+                os.fsync(f.fileno())
+                state["timeline_bytes"] = f.tell()
+
+            state["balances"] = {m: str(a) for m, a in balances.items()}
+            state["before"] = signatures[-1]
+            state["transactions"] += len(signatures)
+            self._save_checkpoint(state)
+
+            if len(page) < SIGNATURE_PAGE:
+                break
+
+        self._write_history()
+        state["done"] = True
+        self._save_checkpoint(state)
+        return state
+
+    def _value(self, balances: Dict[str, int], decimals: Dict[str, int]) -> float:
+        """Value balances at current oracle prices (historical prices are not stored per mint)"""
+        from portfolio import price_oracle
+
+        if not balances:
+            return 0.0
+        keys = list(balances)
+        amounts = np.array([balances[k] for k in keys], dtype=np.float64)
+        scale = np.power(10.0, [decimals.get(k, 0) for k in keys])
+        # Native and wrapped SOL are held apart but priced alike
+        prices, _ = price_oracle.lookup(np.array([SOL_MINT if k == NATIVE_SOL else k for k in keys], dtype=str))
+        return float(np.sum(amounts / scale * prices))
+
+    def timeline(self) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Per-mint (timestamps, raw balances) ascending, read from the timeline file"""
+        series: Dict[str, List[Tuple[int, int]]] = {}
+        with open(self.timeline_path, "r") as f:
+            for line in f:
+                ts, mint, value = line.rstrip("\n").split(",")
+                if mint != "*":
+                    series.setdefault(mint, []).append((int(ts), int(value)))
+        return {
+            mint: (np.array([p[0] for p in points[::-1]], dtype=np.int64),
+                   np.array([p[1] for p in points[::-1]], dtype=np.int64))
+            for mint, points in series.items()
+        }
+
+    def _write_history(self):
+        """Load valued points from the timeline and backfill the history store"""
+        timestamps, values = [], []
+        with open(self.timeline_path, "r") as f:
+            for line in f:
+                ts, mint, value = line.rstrip("\n").split(",")
+                if mint == "*":
+                    timestamps.append(int(ts))
+                    values.append(float(value))
+        if timestamps:
+            # Rows run newest to oldest; reverse so the latest value wins within a block time
+            self.store.backfill(self.wallet, np.array(timestamps[::-1]), np.array(values[::-1]))
+
+
+def reconstruct_wallets(wallets: List[str], rpc: RpcCall = default_rpc,
+                        workers: int = WALLET_CONCURRENCY) -> Dict[str, Dict]:
+    """Reconstruct many wallets in parallel; RPC concurrency stays bounded by the shared pool"""
+    results: Dict[str, Dict] = {}
+    with ThreadPoolExecutor(max_workers=RPC_CONCURRENCY) as rpc_pool:
+        def run(wallet: str):
+            try:
+                results[wallet] = ReconstructionJob(wallet, rpc=rpc, pool=rpc_pool).run()
+            except Exception as e:
+                results[wallet] = {"error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=workers) as wallet_pool:
+            list(wallet_pool.map(run, wallets))
+    return results
+
+
+if __name__ == "__main__":
+    for wallet, result in reconstruct_wallets(sys.argv[1:]).items():
+        print(wallet, result.get("error") or f"{result['transactions']} transactions")
@@ -0,0 +1,224 @@
+"""
+Columnar OHLCV candle store
+Per-symbol NumPy ring buffers at 1-minute resolution with incremental 1h/1d rollups
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Bucket width in seconds for each stored resolution
+RESOLUTIONS = {
+    "1m": 60,
+    "1h": 3600,
+    "1d": 86400
+}
+
+# Ring buffer capacity (number of candles) kept per resolution
+DEFAULT_CAPACITY = {
+    "1m": 60 * 24 * 2,   # 2 days of minutes
+    "1h": 24 * 90,       # 90 days of hours
+    "1d": 365 * 2        # 2 years of days
+}
+
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+class CandleSeries:
+    """Fixed-capacity ring buffer of OHLCV candles for one symbol and resolution"""
+
+    def __init__(self, interval: int, capacity: int):
+        self.interval = interval
+        self.capacity = capacity
+        self.timestamp = np.zeros(capacity, dtype=np.int64)
+        self.open = np.zeros(capacity, dtype=np.float64)
+        self.high = np.zeros(capacity, dtype=np.float64)
+        self.low = np.zeros(capacity, dtype=np.float64)
+        self.close = np.zeros(capacity, dtype=np.float64)
+        self.volume = np.zeros(capacity, dtype=np.float64)
+        self.head = 0  # Next write position
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def last_index(self) -> int:
+        return (self.head - 1) % self.capacity
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self.timestamp[self.last_index]) if self.count else None
+
+    def add_tick(self, ts: int, price: float, volume: float = 0.0):
+        """Fold a trade tick into its bucket, opening a new candle when needed"""
+        bucket = ts - ts % self.interval
+        last_ts = self.last_timestamp
+
+        if last_ts is not None and bucket == last_ts:
+            i = self.last_index
+            if price > self.high[i]:
+                self.high[i] = price
+            if price < self.low[i]:
+                self.low[i] = price
+            self.close[i] = price
+            self.volume[i] += volume
+            return
+
+        if last_ts is not None and bucket < last_ts:
+            # Late tick: update the candle in place if it is still buffered
+            ordered = self._ordered_indices()
+            pos = np.searchsorted(self.timestamp[ordered], bucket)
+            if pos < len(ordered) and self.timestamp[ordered[pos]] == bucket:
+                i = ordered[pos]
+                self.high[i] = max(self.high[i], price)
+                self.low[i] = min(self.low[i], price)
+                self.volume[i] += volume
+            return
+
+        i = self.head
+        self.timestamp[i] = bucket
+        self.open[i] = price
+        self.high[i] = price
+        self.low[i] = price
+        self.close[i] = price
+        self.volume[i] = volume
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def load(self, timestamp: np.ndarray, open_: np.ndarray, high: np.ndarray,
+             low: np.ndarray, close: np.ndarray, volume: np.ndarray):
+        """Bulk-load ordered candles, replacing the current contents"""
+        n = min(len(timestamp), self.capacity)
+        for name, values in zip(COLUMNS, (timestamp, open_, high, low, close, volume)):
+            getattr(self, name)[:n] = np.asarray(values)[-n:]
+        self.head = n % self.capacity
+        self.count = n
+
+    def _ordered_indices(self) -> np.ndarray:
+        start = (self.head - self.count) % self.capacity
+        return (np.arange(self.count) + start) % self.capacity
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Return all buffered candles, oldest first"""
+        if self.count < self.capacity and self.head >= self.count:
+            sl = slice(self.head - self.count, self.head)
+            return {name: getattr(self, name)[sl] for name in COLUMNS}
+        ordered = self._ordered_indices()
+        return {name: getattr(self, name)[ordered] for name in COLUMNS}
+
+    def range(self, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Return candles with start <= timestamp < end as array slices"""
+        cols = self.columns()
+        ts = cols["timestamp"]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="left"))
+        return {name: values[lo:hi] for name, values in cols.items()}
+
+    def tail(self, n: int) -> Dict[str, np.ndarray]:
+        """Return the most recent n candles"""
+        cols = self.columns()
+        return {name: values[-n:] for name, values in cols.items()}
+
+
+class CandleStore:
+    """Thread-safe collection of candle series keyed by symbol and resolution"""
+
+    def __init__(self, capacity: Optional[Dict[str, int]] = None):
+        self.capacity = {**DEFAULT_CAPACITY, **(capacity or {})}
+        self._series: Dict[str, Dict[str, CandleSeries]] = {}
+        self._synthetic = set()  # Symbols whose history was generated rather than observed
+        self._listeners: List[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: Callable[[str], None]):
+        """Call listener with the symbol after each tick or backfill"""
+        self._listeners.append(listener)
+
+    def _notify(self, symbol: str):
+        for listener in self._listeners:
+            listener(symbol)
+
+    def _get_series(self, symbol: str) -> Dict[str, CandleSeries]:
+        series = self._series.get(symbol)
+        if series is None:
+            series = {
+                res: CandleSeries(interval, self.capacity[res])
+                for res, interval in RESOLUTIONS.items()
+            }
+            self._series[symbol] = series
+        return series
+
+    def has_symbol(self, symbol: str) -> bool:
+        return symbol in self._series
+
+    def is_synthetic(self, symbol: str) -> bool:
+        return symbol in self._synthetic
+
+    def symbols(self) -> List[str]:
+        return list(self._series)
+
+    def add_tick(self, symbol: str, price: float, volume: float = 0.0, ts: Optional[int] = None):
+        """Record a tick at 1m resolution and roll it into the 1h/1d candles"""
+        ts = int(time.time()) if ts is None else int(ts)
+        with self._lock:
+            for series in self._get_series(symbol).values():
+                series.add_tick(ts, price, volume)
+        self._notify(symbol)
+
+    def backfill(self, symbol: str, resolution: str, candles: Dict[str, np.ndarray], synthetic: bool = False):
+        """Bulk-load historical candles for one resolution"""
+        with self._lock:
+            if synthetic:
+                self._synthetic.add(symbol)
+            series = self._get_series(symbol)[resolution]
+            series.load(*(candles[name] for name in COLUMNS))
+        self._notify(symbol)
+
+    def query(self, symbol: str, resolution: str, start: Optional[int] = None,
+              end: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Range query returning copies of the column slices"""
+        with self._lock:
+            series = self._get_series(symbol)[resolution]
+            cols = series.range(start, end)
+            if limit is not None:
+                cols = {name: values[-limit:] for name, values in cols.items()}
+            return {name: values.copy() for name, values in cols.items()}
+
+
+def rollup_candles(candles: Dict[str, np.ndarray], interval: int) -> Dict[str, np.ndarray]:
+    """Aggregate ordered candles into coarser interval-aligned candles"""
+    ts = candles["timestamp"]
+    if not len(ts):
+        return {name: values[:0] for name, values in candles.items()}
+    bucket = ts - ts % interval
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    ends = np.concatenate((starts[1:], [len(ts)])) - 1
+    return {
+        "timestamp": bucket[starts],
+        "open": candles["open"][starts],
+        "high": np.maximum.reduceat(candles["high"], starts),
+        "low": np.minimum.reduceat(candles["low"], starts),
+        "close": candles["close"][ends],
+        "volume": np.add.reduceat(candles["volume"], starts)
+    }
+
+
+def candles_to_records(candles: Dict[str, np.ndarray], decimals: int = 4) -> List[Dict]:
+    """Serialise candle columns into JSON-ready records in one vectorised pass"""
+    timestamps = np.datetime_as_string(candles["timestamp"].astype("datetime64[s]")).tolist()
+    opens = np.round(candles["open"], decimals).tolist()
+    highs = np.round(candles["high"], decimals).tolist()
+    lows = np.round(candles["low"], decimals).tolist()
+    closes = np.round(candles["close"], decimals).tolist()
+    volumes = np.round(candles["volume"], 2).tolist()
+    return [
+        {"timestamp": t, "open": o, "high": h, "low": lo, "close": c, "price": c, "volume": v}
+        for t, o, h, lo, c, v in zip(timestamps, opens, highs, lows, closes, volumes)
+    ]
+
+
+# Global candle store instance
+candle_store = CandleStore()
@@ -0,0 +1,21 @@
+"""
+Test configuration
+Points every data store at a throwaway directory before the modules under
+test create their global instances
+"""
+
+import os
+import tempfile
+
+DATA_ROOT = tempfile.mkdtemp(prefix="singularity-tests-")
+
+for name, path in {
+    "GOVERNANCE_DATA_DIR": "governance_data",
+    "SOCIAL_DATA_DIR": "social_data",
+    "PORTFOLIO_HISTORY_DIR": "portfolio_history",
+    "RECONSTRUCTION_CHECKPOINT_DIR": "reconstruction_checkpoints",
+    "STAKING_DB_PATH": os.path.join("staking_data", "staking.db"),
+    "LEADERBOARD_DB_PATH": os.path.join("leaderboard_data", "fills.db"),
+    "PNL_DB_PATH": os.path.join("leaderboard_data", "trades.db"),
+}.items():
+    os.environ[name] = os.path.join(DATA_ROOT, path)
@@ -0,0 +1,506 @@
+"""
+Copy-trade pipeline
+A trader's signal becomes one persisted job per copying follower. A fixed
+worker pool prices the whole group with one Jupiter quote per pair, then
+has Jupiter build each follower's unsigned swap from their own quote. The
+follower signs and sends it; a job only counts as filled once its
+transaction is confirmed on chain
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from jupiter_quotes import QuoteCache, quote_cache
+from rpc_client import rpc_client
+from solana_rpc_cache import rpc_cache
+
+SOCIAL_DATA_DIR = os.getenv("SOCIAL_DATA_DIR", "social_data")
+# Point at a local stand-in for testing, e.g. http://localhost:8080/v6/swap
+JUPITER_SWAP_URL = os.getenv("JUPITER_SWAP_URL", "https://quote-api.jup.ag/v6/swap")
+COPY_TRADE_WORKERS = 8      # Concurrent quote/swap/confirmation calls
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 1.0         # Seconds before the first retry, doubling after
+SWAP_TIMEOUT = 15
+SIGN_WINDOW = 60            # Seconds a built transaction's blockhash is trusted to stay valid
+CONFIRM_ATTEMPTS = 8        # Confirmation polls before a submitted swap is given up on
+CONFIRM_INTERVAL = 2.0      # Seconds before the first poll, doubling after
+DEFAULT_COPY_AMOUNT = 10.0  # USDC per copied signal
+DEFAULT_SLIPPAGE_BPS = 50
+
+USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+TOKEN_MINTS = {
+    "SOL": ("So11111111111111111111111111111111111111112", 9),
+    "USDC": (USDC_MINT, 6),
+    "RAY": ("4k3Dyjzvzp8eMZWUXbBCjEvwSkkk59S5iCNLY3QrkX6R", 6),
+    "ORCA": ("orcaEKTdK7LKz57vaAYr9QeNsVEPfiu6QeMU1kektZE", 6),
+    "SIO": ("Fuj6EDWQHBnQ3eEvYDujNQ4rPLSkhm3pBySbQ79Bpump", 6)
+}
+SOL_MINT = TOKEN_MINTS["SOL"][0]
+# queued -> executing -> awaiting_signature -> submitted -> filled, or failed from any step
+FINAL_STATUSES = ("filled", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS copy_settings (
+    trader TEXT NOT NULL,
+    wallet TEXT NOT NULL,
+    amount_usd REAL NOT NULL,
+    slippage_bps INTEGER NOT NULL,
+    PRIMARY KEY (trader, wallet)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY,
+    wallet TEXT NOT NULL,
+    trader TEXT,
+    signal_id INTEGER,
+    input_mint TEXT NOT NULL,
+    output_mint TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    slippage_bps INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    in_amount INTEGER,
+    out_amount INTEGER,
+    tx TEXT,
+    signature TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS jobs_signal ON jobs (signal_id);
+CREATE INDEX IF NOT EXISTS jobs_wallet ON jobs (wallet, status);
+"""
+
+JOB_COLUMNS = ("key", "wallet", "trader", "signal_id", "input_mint", "output_mint", "amount", "slippage_bps",
+               "status", "attempts", "in_amount", "out_amount", "tx", "signature", "error", "created_at",
+               "updated_at")
+
+_decimals_cache: Dict[str, int] = {}
+
+
+def mint_decimals(mint: str) -> int:
+    """Decimals for a mint, from the known list or the chain"""
+    for known_mint, decimals in TOKEN_MINTS.values():
+        if known_mint == mint:
+            return decimals
+    if mint not in _decimals_cache:
+        result = rpc_client.call("getTokenSupply", [mint])
+        if "error" in result:
+            raise ValueError(f"Unknown token mint: {mint}")
+        _decimals_cache[mint] = int(result["result"]["value"]["decimals"])
+    return _decimals_cache[mint]
+
+
+def resolve_token(token: str) -> Tuple[str, int]:
+    """(mint, decimals) for a symbol like SOL or $SOL, or a raw mint address"""
+    symbol = token.lstrip("$").upper()
+    if symbol in TOKEN_MINTS:
+        return TOKEN_MINTS[symbol]
+    if 32 <= len(token) <= 44:
+        return token, mint_decimals(token)
+    raise ValueError(f"Unknown token: {token}")
+
+
+def parse_price(price) -> float:
+    value = float(str(price).replace("$", "").replace(",", ""))
+    if value <= 0:
+        raise ValueError("Price must be positive")
+    return value
+
+
+def order_for(action: str, token: str, price, usd: Optional[float] = None,
+              quantity: Optional[float] = None) -> Tuple[str, str, int]:
+    """(input mint, output mint, raw input amount) for a USDC-sized or token-sized order"""
+    mint, decimals = resolve_token(token)
+    if mint == USDC_MINT:
+        raise ValueError("Cannot copy-trade USDC against itself")
+    usd = usd if usd is not None else quantity * parse_price(price)
+    action = action.upper()
+    if action == "BUY":
+        return USDC_MINT, mint, int(round(usd * 10 ** 6))
+    if action == "SELL":
+        tokens = quantity if quantity is not None else usd / parse_price(price)
+        return mint, USDC_MINT, int(round(tokens * 10 ** decimals))
+    raise ValueError(f"Unknown action: {action}")
+
+
+def job_fill(job: Dict) -> Optional[Tuple[str, str, float, float, float]]:
+    """(side, mint, quantity, USD price, USD value) of a filled USDC-quoted job"""
+    if job["input_mint"] == USDC_MINT:
+        side, mint, usdc, raw = "buy", job["output_mint"], job["in_amount"], job["out_amount"]
+    elif job["output_mint"] == USDC_MINT:
+        side, mint, usdc, raw = "sell", job["input_mint"], job["out_amount"], job["in_amount"]
+    else:
+        return None
+    quantity = raw / 10 ** mint_decimals(mint)
+    value = usdc / 10 ** 6
+    return side, mint, quantity, value / quantity, value
+
+
+def build_swap(job: Dict, quote: Dict) -> Dict:
+    """Have Jupiter build the unsigned swap transaction for the job's wallet
+
+    Nothing is signed or sent here, so building again after a timeout is harmless.
+    """
+    response = requests.post(
+        JUPITER_SWAP_URL,
+        json={"quoteResponse": quote, "userPublicKey": job["wallet"], "wrapAndUnwrapSol": True,
+              "dynamicComputeUnitLimit": True},
+        timeout=SWAP_TIMEOUT
+    )
+    response.raise_for_status()
+    result = response.json()
+    if not result.get("swapTransaction"):
+        raise RuntimeError(result.get("error", "Swap returned no transaction"))
+    return {"tx": result["swapTransaction"], "out_amount": int(quote["outAmount"])}
+
+
+def wallet_deltas(tx: Dict, wallet: str) -> Dict[str, int]:
+    """Raw balance change per mint for wallet in a jsonParsed transaction; native SOL counts as SOL_MINT"""
+    meta = tx["meta"]
+    deltas: Dict[str, int] = {}
+    for sign, balances in ((-1, meta.get("preTokenBalances") or []), (1, meta.get("postTokenBalances") or [])):
+        for balance in balances:
+            if balance.get("owner") == wallet:
+                mint = balance["mint"]
+                deltas[mint] = deltas.get(mint, 0) + sign * int(balance["uiTokenAmount"]["amount"])
+    # The fee payer's lamports net of the fee cover wrapped SOL that was unwrapped in the same transaction
+    lamports = meta["postBalances"][0] - meta["preBalances"][0] + meta["fee"]
+    deltas[SOL_MINT] = deltas.get(SOL_MINT, 0) + lamports
+    return deltas
+
+
+def confirm_swap(job: Dict) -> Optional[Dict]:
+    """Actual amounts of the job's confirmed swap, or None while it is not yet confirmed
+
+    Raises ValueError when the transaction failed or is not the job's swap.
+    """
+    result = rpc_cache.call("getTransaction", [job["signature"], {
+        "encoding": "jsonParsed", "commitment": "confirmed", "maxSupportedTransactionVersion": 0
+    }], cache_ttl=0)
+    tx = result.get("result")
+    if tx is None:
+        return None
+    if tx["meta"].get("err") is not None:
+        raise ValueError(f"Swap transaction failed: {tx['meta']['err']}")
+    if tx["transaction"]["message"]["accountKeys"][0]["pubkey"] != job["wallet"]:
+        raise ValueError("Transaction was not paid for by the copying wallet")
+    deltas = wallet_deltas(tx, job["wallet"])
+    spent, received = -deltas.get(job["input_mint"], 0), deltas.get(job["output_mint"], 0)
+    if spent <= 0 or received <= 0:
+        raise ValueError("Transaction does not swap the job's tokens")
+    return {"in_amount": spent, "out_amount": received}
+
+
+class CopyTrader:
+    """Persistent copy-trade job queue with a bounded worker pool"""
+
+    def __init__(self, path: Optional[str] = None, quotes: QuoteCache = quote_cache,
+                 build: Callable[[Dict, Dict], Dict] = build_swap,
+                 confirm: Callable[[Dict], Optional[Dict]] = confirm_swap, workers: int = COPY_TRADE_WORKERS):
+        path = path or os.path.join(SOCIAL_DATA_DIR, "copy_trades.db")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column in ("in_amount INTEGER", "signature TEXT"):
+            if column.split()[0] not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+        # One on-chain transaction can settle only one job
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS jobs_signature ON jobs (signature)")
+        self._lock = threading.Lock()
+        self.quotes = quotes
+        self.build = build
+        self.confirm = confirm
+        self._queue: "queue.Queue[Tuple]" = queue.Queue()
+        self.quote_requests = 0
+        self.orders_quoted = 0
+        self._listeners: List[Callable[[Dict], None]] = []
+
+        # Builds interrupted by a restart are requoted individually; nothing was sent for them
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'executing'")
+        for (key,) in self._query("SELECT key FROM jobs WHERE status = 'queued'", ()):
+            self._queue.put(("swap", key, None))
+        # Delayed so fill listeners can subscribe before a resumed confirmation lands
+        for (key,) in self._query("SELECT key FROM jobs WHERE status = 'submitted'", ()):
+            self._retry(("confirm", key, 1), 1, CONFIRM_INTERVAL)
+
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"copy-trade-{i}", daemon=True).start()
+
+    def subscribe(self, listener: Callable[[Dict], None]):
+        """Call listener with each job once its swap is confirmed filled"""
+        self._listeners.append(listener)
+
+    def _query(self, sql: str, params: Tuple) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _update(self, key: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE key = ?", (*fields.values(), key))
+
+    # Settings
+
+    def enable(self, wallet: str, trader: str, amount_usd: float = DEFAULT_COPY_AMOUNT,
+               slippage_bps: int = DEFAULT_SLIPPAGE_BPS):
+        """Copy every future signal from trader with amount_usd per trade"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO copy_settings (trader, wallet, amount_usd, slippage_bps) VALUES (?, ?, ?, ?)",
+                (trader, wallet, amount_usd, slippage_bps)
+            )
+
+    def disable(self, wallet: str, trader: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM copy_settings WHERE trader = ? AND wallet = ?", (trader, wallet))
+        return cursor.rowcount > 0
+
+    def settings(self, wallet: str) -> List[Dict]:
+        """Traders the wallet copies, with the size and slippage used for each"""
+        rows = self._query("SELECT trader, amount_usd, slippage_bps FROM copy_settings WHERE wallet = ? ORDER BY trader",
+                           (wallet,))
+        return [{"trader": trader, "amount_usd": amount, "slippage_bps": bps} for trader, amount, bps in rows]
+
+    def copier_count(self, trader: str) -> int:
+        return self._query("SELECT COUNT(*) FROM copy_settings WHERE trader = ?", (trader,))[0][0]
+
+    # Enqueueing
+
+    def _insert(self, rows: List[Tuple]) -> List[str]:
+        """Insert jobs, skipping keys already present; returns the new keys"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                new = []
+                for row in rows:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO jobs (key, wallet, trader, signal_id, input_mint, output_mint, amount, "
+                        "slippage_bps, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?)",
+                        (*row, now, now)
+                    )
+                    if cursor.rowcount:
+                        new.append(row[0])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return new
+
+    def submit(self, wallet: str, action: str, token: str, price, quantity: float,
+               key: Optional[str] = None, slippage_bps: int = DEFAULT_SLIPPAGE_BPS) -> Dict:
+        """Queue a single copy trade; resubmitting the same key returns the existing job"""
+        key = key or uuid.uuid4().hex
+        existing = self.job(key)
+        if existing is not None:
+            return existing
+        input_mint, output_mint, amount = order_for(action, token, price, quantity=quantity)
+        if self._insert([(key, wallet, None, None, input_mint, output_mint, amount, slippage_bps)]):
+            self._queue.put(("swap", key, None))
+        return self.job(key)
+
+    def enqueue_signal(self, signal: Dict) -> int:
+        """One job per copying follower; orders on the same pair share a quote"""
+        settings = self._query("SELECT wallet, amount_usd, slippage_bps FROM copy_settings WHERE trader = ?",
+                               (signal["trader"],))
+        if not settings:
+            return 0
+        rows = []
+        for wallet, amount_usd, slippage_bps in settings:
+            input_mint, output_mint, amount = order_for(signal["action"], signal["token"], signal["price"],
+                                                        usd=amount_usd)
+            # The uid, unlike the numeric id, is never reused by a fresh signal store
+            key = f"signal:{signal['uid']}:{wallet}"
+            rows.append((key, wallet, signal["trader"], signal["id"], input_mint, output_mint, amount, slippage_bps))
+        new = set(self._insert(rows))
+
+        groups: Dict[Tuple[str, str, int], List[Tuple[str, int]]] = {}
+        for row in rows:
+            if row[0] in new:
+                groups.setdefault((row[4], row[5], row[7]), []).append((row[0], row[6]))
+        for pair, orders in groups.items():
+            self._queue.put(("quote", pair, orders))
+        return len(new)
+
+    # Workers
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item[0] == "quote":
+                    self._quote_group(item[1], item[2])
+                elif item[0] == "confirm":
+                    self._confirm(item[1], item[2])
+                else:
+                    self._run(item[1], item[2])
+            except Exception as e:
+                print(f"Copy-trade worker error: {e}")
+
+    def _retry(self, item: Tuple, attempts: int, backoff: Optional[float] = None):
+        backoff = RETRY_BACKOFF if backoff is None else backoff
+        timer = threading.Timer(backoff * 2 ** (attempts - 1), self._queue.put, (item,))
+        timer.daemon = True
+        timer.start()
+
+    def _quote_group(self, pair: Tuple[str, str, int], orders: List[Tuple[str, int]]):
+        """Quote the group's combined size once to price each follower's share
+
+        The group quote's route and thresholds describe the combined order, so
+        it only sets the floor each follower's own quote must reach.
+        """
+        input_mint, output_mint, slippage_bps = pair
+        total = sum(amount for _, amount in orders)
+        self.quote_requests += 1
+        self.orders_quoted += len(orders)
+        try:
+            quote = self.quotes.get_quote(input_mint, output_mint, total, slippage_bps)
+            if "outAmount" not in quote:
+                raise RuntimeError(quote.get("error", "Quote unavailable"))
+        except Exception as e:
+            # Fall back to unguarded per-job quotes, which carry their own retries
+            for key, _ in orders:
+                self._update(key, error=f"Group quote failed: {e}")
+                self._queue.put(("swap", key, None))
+            return
+
+        out_total = int(quote["outAmount"])
+        for key, amount in orders:
+            # The combined order has at least the impact of any share of it, so this never overstates
+            self._queue.put(("swap", key, out_total * amount // total))
+
+    def _run(self, key: str, expected_out: Optional[int]):
+        with self._lock:
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'executing', attempts = attempts + 1, updated_at = ? "
+                "WHERE key = ? AND status = 'queued'",
+                (time.time(), key)
+            ).rowcount
+        if not claimed:
+            return
+        job = self.job(key)
+        try:
+            # Identical amounts on a pair hit the quote cache, so equal shares cost one request
+            quote = self.quotes.get_quote(job["input_mint"], job["output_mint"], job["amount"],
+                                          job["slippage_bps"])
+            if "outAmount" not in quote:
+                raise RuntimeError(quote.get("error", "Quote unavailable"))
+            floor = None if expected_out is None else expected_out * (10000 - job["slippage_bps"]) // 10000
+            if floor is not None and int(quote["outAmount"]) < floor:
+                raise RuntimeError("Price moved beyond slippage since the signal was quoted")
+            result = self.build(job, quote)
+        except Exception as e:
+            if job["attempts"] < MAX_ATTEMPTS:
+                self._update(key, status="queued", error=str(e))
+                self._retry(("swap", key, expected_out), job["attempts"])
+            else:
+                self._update(key, status="failed", error=str(e))
+            return
+        self._update(key, status="awaiting_signature", tx=result["tx"], out_amount=result["out_amount"], error=None)
+
+    def _confirm(self, key: str, attempt: int):
+        job = self.job(key)
+        if job is None or job["status"] != "submitted":
+            return
+        try:
+            result = self.confirm(job)
+        except ValueError as e:
+            self._update(key, status="failed", error=str(e))
+            return
+        except Exception as e:
+            # RPC trouble says nothing about the transaction; keep polling
+            result = None
+            self._update(key, error=f"Confirmation check failed: {e}")
+        if result is None:
+            if attempt < CONFIRM_ATTEMPTS:
+                self._retry(("confirm", key, attempt + 1), attempt, CONFIRM_INTERVAL)
+            else:
+                self._update(key, status="failed", error="Transaction was not confirmed")
+            return
+        self._update(key, status="filled", in_amount=result["in_amount"], out_amount=result["out_amount"],
+                     error=None)
+        filled = self.job(key)
+        for listener in self._listeners:
+            try:
+                listener(filled)
+            except Exception as e:
+                print(f"Copy-trade fill listener error: {e}")
+
+    # Signing
+
+    def submit_signature(self, key: str, signature: str) -> Dict:
+        """Record the signature of the transaction the follower signed and sent, then confirm it"""
+        if not 64 <= len(signature) <= 88:
+            raise ValueError("Invalid transaction signature")
+        try:
+            with self._lock:
+                updated = self._conn.execute(
+                    "UPDATE jobs SET status = 'submitted', signature = ?, error = NULL, updated_at = ? "
+                    "WHERE key = ? AND status = 'awaiting_signature'",
+                    (signature, time.time(), key)
+                ).rowcount
+        except sqlite3.IntegrityError:
+            raise ValueError("Signature already recorded for another copy trade")
+        if not updated:
+            raise ValueError("Copy trade is not awaiting a signature")
+        self._queue.put(("confirm", key, 1))
+        return self.job(key)
+
+    def rebuild(self, key: str) -> Dict:
+        """Requote and rebuild a transaction whose blockhash may have expired before it was signed"""
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, tx = NULL, updated_at = ? "
+                "WHERE key = ? AND status = 'awaiting_signature'",
+                (time.time(), key)
+            ).rowcount
+        if not updated:
+            raise ValueError("Copy trade is not awaiting a signature")
+        self._queue.put(("swap", key, None))
+        return self.job(key)
+
+    # Reads
+
+    def job(self, key: str) -> Optional[Dict]:
+        rows = self._query(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE key = ?", (key,))
+        return dict(zip(JOB_COLUMNS, rows[0])) if rows else None
+
+    def pending(self, wallet: str, limit: int = 20) -> List[Dict]:
+        """Jobs waiting for the wallet to sign, oldest first"""
+        rows = self._query(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE wallet = ? AND status = 'awaiting_signature' "
+            "ORDER BY created_at LIMIT ?",
+            (wallet, limit)
+        )
+        return [dict(zip(JOB_COLUMNS, row)) for row in rows]
+
+    def signal_jobs(self, signal_id: int) -> Dict[str, int]:
+        """Job counts by status for one signal"""
+        return dict(self._query("SELECT status, COUNT(*) FROM jobs WHERE signal_id = ? GROUP BY status", (signal_id,)))
+
+    def stats(self) -> Dict:
+        return {
+            "jobs": dict(self._query("SELECT status, COUNT(*) FROM jobs GROUP BY status", ())),
+            "queued_items": self._queue.qsize(),
+            "quote_requests": self.quote_requests,
+            "orders_quoted": self.orders_quoted
+        }
+
+
+# Global copy trader instance
+copy_trader = CopyTrader()
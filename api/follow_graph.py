@@ -0,0 +1,159 @@
+"""
+Follow graph
+Directed follower -> followee edges in SQLite with a forward and a reverse
+index, exact per-node counters maintained in the same transaction, keyset
+pagination and mutual-follow / follower-overlap queries
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+SOCIAL_DATA_DIR = os.getenv("SOCIAL_DATA_DIR", "social_data")
+ITER_BATCH = 1000   # Rows fetched per step when streaming a follower list
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS edges (
+    follower TEXT NOT NULL,
+    followee TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (follower, followee)
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX IF NOT EXISTS edges_reverse ON edges (followee, follower);
+CREATE TABLE IF NOT EXISTS counts (
+    node TEXT PRIMARY KEY,
+    followers INTEGER NOT NULL DEFAULT 0,
+    following INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+
+class FollowGraph:
+    """Persistent directed graph; every operation is an index lookup, never a scan"""
+
+    def __init__(self, path: Optional[str] = None):
+        path = path or os.path.join(SOCIAL_DATA_DIR, "follow_graph.db")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _bump(self, node: str, column: str, delta: int):
+        self._conn.execute("INSERT OR IGNORE INTO counts (node) VALUES (?)", (node,))
+        self._conn.execute(f"UPDATE counts SET {column} = {column} + ? WHERE node = ?", (delta, node))
+
+    def follow(self, follower: str, followee: str) -> bool:
+        """Add an edge; returns False if it already existed"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO edges (follower, followee, created_at) VALUES (?, ?, ?)",
+                    (follower, followee, time.time())
+                )
+                added = cursor.rowcount > 0
+                if added:
+                    self._bump(followee, "followers", 1)
+                    self._bump(follower, "following", 1)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def unfollow(self, follower: str, followee: str) -> bool:
+        """Remove an edge; returns False if there was none"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute("DELETE FROM edges WHERE follower = ? AND followee = ?",
+                                            (follower, followee))
+                removed = cursor.rowcount > 0
+                if removed:
+                    self._bump(followee, "followers", -1)
+                    self._bump(follower, "following", -1)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return removed
+
+    def _query(self, sql: str, params: Tuple) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def is_following(self, follower: str, followee: str) -> bool:
+        return bool(self._query("SELECT 1 FROM edges WHERE follower = ? AND followee = ?", (follower, followee)))
+
+    def counts(self, node: str) -> Dict[str, int]:
+        rows = self._query("SELECT followers, following FROM counts WHERE node = ?", (node,))
+        followers, following = rows[0] if rows else (0, 0)
+        return {"followers": followers, "following": following}
+
+    def follower_count(self, node: str) -> int:
+        return self.counts(node)["followers"]
+
+    def following_count(self, node: str) -> int:
+        return self.counts(node)["following"]
+
+    def followers(self, node: str, cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[str], Optional[str]]:
+        """Page of a node's followers ordered by id; pass next_cursor to continue"""
+        rows = self._query(
+            "SELECT follower FROM edges WHERE followee = ? AND follower > ? ORDER BY follower LIMIT ?",
+            (node, cursor or "", limit)
+        )
+        page = [row[0] for row in rows]
+        return page, (page[-1] if len(page) == limit else None)
+
+    def following(self, node: str, cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[str], Optional[str]]:
+        """Page of the nodes a node follows ordered by id"""
+        rows = self._query(
+            "SELECT followee FROM edges WHERE follower = ? AND followee > ? ORDER BY followee LIMIT ?",
+            (node, cursor or "", limit)
+        )
+        page = [row[0] for row in rows]
+        return page, (page[-1] if len(page) == limit else None)
+
+    def iter_followers(self, node: str) -> Iterator[str]:
+        """Stream every follower in batches without holding the lock between them"""
+        cursor = None
+        while True:
+            page, cursor = self.followers(node, cursor, ITER_BATCH)
+            yield from page
+            if cursor is None:
+                return
+
+    def following_set(self, node: str) -> Set[str]:
+        return {row[0] for row in self._query("SELECT followee FROM edges WHERE follower = ?", (node,))}
+
+    def mutuals(self, node: str, cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[str], Optional[str]]:
+        """Nodes that node follows and that follow it back"""
+        rows = self._query(
+            "SELECT a.followee FROM edges a JOIN edges b ON b.follower = a.followee AND b.followee = a.follower "
+            "WHERE a.follower = ? AND a.followee > ? ORDER BY a.followee LIMIT ?",
+            (node, cursor or "", limit)
+        )
+        page = [row[0] for row in rows]
+        return page, (page[-1] if len(page) == limit else None)
+
+    def follower_overlap(self, a: str, b: str) -> Dict:
+        """Followers shared by a and b, walking the smaller follower list"""
+        count_a, count_b = self.follower_count(a), self.follower_count(b)
+        small, large = (a, b) if count_a <= count_b else (b, a)
+        common = self._query(
+            "SELECT COUNT(*) FROM edges s JOIN edges l ON l.follower = s.follower AND l.followee = ? "
+            "WHERE s.followee = ?",
+            (large, small)
+        )[0][0]
+        union = count_a + count_b - common
+        return {
+            "common_followers": common,
+            "followers": {a: count_a, b: count_b},
+            "jaccard": common / union if union else 0.0
+        }
@@ -1,38 +1,39 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timedelta
+import asyncio
 import uuid
 
-router = APIRouter()
+from governance_store import governance_store, make_event, proposal_to_dict, Proposal
+from solana_rpc_cache import get_token_accounts_by_owner
+from sio_token import SIO_TOKEN_MINT
+from voting_snapshot import voting_snapshots
+from staking import staking_ledger
+from vote_ingestion import VoteIngestor
+from live_hub import live_hub
 
-class Proposal(BaseModel):
-    id: str
-    title: str
-    description: str
-    proposer: str
-    yes_votes: float = 0
-    no_votes: float = 0
-    total_votes: float = 0
-    end_time: datetime
-    status: str = "active"
-    created_at: datetime
+router = APIRouter()
 
 class VoteRequest(BaseModel):
     proposal_id: str
     wallet: str
     vote: bool  # True for yes, False for no
-    amount: float
+    amount: Optional[float] = None  # Ignored: weight comes from the proposal's balance snapshot
+
+class BulkVoteRequest(BaseModel):
+    votes: List[VoteRequest]
 
 class CreateProposalRequest(BaseModel):
     title: str
     description: str
     wallet: str
 
-# In-memory storage (replace with database in production)
-proposals = {}
-user_votes = {}  # {wallet: {proposal_id: {vote, amount}}}
-user_voting_power = {}  # {wallet: voting_power}
+# Shared event-sourced state; these names stay bound to the store's live dicts
+proposals = governance_store.proposals
+user_votes = governance_store.user_votes  # {wallet: {proposal_id: {vote, amount}}}
+user_voting_power = governance_store.user_voting_power  # {wallet: voting_power}
 
 # Initialize with some sample proposals
 sample_proposals = [
@@ -62,22 +63,78 @@ sample_proposals = [
     }
 ]
 
-for prop in sample_proposals:
-    proposals[prop["id"]] = Proposal(**prop)
+def _seed_events(store):
+    """Record the sample proposals the first time the log is created"""
+    if store.proposals:
+        return []
+    return [
+        make_event("proposal_created", {
+            **prop,
+            "end_time": prop["end_time"].isoformat(),
+            "created_at": prop["created_at"].isoformat()
+        })
+        for prop in sample_proposals
+    ]
+
+governance_store.transact(_seed_events)
+governance_store.start_expiry_scheduler()
+
+CIRCULATING_SUPPLY = 25000000
+MAX_BULK_VOTES = 5000
+
+def get_live_sio_balance(wallet: str) -> float:
+    """Current S-IO balance via the cached RPC client"""
+    try:
+        result = get_token_accounts_by_owner(wallet, SIO_TOKEN_MINT)
+        accounts = result["result"]["value"]
+        return sum(
+            float(a["account"]["data"]["parsed"]["info"]["tokenAmount"]["uiAmount"] or 0)
+            for a in accounts
+        )
+    except Exception:
+        return 0.0
+
+def get_vote_weight(proposal: Proposal, wallet: str, live_fallback: bool = False) -> float:
+    """Voting weight for a wallet on a proposal, from its balance snapshot
+
+    Proposals created before snapshots, or whose snapshot failed, have none;
+    their weight is the live balance, one RPC call per vote, and only when
+    the caller opts in with live_fallback.
+    """
+    if proposal.snapshot_status == "pending":
+        raise HTTPException(409, "Voting snapshot is still being built, try again shortly")
+    if proposal.snapshot_status == "ready":
+        snapshot = voting_snapshots.get(proposal.id)
+        if snapshot is not None:
+            return snapshot.weight(wallet)
+    if not live_fallback:
+        raise HTTPException(409, "Proposal has no voting snapshot; cast this vote individually")
+    return get_live_sio_balance(wallet)
+
+def _on_snapshot_ready(proposal_id: str, snapshot):
+    if snapshot is None:
+        event = make_event("voting_snapshot_failed", {"proposal_id": proposal_id})
+    else:
+        event = make_event("voting_snapshot_ready", {
+            "proposal_id": proposal_id,
+            "slot": snapshot.slot,
+            "holders": len(snapshot),
+            "total_power": snapshot.total
+        })
+    governance_store.transact(lambda store: [event])
 
 @router.get("/api/governance/proposals")
-async def get_proposals():
-    """Get all governance proposals"""
-    active_proposals = []
+async def get_proposals(status: Optional[str] = None, cursor: Optional[int] = None, limit: int = 20):
+    """Get governance proposals, newest first, with cursor pagination"""
+    if limit < 1 or limit > 100:
+        raise HTTPException(400, "limit must be between 1 and 100")
+    
+    governance_store.refresh()
+    governance_store.finalize_due()
+    page, next_cursor = governance_store.page(status, cursor, limit)
     
-    for proposal in proposals.values():
-        # Update status if voting period ended
-        if proposal.end_time < datetime.now() and proposal.status == "active":
-            if proposal.yes_votes > proposal.no_votes:
-                proposal.status = "passed"
-            else:
-                proposal.status = "rejected"
-        
+    active_proposals = []
+    for proposal in page:
         active_proposals.append({
             "id": proposal.id,
             "title": proposal.title,
@@ -93,16 +150,26 @@ async def get_proposals():
             "no_percentage": (proposal.no_votes / proposal.total_votes * 100) if proposal.total_votes > 0 else 0
         })
     
-    return {"proposals": active_proposals}
+    return {"proposals": active_proposals, "next_cursor": next_cursor}
 
 @router.get("/api/governance/user/{wallet}")
 async def get_user_governance_info(wallet: str):
     """Get user's governance information"""
-    # Calculate voting power based on staked tokens (mock calculation)
-    staked_amount = 15000  # This would come from staking API
-    total_supply = 25000000  # Circulating supply
-    voting_power = (staked_amount / total_supply) * 100
+    sio_balance = get_live_sio_balance(wallet)
+    staked_amount = sum(stake["amount"] for stake in staking_ledger.wallet_stakes(wallet).values())
+    voting_power = (sio_balance / CIRCULATING_SUPPLY) * 100
+    
+    governance_store.refresh()
     
+    # Weight this wallet would vote with on each open proposal
+    proposal_power = {}
+    for number in list(governance_store.status_index.get("active", [])):
+        proposal = proposals[governance_store.proposal_order[number]]
+        if proposal.snapshot_status == "ready":
+            snapshot = voting_snapshots.get(proposal.id)
+            if snapshot is not None:
+                proposal_power[proposal.id] = snapshot.weight(wallet)
+
     user_votes_list = []
     if wallet in user_votes:
         for proposal_id, vote_info in user_votes[wallet].items():
@@ -116,19 +183,19 @@ async def get_user_governance_info(wallet: str):
                 })
     
     return {
-        "sio_balance": staked_amount,
-        "staked_amount": staked_amount * 0.8,
+        "sio_balance": sio_balance,
+        "staked_amount": staked_amount,
         "voting_power": voting_power,
+        "proposal_voting_power": proposal_power,
         "votes_cast": user_votes_list
     }
 
-@router.post("/api/governance/vote")
-async def cast_vote(request: VoteRequest):
-    """Cast a vote on a proposal"""
-    if request.proposal_id not in proposals:
+def validate_vote(store, vote: dict):
+    """Reject votes on closed proposals and repeat votes; runs under the writer's log lock"""
+    if vote["proposal_id"] not in store.proposals:
         raise HTTPException(404, "Proposal not found")
     
-    proposal = proposals[request.proposal_id]
+    proposal = store.proposals[vote["proposal_id"]]
     
     if proposal.status != "active":
         raise HTTPException(400, "Voting period has ended")
@@ -136,39 +203,119 @@ async def cast_vote(request: VoteRequest):
     if proposal.end_time < datetime.now():
         raise HTTPException(400, "Voting period has expired")
     
-    # Check if user already voted
-    if request.wallet in user_votes and request.proposal_id in user_votes[request.wallet]:
+    # user_votes doubles as the (wallet, proposal) index
+    if vote["proposal_id"] in store.user_votes.get(vote["wallet"], {}):
         raise HTTPException(400, "Already voted on this proposal")
+
+vote_ingestor = VoteIngestor(governance_store, validate_vote)
+
+def prepare_vote(request: VoteRequest, live_fallback: bool = False) -> dict:
+    """Resolve a vote's snapshot weight before it is queued"""
+    if request.proposal_id not in proposals:
+        raise HTTPException(404, "Proposal not found")
     
-    # Record the vote
-    if request.wallet not in user_votes:
-        user_votes[request.wallet] = {}
+    weight = get_vote_weight(proposals[request.proposal_id], request.wallet, live_fallback)
+    if weight <= 0:
+        raise HTTPException(400, "No S-IO voting power at the proposal snapshot")
     
-    user_votes[request.wallet][request.proposal_id] = {
+    return {
+        "proposal_id": request.proposal_id,
+        "wallet": request.wallet,
         "vote": request.vote,
-        "amount": request.amount
+        "amount": weight
     }
-    
-    # Update proposal vote counts
-    if request.vote:
-        proposal.yes_votes += request.amount
-    else:
-        proposal.no_votes += request.amount
-    
-    proposal.total_votes += request.amount
+
+@router.post("/api/governance/vote")
+async def cast_vote(request: VoteRequest):
+    """Cast a vote on a proposal"""
+    governance_store.refresh()
+    # A proposal without a snapshot may need a blocking live balance lookup
+    vote = await run_in_threadpool(prepare_vote, request, True)
+    await asyncio.wrap_future(vote_ingestor.submit(vote))
     
     return {
         "success": True,
-        "message": f"Vote cast successfully: {'Yes' if request.vote else 'No'} with {request.amount} S-IO",
+        "message": f"Vote cast successfully: {'Yes' if request.vote else 'No'} with {vote['amount']} S-IO",
         "transaction_id": f"vote_{datetime.now().timestamp()}"
     }
 
+@router.post("/api/governance/votes")
+async def cast_votes(request: BulkVoteRequest):
+    """Submit many votes at once, e.g. from a relayer; each vote succeeds or fails on its own"""
+    if len(request.votes) > MAX_BULK_VOTES:
+        raise HTTPException(400, f"At most {MAX_BULK_VOTES} votes per request")
+    
+    governance_store.refresh()
+    # Snapshot weights only: live balances would mean one blocking RPC call per vote
+    results = [None] * len(request.votes)
+    prepared, positions = [], []
+    for i, vote_request in enumerate(request.votes):
+        try:
+            prepared.append(prepare_vote(vote_request))
+            positions.append(i)
+        except HTTPException as e:
+            results[i] = {"proposal_id": vote_request.proposal_id, "wallet": vote_request.wallet,
+                          "success": False, "error": e.detail}
+    
+    futures = vote_ingestor.submit_many(prepared)
+    for i, vote, future in zip(positions, prepared, futures):
+        try:
+            await asyncio.wrap_future(future)
+            results[i] = {"proposal_id": vote["proposal_id"], "wallet": vote["wallet"],
+                          "success": True, "amount": vote["amount"]}
+        except HTTPException as e:
+            results[i] = {"proposal_id": vote["proposal_id"], "wallet": vote["wallet"],
+                          "success": False, "error": e.detail}
+    
+    accepted = sum(1 for r in results if r["success"])
+    return {"accepted": accepted, "rejected": len(results) - accepted, "results": results}
+
+@router.get("/api/governance/proposals/{proposal_id}/tally")
+async def get_tally(proposal_id: str):
+    """Current tally; never waits behind an in-flight vote batch"""
+    governance_store.refresh(wait=False)
+    tally = governance_store.tallies.get(proposal_id)
+    if tally is None:
+        raise HTTPException(404, "Proposal not found")
+    
+    yes_votes, no_votes, total_votes, voters = tally
+    return {
+        "proposal_id": proposal_id,
+        "yes_votes": yes_votes,
+        "no_votes": no_votes,
+        "total_votes": total_votes,
+        "voters": voters,
+        "yes_percentage": (yes_votes / total_votes * 100) if total_votes > 0 else 0,
+        "no_percentage": (no_votes / total_votes * 100) if total_votes > 0 else 0
+    }
+
+def live_tallies() -> dict:
+    """Tallies of active proposals, polled by the live hub"""
+    governance_store.refresh(wait=False)
+    active = [governance_store.proposal_order[n] for n in list(governance_store.status_index.get("active", ()))]
+    return {
+        proposal_id: dict(zip(("yes_votes", "no_votes", "total_votes", "voters"), governance_store.tallies[proposal_id]))
+        for proposal_id in active
+    }
+
+live_hub.add_source("governance", live_tallies, 2)
+
+@router.get("/api/governance/tallies")
+async def get_live_tallies():
+    """Tallies of active proposals, for clients that cannot hold the live stream"""
+    return live_tallies()
+
+@router.get("/api/governance/ingestion/stats")
+async def get_ingestion_stats():
+    """Vote writer queue depth and batch counters for this worker"""
+    return vote_ingestor.stats()
+
 @router.post("/api/governance/propose")
 async def create_proposal(request: CreateProposalRequest):
     """Create a new governance proposal"""
     # Check if user has enough tokens to create proposal (minimum 1000 S-IO)
     min_tokens = 1000
-    user_balance = 15000  # This would come from token balance API
+    user_balance = get_live_sio_balance(request.wallet)
     
     if user_balance < min_tokens:
         raise HTTPException(400, f"Minimum {min_tokens} S-IO required to create proposal")
@@ -181,10 +328,16 @@ async def create_proposal(request: CreateProposalRequest):
         description=request.description,
         proposer=f"{request.wallet[:4]}...{request.wallet[-4:]}",
         end_time=datetime.now() + timedelta(days=7),
-        created_at=datetime.now()
+        created_at=datetime.now(),
+        snapshot_status="pending"
     )
     
-    proposals[proposal_id] = new_proposal
+    governance_store.transact(lambda store: [
+        make_event("proposal_created", proposal_to_dict(new_proposal))
+    ])
+    
+    # Capture holder balances now; votes are weighted from this snapshot
+    voting_snapshots.schedule(proposal_id, SIO_TOKEN_MINT, _on_snapshot_ready)
     
     return {
         "success": True,
@@ -195,16 +348,15 @@ async def create_proposal(request: CreateProposalRequest):
 @router.get("/api/governance/stats")
 async def get_governance_stats():
     """Get governance statistics"""
-    total_proposals = len(proposals)
-    active_proposals = len([p for p in proposals.values() if p.status == "active"])
-    passed_proposals = len([p for p in proposals.values() if p.status == "passed"])
-    
-    total_votes_cast = sum(p.total_votes for p in proposals.values())
+    governance_store.refresh()
+    governance_store.finalize_due()
     
     return {
-        "total_proposals": total_proposals,
-        "active_proposals": active_proposals,
-        "passed_proposals": passed_proposals,
-        "total_votes_cast": total_votes_cast,
+        "total_proposals": len(proposals),
+        "active_proposals": governance_store.status_counts.get("active", 0),
+        "passed_proposals": governance_store.status_counts.get("passed", 0),
+        "rejected_proposals": governance_store.status_counts.get("rejected", 0),
+        "total_votes_cast": governance_store.total_votes_cast,
+        "votes_recorded": governance_store.vote_count,
         "participation_rate": 65.4  # Mock participation rate
-    }
\ No newline at end of file
+    }
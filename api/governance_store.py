@@ -0,0 +1,391 @@
+"""
+Event-sourced governance store
+Proposals and votes are recorded in an append-only event log shared by all
+workers, with group-committed fsyncs and periodic compact snapshots so
+startup only replays the tail of the log
+"""
+
+import bisect
+import heapq
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process only
+    fcntl = None
+
+GOVERNANCE_DATA_DIR = os.getenv("GOVERNANCE_DATA_DIR", "governance_data")
+FSYNC_INTERVAL = 0.05      # Seconds between group fsyncs
+FSYNC_BATCH = 256          # Pending events that force an immediate fsync
+SNAPSHOT_EVERY = 10000     # Events between snapshots
+EXPIRY_POLL = 30.0         # Longest the expiry scheduler sleeps before rechecking the log
+
+
+class Proposal(BaseModel):
+    id: str
+    title: str
+    description: str
+    proposer: str
+    yes_votes: float = 0
+    no_votes: float = 0
+    total_votes: float = 0
+    end_time: datetime
+    status: str = "active"
+    created_at: datetime
+    snapshot_status: str = "none"  # none | pending | ready | failed
+    snapshot_slot: Optional[int] = None
+
+
+class EventLog:
+    """Append-only JSON-lines file with cross-process locking and batched fsync"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._thread_lock = threading.RLock()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    @contextmanager
+    def locked(self, exclusive: bool = True):
+        """Hold the in-process lock plus an flock on the log file"""
+        with self._thread_lock:
+            if fcntl is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def try_shared(self):
+        """Yield True with a shared lock held, or False at once if a writer holds it"""
+        if not self._thread_lock.acquire(blocking=False):
+            yield False
+            return
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(self.fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    yield False
+                    return
+            try:
+                yield True
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self.fd, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+    def size(self) -> int:
+        return os.fstat(self.fd).st_size
+
+    def read_from(self, offset: int) -> Tuple[List[Dict], int]:
+        """Read complete events after offset; returns (events, new offset)"""
+        end = self.size()
+        if end <= offset:
+            return [], offset
+        data = os.pread(self.fd, end - offset, offset)
+        complete = data.rfind(b"\n") + 1
+        events = [json.loads(line) for line in data[:complete].splitlines() if line]
+        return events, offset + complete
+
+    def append(self, events: List[Dict]) -> int:
+        """Write events in one append; durability follows at the next group fsync"""
+        data = "".join(json.dumps(event, separators=(",", ":")) + "\n" for event in events).encode()
+        os.write(self.fd, data)
+        with self._cond:
+            self._pending += len(events)
+            if self._pending >= FSYNC_BATCH:
+                self._cond.notify()
+        return self.size()
+
+    def sync(self):
+        with self._cond:
+            self._pending = 0
+        os.fsync(self.fd)
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait(FSYNC_INTERVAL)
+                pending = self._pending
+                self._pending = 0
+            if pending:
+                os.fsync(self.fd)
+
+
+def proposal_to_dict(proposal: Proposal) -> Dict:
+    """JSON-ready dict of a proposal's fields"""
+    return {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in vars(proposal).items()}
+
+
+class GovernanceStore:
+    """In-memory governance state rebuilt from the latest snapshot plus the log tail"""
+
+    def __init__(self, directory: str = GOVERNANCE_DATA_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.log = EventLog(os.path.join(directory, "events.log"))
+        self.snapshot_path = os.path.join(directory, "snapshot.json")
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.proposals: Dict[str, Proposal] = {}
+        self.user_votes: Dict[str, Dict[str, Dict]] = {}  # {wallet: {proposal_id: {vote, amount}}}
+        self.user_voting_power: Dict[str, float] = {}
+        # Derived indexes, rebuilt from proposals on restore
+        self.proposal_order: List[str] = []                 # Creation order; position is the cursor
+        self.proposal_number: Dict[str, int] = {}
+        self.status_index: Dict[str, List[int]] = {}        # {status: sorted creation numbers}
+        self.status_counts: Dict[str, int] = {}
+        self.expiry_heap: List[Tuple[float, str]] = []      # (end_time, proposal_id), lazily pruned
+        self.tallies: Dict[str, Tuple[float, float, float, int]] = {}  # {id: (yes, no, total, voters)}
+        self.total_votes_cast = 0.0
+        self.vote_count = 0
+        self.seq = 0
+        self.offset = 0
+        self.events_since_snapshot = 0
+
+    def _load(self):
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r") as f:
+                snapshot = json.load(f)
+            if snapshot["offset"] <= self.log.size():
+                self._restore(snapshot)
+        with self.log.locked(exclusive=False):
+            self._catch_up()
+
+    def _restore(self, snapshot: Dict):
+        self.seq = snapshot["seq"]
+        self.offset = snapshot["offset"]
+        self.user_votes = snapshot["user_votes"]
+        self.user_voting_power = snapshot["user_voting_power"]
+        for data in snapshot["proposals"]:
+            self._add_proposal(Proposal(**data))
+        self.vote_count = snapshot.get("vote_count", 0)
+        voters: Dict[str, int] = {}
+        for votes in self.user_votes.values():
+            for proposal_id in votes:
+                voters[proposal_id] = voters.get(proposal_id, 0) + 1
+        for proposal_id, count in voters.items():
+            if proposal_id in self.tallies:
+                yes, no, total, _ = self.tallies[proposal_id]
+                self.tallies[proposal_id] = (yes, no, total, count)
+
+    def _catch_up(self):
+        """Apply events appended by this or any other worker since our offset"""
+        events, self.offset = self.log.read_from(self.offset)
+        for event in events:
+            self.apply(event)
+
+    def refresh(self, wait: bool = True):
+        """Bring state up to date with the shared log before a read
+
+        With wait=False a read that would queue behind a writer keeps the
+        state it already has instead.
+        """
+        if self.log.size() == self.offset:
+            return
+        if wait:
+            with self.log.locked(exclusive=False):
+                self._catch_up()
+            return
+        with self.log.try_shared() as acquired:
+            if acquired:
+                self._catch_up()
+
+    def transact(self, build: Callable[["GovernanceStore"], List[Dict]]) -> List[Dict]:
+        """Validate and append events atomically across workers
+
+        build runs against up-to-date state under the exclusive log lock and
+        returns the events to write; it may raise to reject the request.
+        """
+        with self.log.locked():
+            self._catch_up()
+            events = build(self)
+            if not events:
+                return []
+            for event in events:
+                self.seq += 1
+                event["seq"] = self.seq
+            self.offset = self.log.append(events)
+            for event in events:
+                self.apply(event)
+            if self.events_since_snapshot >= SNAPSHOT_EVERY:
+                self.snapshot()
+            return events
+
+    def apply(self, event: Dict):
+        """Fold a single event into the in-memory state"""
+        self.seq = max(self.seq, event.get("seq", 0))
+        self.events_since_snapshot += 1
+        data = event["data"]
+        kind = event["type"]
+
+        if kind == "proposal_created":
+            self._add_proposal(Proposal(**data))
+        elif kind == "proposal_finalized":
+            proposal = self.proposals.get(data["proposal_id"])
+            if proposal is not None and proposal.status == "active":
+                self._set_status(proposal, data["status"])
+        elif kind == "vote_cast":
+            proposal = self.proposals.get(data["proposal_id"])
+            if proposal is None:
+                return
+            self.user_votes.setdefault(data["wallet"], {})[data["proposal_id"]] = {
+                "vote": data["vote"],
+                "amount": data["amount"]
+            }
+            if data["vote"]:
+                proposal.yes_votes += data["amount"]
+            else:
+                proposal.no_votes += data["amount"]
+            proposal.total_votes += data["amount"]
+            # Published as one tuple so lock-free readers never see a half-applied vote
+            self.tallies[proposal.id] = (proposal.yes_votes, proposal.no_votes, proposal.total_votes,
+                                         self.tallies[proposal.id][3] + 1)
+            self.total_votes_cast += data["amount"]
+            self.vote_count += 1
+        elif kind == "voting_snapshot_ready":
+            proposal = self.proposals.get(data["proposal_id"])
+            if proposal is not None:
+                proposal.snapshot_status = "ready"
+                proposal.snapshot_slot = data["slot"]
+        elif kind == "voting_snapshot_failed":
+            proposal = self.proposals.get(data["proposal_id"])
+            if proposal is not None:
+                proposal.snapshot_status = "failed"
+        elif kind == "voting_power_set":
+            self.user_voting_power[data["wallet"]] = data["voting_power"]
+
+    def _add_proposal(self, proposal: Proposal):
+        if proposal.id in self.proposals:
+            return
+        number = len(self.proposal_order)
+        self.proposals[proposal.id] = proposal
+        self.proposal_order.append(proposal.id)
+        self.proposal_number[proposal.id] = number
+        self.status_index.setdefault(proposal.status, []).append(number)
+        self.status_counts[proposal.status] = self.status_counts.get(proposal.status, 0) + 1
+        self.tallies[proposal.id] = (proposal.yes_votes, proposal.no_votes, proposal.total_votes, 0)
+        self.total_votes_cast += proposal.total_votes
+        if proposal.status == "active":
+            heapq.heappush(self.expiry_heap, (proposal.end_time.timestamp(), proposal.id))
+
+    def _set_status(self, proposal: Proposal, status: str):
+        number = self.proposal_number[proposal.id]
+        numbers = self.status_index[proposal.status]
+        del numbers[bisect.bisect_left(numbers, number)]
+        self.status_counts[proposal.status] -= 1
+        bisect.insort(self.status_index.setdefault(status, []), number)
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        proposal.status = status
+
+    def page(self, status: Optional[str] = None, cursor: Optional[int] = None,
+             limit: int = 20) -> Tuple[List[Proposal], Optional[int]]:
+        """Newest-first proposals created before cursor; returns (page, next cursor)"""
+        if status is None:
+            index = range(len(self.proposal_order))
+        else:
+            index = self.status_index.get(status, [])
+        end = len(index) if cursor is None else bisect.bisect_left(index, cursor)
+        start = max(0, end - limit)
+        page = [self.proposals[self.proposal_order[n]] for n in reversed(index[start:end])]
+        next_cursor = index[start] if start > 0 else None
+        return page, next_cursor
+
+    def next_expiry(self) -> Optional[float]:
+        """Earliest deadline in the heap; may belong to a proposal finalised by another worker"""
+        heap = self.expiry_heap
+        return heap[0][0] if heap else None
+
+    def _prune_expiry(self) -> Optional[float]:
+        """Earliest pending deadline, discarding heap entries for finalised proposals"""
+        while self.expiry_heap:
+            end_time, proposal_id = self.expiry_heap[0]
+            proposal = self.proposals.get(proposal_id)
+            if proposal is not None and proposal.status == "active":
+                return end_time
+            heapq.heappop(self.expiry_heap)
+        return None
+
+    def finalize_due(self, now: Optional[float] = None) -> List[Dict]:
+        """Record the outcome of every active proposal whose voting period has ended"""
+        now = time.time() if now is None else now
+        deadline = self.next_expiry()
+        if deadline is None or deadline > now:
+            return []
+
+        def build(store):
+            events = []
+            while True:
+                deadline = store._prune_expiry()
+                if deadline is None or deadline > now:
+                    return events
+                _, proposal_id = heapq.heappop(store.expiry_heap)
+                proposal = store.proposals[proposal_id]
+                events.append(make_event("proposal_finalized", {
+                    "proposal_id": proposal_id,
+                    "status": "passed" if proposal.yes_votes > proposal.no_votes else "rejected",
+                    "yes_votes": proposal.yes_votes,
+                    "no_votes": proposal.no_votes
+                }))
+
+        return self.transact(build)
+
+    def start_expiry_scheduler(self):
+        """Finalise proposals at their deadline from a background thread"""
+        def run():
+            while True:
+                try:
+                    self.refresh()
+                    self.finalize_due()
+                    deadline = self.next_expiry()
+                except Exception as e:
+                    print(f"Governance expiry scheduler error: {e}")
+                    deadline = None
+                delay = EXPIRY_POLL if deadline is None else deadline - time.time()
+                time.sleep(min(max(delay, 0.05), EXPIRY_POLL))
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def snapshot(self):
+        """Write a compact snapshot of the current state; caller holds the log lock"""
+        self.log.sync()
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "seq": self.seq,
+                "offset": self.offset,
+                "proposals": [proposal_to_dict(p) for p in self.proposals.values()],
+                "user_votes": self.user_votes,
+                "user_voting_power": self.user_voting_power,
+                "vote_count": self.vote_count
+            }, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        self.events_since_snapshot = 0
+
+
+def make_event(kind: str, data: Dict) -> Dict:
+    return {"type": kind, "ts": datetime.now().isoformat(), "data": data}
+
+
+# Global governance store instance
+governance_store = GovernanceStore()
@@ -11,6 +11,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+try:
+    from jupiter_quotes import router as jupiter_quotes_router
+    app.include_router(jupiter_quotes_router)
+except ImportError:
+    pass
+
 @app.get("/api/sio/balance/{wallet}")
 def get_sio_balance(wallet: str):
     return {"balance": 51970.694744, "wallet": wallet}
@@ -0,0 +1,299 @@
+"""
+Technical indicator engine
+Vectorised SMA/EMA/RSI/VWAP/Bollinger/volatility over candle closes, with
+O(1) streaming updates and a per (symbol, timeframe, params) cache
+"""
+
+import math
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from candle_store import CandleStore, RESOLUTIONS, candle_store
+
+SECONDS_PER_YEAR = 365 * 86400
+MAX_STREAMS = 1024          # Streaming states kept, least recently used evicted
+MAX_SERIES = 256            # Cached indicator series kept
+DECAY_FLOOR = 1e-100        # Smallest decay power within one smoothing block
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """Simple moving average; the first period-1 entries are NaN"""
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        csum = np.cumsum(np.insert(values, 0, 0.0))
+        out[period - 1:] = (csum[period:] - csum[:-period]) / period
+    return out
+
+
+def smooth(values: np.ndarray, alpha: float, seed: float) -> np.ndarray:
+    """y[i] = alpha * x[i] + (1 - alpha) * y[i - 1] with y[-1] = seed
+
+    Unrolled as y[t] = d^(t+1) * (seed + alpha * sum(x[j] / d^(j+1))); blocks
+    are cut short enough that the decay powers d^k stay representable.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty(len(values))
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[:] = values
+        return out
+    block = max(1, int(math.log(DECAY_FLOOR) / math.log(decay)))
+    carry = float(seed)
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        out[start:start + len(chunk)] = powers * (carry + alpha * np.cumsum(chunk / powers))
+        carry = out[start + len(chunk) - 1]
+    return out
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    """Exponential moving average seeded with the first value"""
+    if not len(values):
+        return np.empty(0)
+    return smooth(values, 2.0 / (period + 1), values[0])
+
+
+def rsi(values: np.ndarray, period: int) -> np.ndarray:
+    """Wilder's relative strength index"""
+    out = np.full(len(values), np.nan)
+    if len(values) <= period:
+        return out
+    deltas = np.diff(values)
+    gains = np.clip(deltas, 0, None)
+    losses = np.clip(-deltas, 0, None)
+    # Wilder smoothing is an EMA with alpha 1/period seeded by the first window's mean
+    gain_seed, loss_seed = gains[:period].mean(), losses[:period].mean()
+    avg_gain = np.concatenate(([gain_seed], smooth(gains[period:], 1.0 / period, gain_seed)))
+    avg_loss = np.concatenate(([loss_seed], smooth(losses[period:], 1.0 / period, loss_seed)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[period:] = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+    return out
+
+
+def vwap(prices: np.ndarray, volumes: np.ndarray, period: int) -> np.ndarray:
+    """Rolling volume-weighted average price over the last period candles"""
+    out = np.full(len(prices), np.nan)
+    if len(prices) >= period:
+        pv = np.cumsum(np.insert(prices * volumes, 0, 0.0))
+        v = np.cumsum(np.insert(volumes, 0, 0.0))
+        window_v = v[period:] - v[:-period]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[period - 1:] = np.where(window_v > 0, (pv[period:] - pv[:-period]) / window_v, np.nan)
+    return out
+
+
+def bollinger(values: np.ndarray, period: int, num_std: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bollinger bands (lower, middle, upper) using population standard deviation"""
+    middle = sma(values, period)
+    std = np.full(len(values), np.nan)
+    if len(values) >= period:
+        csum2 = np.cumsum(np.insert(values * values, 0, 0.0))
+        mean_sq = (csum2[period:] - csum2[:-period]) / period
+        std[period - 1:] = np.sqrt(np.maximum(mean_sq - middle[period - 1:] ** 2, 0.0))
+    return middle - num_std * std, middle, middle + num_std * std
+
+
+def volatility(values: np.ndarray, period: int, interval: int) -> np.ndarray:
+    """Annualised rolling standard deviation of log returns"""
+    out = np.full(len(values), np.nan)
+    if len(values) <= period:
+        return out
+    returns = np.diff(np.log(values))
+    mean = sma(returns, period)
+    csum2 = np.cumsum(np.insert(returns * returns, 0, 0.0))
+    mean_sq = (csum2[period:] - csum2[:-period]) / period
+    std = np.sqrt(np.maximum(mean_sq - mean[period - 1:] ** 2, 0.0))
+    out[period:] = std * math.sqrt(SECONDS_PER_YEAR / interval)
+    return out
+
+
+def _rsi_value(avg_gain: float, avg_loss: float) -> float:
+    if avg_loss == 0:
+        return 100.0
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def _clean(value) -> Optional[float]:
+    value = float(value)
+    return None if math.isnan(value) else round(value, 6)
+
+
+class StreamingIndicators:
+    """Running indicator state updated in O(1) per closed candle"""
+
+    def __init__(self, period: int, num_std: float, interval: int):
+        self.period = period
+        self.num_std = num_std
+        self.interval = interval
+        self.alpha = 2.0 / (period + 1)
+        self.window = deque(maxlen=period)
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.pv_window = deque(maxlen=period)
+        self.pv_sum = 0.0
+        self.v_sum = 0.0
+        self.returns = deque(maxlen=period)
+        self.ret_sum = 0.0
+        self.ret_sum_sq = 0.0
+        self.ema = None
+        self.prev_close = None
+        self.gains = 0.0
+        self.losses = 0.0
+        self.avg_gain = None
+        self.avg_loss = None
+        self.count = 0
+        self.last_timestamp = None
+
+    def update(self, price: float, volume: float, timestamp: Optional[int] = None):
+        """Fold one closed candle into the running state"""
+        if len(self.window) == self.period:
+            old = self.window[0]
+            self.sum -= old
+            self.sum_sq -= old * old
+            old_p, old_v = self.pv_window[0]
+            self.pv_sum -= old_p * old_v
+            self.v_sum -= old_v
+        self.window.append(price)
+        self.sum += price
+        self.sum_sq += price * price
+        self.pv_window.append((price, volume))
+        self.pv_sum += price * volume
+        self.v_sum += volume
+
+        self.ema = price if self.ema is None else self.alpha * price + (1 - self.alpha) * self.ema
+
+        if self.prev_close is not None:
+            delta = price - self.prev_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            if self.avg_gain is None:
+                self.gains += gain
+                self.losses += loss
+                if self.count == self.period:
+                    self.avg_gain = self.gains / self.period
+                    self.avg_loss = self.losses / self.period
+            else:
+                self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+                self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+            ret = math.log(price / self.prev_close) if self.prev_close > 0 and price > 0 else 0.0
+            if len(self.returns) == self.period:
+                old_ret = self.returns[0]
+                self.ret_sum -= old_ret
+                self.ret_sum_sq -= old_ret * old_ret
+            self.returns.append(ret)
+            self.ret_sum += ret
+            self.ret_sum_sq += ret * ret
+
+        self.prev_close = price
+        self.count += 1
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+
+    def values(self) -> Dict[str, Optional[float]]:
+        """Current indicator values, None until enough candles have been seen"""
+        full = len(self.window) == self.period
+        mean = self.sum / self.period if full else None
+        std = math.sqrt(max(self.sum_sq / self.period - mean * mean, 0.0)) if full else None
+
+        vol = None
+        if len(self.returns) == self.period:
+            r_mean = self.ret_sum / self.period
+            r_std = math.sqrt(max(self.ret_sum_sq / self.period - r_mean * r_mean, 0.0))
+            vol = r_std * math.sqrt(SECONDS_PER_YEAR / self.interval)
+
+        return {
+            "price": _clean(self.prev_close) if self.prev_close is not None else None,
+            "sma": _clean(mean) if full else None,
+            "ema": _clean(self.ema) if self.ema is not None else None,
+            "rsi": _clean(_rsi_value(self.avg_gain, self.avg_loss)) if self.avg_gain is not None else None,
+            "vwap": _clean(self.pv_sum / self.v_sum) if full and self.v_sum > 0 else None,
+            "bollinger_upper": _clean(mean + self.num_std * std) if full else None,
+            "bollinger_middle": _clean(mean) if full else None,
+            "bollinger_lower": _clean(mean - self.num_std * std) if full else None,
+            "volatility": _clean(vol) if vol is not None else None
+        }
+
+
+class IndicatorEngine:
+    """Computes and caches indicators per (symbol, timeframe, params)"""
+
+    def __init__(self, store: CandleStore):
+        self.store = store
+        # Keys come from request parameters, so both caches are LRU-bounded
+        self._streams: "OrderedDict[Tuple, StreamingIndicators]" = OrderedDict()
+        self._series_cache: "OrderedDict[Tuple, Tuple[Tuple, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def latest(self, symbol: str, timeframe: str = "1h", period: int = 14,
+               num_std: float = 2.0) -> Dict[str, Optional[float]]:
+        """Latest indicator values, advancing the streaming state with new closed candles"""
+        key = (symbol, timeframe, period, num_std)
+        interval = RESOLUTIONS[timeframe]
+
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = StreamingIndicators(period, num_std, interval)
+                self._streams[key] = stream
+                if len(self._streams) > MAX_STREAMS:
+                    self._streams.popitem(last=False)
+            self._streams.move_to_end(key)
+
+            # Only closed candles are folded in; the open candle is still moving
+            start = None if stream.last_timestamp is None else stream.last_timestamp + interval
+            candles = self.store.query(symbol, timeframe, start=start)
+            closed = len(candles["timestamp"]) - 1
+            if closed > 0:
+                for price, volume, ts in zip(candles["close"][:closed].tolist(),
+                                             candles["volume"][:closed].tolist(),
+                                             candles["timestamp"][:closed].tolist()):
+                    stream.update(price, volume, ts)
+            return stream.values()
+
+    def series(self, symbol: str, timeframe: str = "1h", period: int = 14,
+               num_std: float = 2.0, limit: Optional[int] = None) -> Dict[str, list]:
+        """Full indicator series over the stored history, cached until a new candle arrives"""
+        key = (symbol, timeframe, period, num_std, limit)
+        candles = self.store.query(symbol, timeframe, limit=limit)
+        if not len(candles["timestamp"]):
+            return {}
+        stamp = (int(candles["timestamp"][-1]), float(candles["close"][-1]))
+
+        with self._lock:
+            cached = self._series_cache.get(key)
+            if cached and cached[0] == stamp:
+                self._series_cache.move_to_end(key)
+                return cached[1]
+
+        close = candles["close"]
+        lower, middle, upper = bollinger(close, period, num_std)
+        result = {
+            "timestamp": np.datetime_as_string(candles["timestamp"].astype("datetime64[s]")).tolist(),
+            "close": close.tolist(),
+            "sma": sma(close, period),
+            "ema": ema(close, period),
+            "rsi": rsi(close, period),
+            "vwap": vwap(close, candles["volume"], period),
+            "bollinger_upper": upper,
+            "bollinger_middle": middle,
+            "bollinger_lower": lower,
+            "volatility": volatility(close, period, RESOLUTIONS[timeframe])
+        }
+        for name, values in result.items():
+            if isinstance(values, np.ndarray):
+                result[name] = [None if math.isnan(v) else round(v, 6) for v in values.tolist()]
+
+        with self._lock:
+            self._series_cache[key] = (stamp, result)
+            self._series_cache.move_to_end(key)
+            if len(self._series_cache) > MAX_SERIES:
+                self._series_cache.popitem(last=False)
+        return result
+
+
+# Global indicator engine instance
+indicator_engine = IndicatorEngine(candle_store)
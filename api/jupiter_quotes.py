@@ -0,0 +1,204 @@
+"""
+Jupiter quote proxy
+Short-TTL quote cache keyed by (inputMint, outputMint, amount bucket, slippageBps)
+with request coalescing and optional interpolation across cached buckets
+"""
+
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+from fastapi import APIRouter, HTTPException
+
+router = APIRouter()
+
+# Point at a local stand-in for testing, e.g. http://localhost:8080/v6/quote
+JUPITER_QUOTE_URL = os.getenv("JUPITER_QUOTE_URL", "https://quote-api.jup.ag/v6/quote")
+QUOTE_TTL = 5              # Seconds a quote stays fresh
+BUCKET_STEP = 0.05         # Amount buckets are 5% wide on a log scale
+MAX_ENTRIES = 10000
+FETCH_TIMEOUT = 10
+
+QuoteKey = Tuple[str, str, int, int]
+
+
+def amount_bucket(amount: int) -> int:
+    """Log-scale bucket index for a raw token amount"""
+    if amount <= 0:
+        return 0
+    return int(math.floor(math.log(amount) / math.log1p(BUCKET_STEP)))
+
+
+def fetch_jupiter_quote(params: Dict) -> Dict:
+    """Fetch a quote from the Jupiter quote API"""
+    response = requests.get(JUPITER_QUOTE_URL, params=params, timeout=FETCH_TIMEOUT)
+    # Error bodies (no route, rate limited) must not be handed out as quotes
+    response.raise_for_status()
+    return response.json()
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[Dict] = None
+        self.error: Optional[Exception] = None
+
+
+class QuoteCache:
+    """Caches Jupiter quotes and collapses identical concurrent requests"""
+
+    def __init__(self, fetch: Callable[[Dict], Dict] = fetch_jupiter_quote,
+                 ttl: float = QUOTE_TTL, max_entries: int = MAX_ENTRIES):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[QuoteKey, Tuple[float, int, Dict]] = {}  # key -> (expires, amount, quote)
+        self._in_flight: Dict[Tuple, _InFlight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_quote(self, input_mint: str, output_mint: str, amount: int,
+                  slippage_bps: int = 50, approximate: bool = False) -> Dict:
+        """Return a quote for the exact amount, or an interpolated one when approximate"""
+        amount = int(amount)
+        key = (input_mint, output_mint, amount_bucket(amount), int(slippage_bps))
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now and (approximate or entry[1] == amount):
+                self.hits += 1
+                return entry[2] if entry[1] == amount else _scale_quote(entry[2], entry[1], amount)
+
+            if approximate:
+                estimate = self._interpolate(input_mint, output_mint, amount, int(slippage_bps), now)
+                if estimate is not None:
+                    self.hits += 1
+                    return estimate
+
+            flight_key = key + (amount,)
+            flight = self._in_flight.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = _InFlight()
+                self._in_flight[flight_key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait(FETCH_TIMEOUT + 1)
+            if flight.error is not None:
+                raise flight.error
+            if flight.result is None:
+                raise TimeoutError("Timed out waiting for coalesced quote")
+            return flight.result
+
+        try:
+            quote = self.fetch({
+                "inputMint": input_mint,
+                "outputMint": output_mint,
+                "amount": amount,
+                "slippageBps": int(slippage_bps)
+            })
+            if "outAmount" in quote:
+                with self._lock:
+                    if len(self._entries) >= self.max_entries:
+                        self._prune(now)
+                    self._entries[key] = (time.time() + self.ttl, amount, quote)
+            flight.result = quote
+            return quote
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(flight_key, None)
+            flight.event.set()
+
+    def _interpolate(self, input_mint: str, output_mint: str, amount: int,
+                     slippage_bps: int, now: float) -> Optional[Dict]:
+        """Interpolate the out/in rate between the nearest fresh buckets around amount"""
+        below = above = None
+        for (in_mint, out_mint, _, slippage), (expires, cached_amount, quote) in self._entries.items():
+            if in_mint != input_mint or out_mint != output_mint or slippage != slippage_bps or expires <= now:
+                continue
+            if cached_amount <= amount and (below is None or cached_amount > below[0]):
+                below = (cached_amount, quote)
+            if cached_amount >= amount and (above is None or cached_amount < above[0]):
+                above = (cached_amount, quote)
+
+        if below is None or above is None:
+            return None
+        if below[0] == above[0]:
+            return _scale_quote(below[1], below[0], amount)
+
+        rate_below = int(below[1]["outAmount"]) / below[0]
+        rate_above = int(above[1]["outAmount"]) / above[0]
+        t = (math.log(amount) - math.log(below[0])) / (math.log(above[0]) - math.log(below[0]))
+        rate = rate_below + t * (rate_above - rate_below)
+        return {
+            "inputMint": input_mint,
+            "outputMint": output_mint,
+            "inAmount": str(amount),
+            "outAmount": str(int(amount * rate)),
+            "slippageBps": slippage_bps,
+            "approximate": True
+        }
+
+    def _prune(self, now: float):
+        expired = [key for key, entry in self._entries.items() if entry[0] <= now]
+        for key in expired:
+            del self._entries[key]
+        if len(self._entries) >= self.max_entries:
+            oldest = sorted(self._entries, key=lambda k: self._entries[k][0])
+            for key in oldest[:len(oldest) // 2]:
+                del self._entries[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "in_flight": len(self._in_flight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced
+            }
+
+
+def _scale_quote(quote: Dict, quoted_amount: int, amount: int) -> Dict:
+    """Linearly rescale a cached quote to a nearby amount"""
+    return {
+        "inputMint": quote.get("inputMint"),
+        "outputMint": quote.get("outputMint"),
+        "inAmount": str(amount),
+        "outAmount": str(int(int(quote["outAmount"]) * amount / quoted_amount)),
+        "slippageBps": quote.get("slippageBps"),
+        "priceImpactPct": quote.get("priceImpactPct"),
+        "approximate": True
+    }
+
+
+# Global quote cache instance
+quote_cache = QuoteCache()
+
+@router.get("/api/jupiter/quote")
+def get_quote(inputMint: str, outputMint: str, amount: int, slippageBps: int = 50,
+              approximate: bool = False):
+    """Proxy a Jupiter quote through the shared cache"""
+    if amount <= 0:
+        raise HTTPException(400, "Amount must be positive")
+    try:
+        return quote_cache.get_quote(inputMint, outputMint, amount, slippageBps, approximate)
+    except Exception as e:
+        raise HTTPException(502, f"Quote request failed: {str(e)}")
+
+@router.get("/api/jupiter/quote-cache/stats")
+def get_quote_cache_stats():
+    """Get quote cache hit/miss counters"""
+    return quote_cache.stats()
@@ -1,33 +1,75 @@
-from fastapi import APIRouter
-from typing import Dict, List
+from fastapi import APIRouter, Header, HTTPException
+from pydantic import BaseModel
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+import hmac
+import os
 import random
 
+from copy_trading import DEFAULT_COPY_AMOUNT, DEFAULT_SLIPPAGE_BPS, copy_trader, job_fill, parse_price, resolve_token
+from leaderboard_engine import PERIODS, SORT_FIELDS, LeaderboardEngine
+from pnl_engine import pnl_engine
+from social import followers, signal_timelines
+
 router = APIRouter()
 
-# Mock trading data - in production this would come from a database
-trading_data = {
-    'daily': [
-        {'rank': 1, 'name': 'CryptoKing', 'pnl': 2847.32, 'roi': 24.3, 'trades': 15, 'winRate': 86.7, 'followers': 1247},
-        {'rank': 2, 'name': 'SolanaWhale', 'pnl': 1923.45, 'roi': 19.7, 'trades': 23, 'winRate': 78.3, 'followers': 892},
-        {'rank': 3, 'name': 'DeFiMaster', 'pnl': 1456.78, 'roi': 15.2, 'trades': 31, 'winRate': 74.2, 'followers': 634},
-        {'rank': 4, 'name': 'TokenHunter', 'pnl': 1234.56, 'roi': 12.8, 'trades': 18, 'winRate': 72.2, 'followers': 456},
-        {'rank': 5, 'name': 'MemeTrader', 'pnl': 987.65, 'roi': 11.4, 'trades': 27, 'winRate': 70.4, 'followers': 321}
-    ],
-    'weekly': [
-        {'rank': 1, 'name': 'CryptoKing', 'pnl': 15847.32, 'roi': 124.3, 'trades': 89, 'winRate': 84.3, 'followers': 1247},
-        {'rank': 2, 'name': 'DeFiMaster', 'pnl': 12456.78, 'roi': 98.7, 'trades': 156, 'winRate': 76.9, 'followers': 634},
-        {'rank': 3, 'name': 'SolanaWhale', 'pnl': 9823.45, 'roi': 87.2, 'trades': 134, 'winRate': 73.1, 'followers': 892}
-    ],
-    'monthly': [
-        {'rank': 1, 'name': 'CryptoKing', 'pnl': 67847.32, 'roi': 456.7, 'trades': 423, 'winRate': 82.7, 'followers': 1247},
-        {'rank': 2, 'name': 'DeFiMaster', 'pnl': 54321.09, 'roi': 387.4, 'trades': 567, 'winRate': 78.2, 'followers': 634}
-    ],
-    'all-time': [
-        {'rank': 1, 'name': 'CryptoKing', 'pnl': 234567.89, 'roi': 1234.5, 'trades': 2341, 'winRate': 81.4, 'followers': 1247},
-        {'rank': 2, 'name': 'DeFiMaster', 'pnl': 187654.32, 'roi': 987.6, 'trades': 1876, 'winRate': 77.8, 'followers': 634}
-    ]
-}
+class FillRequest(BaseModel):
+    trader: str
+    mint: str
+    side: str  # buy or sell
+    quantity: float
+    price: float  # USD per token
+    timestamp: Optional[float] = None
+
+class FillBatchRequest(BaseModel):
+    fills: List[FillRequest]
+
+MAX_FILL_BATCH = 10000
+SIGNAL_NOTIONAL = 1000.0    # USD a BUY signal is booked at; a SELL signal closes the open position
+# Shared secret for external fill ingestion; the endpoint is disabled when unset
+FILLS_INGEST_KEY = os.getenv("FILLS_INGEST_KEY")
+
+leaderboard_engine = LeaderboardEngine()
+
+def rank_fills(matched: List[Dict]) -> int:
+    """Feed FIFO-matched fills into the rolling leaderboards"""
+    # Buys open lots and count as trades; sells close them at their FIFO cost basis
+    return leaderboard_engine.record(
+        (fill["trader"], fill["realised_pnl"], fill["cost_basis"], fill["matched_quantity"] > 0, fill["timestamp"])
+        for fill in matched
+    )
+
+def record_copy_fill(job: dict):
+    """Book a confirmed copy trade in the copying wallet's own book
+
+    Copies never touch the trader's book, so a trader's figures do not grow
+    with their copiers and wallets' lots are never matched against each other.
+    """
+    fill = job_fill(job)
+    if fill is None:
+        return
+    side, mint, quantity, price, _ = fill
+    pnl_engine.process([(job["wallet"], mint, side, quantity, price, job["updated_at"])])
+
+def record_signal(signal: dict):
+    """Book a trader's own signal as a fill so the leaderboards rank the calls they make"""
+    try:
+        mint, _ = resolve_token(signal["token"])
+        price = parse_price(signal["price"])
+    except ValueError:
+        return
+    action = signal["action"].upper()
+    if action == "BUY":
+        quantity = SIGNAL_NOTIONAL / price
+    elif action == "SELL":
+        quantity = next((p["quantity"] for p in pnl_engine.positions(signal["trader"]) if p["mint"] == mint), 0.0)
+    else:
+        return
+    if quantity > 0:
+        rank_fills(pnl_engine.process([(signal["trader"], mint, action.lower(), quantity, price, None)]))
+
+copy_trader.subscribe(record_copy_fill)
+signal_timelines.on_publish(record_signal)
 
 strategies_data = [
     {'name': 'DCA Bot', 'roi': 24.3, 'users': 156},
@@ -43,29 +85,11 @@ market_leaders = [
     {'token': 'ORCA', 'leader': 'TokenHunter', 'pnl': 1200}
 ]
 
-@router.get("/api/leaderboard/{period}")
-async def get_leaderboard(period: str):
-    """Get leaderboard for specified time period"""
-    if period not in trading_data:
-        period = 'daily'
-    
-    # Add some randomness to simulate live data
-    data = trading_data[period].copy()
-    for trader in data:
-        trader['pnl'] += random.uniform(-50, 50)
-        trader['roi'] += random.uniform(-1, 1)
-    
-    return {
-        "period": period,
-        "leaderboard": data,
-        "updated_at": datetime.now().isoformat()
-    }
-
 @router.get("/api/leaderboard/strategies")
 async def get_top_strategies():
     """Get top performing trading strategies"""
     # Add randomness
-    data = strategies_data.copy()
+    data = [dict(strategy) for strategy in strategies_data]
     for strategy in data:
         strategy['roi'] += random.uniform(-2, 2)
         strategy['users'] += random.randint(-5, 10)
@@ -79,7 +103,7 @@ async def get_top_strategies():
 async def get_market_leaders():
     """Get market leaders by token"""
     # Add randomness
-    data = market_leaders.copy()
+    data = [dict(leader) for leader in market_leaders]
     for leader in data:
         leader['pnl'] += random.uniform(-100, 200)
     
@@ -88,13 +112,99 @@ async def get_market_leaders():
         "updated_at": datetime.now().isoformat()
     }
 
+@router.post("/api/leaderboard/fills")
+def record_fills(request: FillBatchRequest, x_ingest_key: Optional[str] = Header(None)):
+    """Ingest fills from a trusted external executor; copy trades are booked automatically"""
+    if not FILLS_INGEST_KEY:
+        raise HTTPException(403, "Fill ingestion is disabled")
+    if not x_ingest_key or not hmac.compare_digest(x_ingest_key, FILLS_INGEST_KEY):
+        raise HTTPException(401, "Invalid ingest key")
+    if len(request.fills) > MAX_FILL_BATCH:
+        raise HTTPException(400, f"At most {MAX_FILL_BATCH} fills per batch")
+    try:
+        matched = pnl_engine.process(
+            (fill.trader, fill.mint, fill.side, fill.quantity, fill.price, fill.timestamp) for fill in request.fills
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {
+        "success": True,
+        "recorded": rank_fills(matched),
+        "realised_pnl": round(sum(fill["realised_pnl"] for fill in matched), 2)
+    }
+
+@router.get("/api/leaderboard/positions/{trader}")
+async def get_trader_positions(trader: str):
+    """Open lots and realised/unrealised PnL per mint, marked at the last fill price"""
+    summary = pnl_engine.summary(trader)
+    if summary is None:
+        raise HTTPException(404, "Trader has no fills")
+    return {"trader": trader, **summary, "positions": pnl_engine.positions(trader)}
+
+def check_period(period: str, sort_by: str):
+    if period not in PERIODS:
+        raise HTTPException(404, f"Unknown period; use one of: {', '.join(PERIODS)}")
+    if sort_by not in SORT_FIELDS:
+        raise HTTPException(400, f"sort_by must be one of: {', '.join(SORT_FIELDS)}")
+
+@router.get("/api/leaderboard/{period}")
+async def get_leaderboard(period: str, limit: int = 50, offset: int = 0, sort_by: str = "pnl"):
+    """Get leaderboard for specified time period"""
+    check_period(period, sort_by)
+    if limit < 1 or limit > 200 or offset < 0:
+        raise HTTPException(400, "limit must be between 1 and 200 and offset non-negative")
+    
+    rows, total = leaderboard_engine.top(period, limit, offset, sort_by)
+    return {
+        "period": period,
+        "sort_by": sort_by,
+        "leaderboard": [
+            {
+                "rank": row["rank"],
+                "name": row["name"],
+                "pnl": round(row["pnl"], 2),
+                "roi": round(row["roi"], 2),
+                "trades": row["trades"],
+                "winRate": round(row["win_rate"], 1),
+                "followers": followers.follower_count(row["name"])
+            }
+            for row in rows
+        ],
+        "total": total,
+        "updated_at": datetime.now().isoformat()
+    }
+
+@router.get("/api/leaderboard/{period}/rank/{trader}")
+async def get_trader_rank(period: str, trader: str, sort_by: str = "pnl"):
+    """A trader's rank and figures for a period"""
+    check_period(period, sort_by)
+    row = leaderboard_engine.rank(period, trader, sort_by)
+    if row is None:
+        raise HTTPException(404, "Trader has no fills in this period")
+    return {"period": period, "sort_by": sort_by, **row}
+
 @router.post("/api/leaderboard/follow/{trader_name}")
 async def follow_trader_leaderboard(trader_name: str, wallet_data: dict):
-    """Follow a trader from leaderboard"""
-    # This would integrate with the social trading system
+    """Follow a trader from leaderboard and copy their future signals"""
+    wallet = wallet_data.get("wallet")
+    if not wallet:
+        raise HTTPException(400, "Missing field: wallet")
+    try:
+        amount = float(wallet_data.get("amount", DEFAULT_COPY_AMOUNT))
+        slippage_bps = int(wallet_data.get("slippage_bps", DEFAULT_SLIPPAGE_BPS))
+    except (TypeError, ValueError):
+        raise HTTPException(400, "Invalid amount or slippage_bps")
+    if amount <= 0:
+        raise HTTPException(400, "Amount must be positive")
+
+    if followers.follow(wallet, trader_name):
+        signal_timelines.on_follow(wallet, trader_name)
+    copy_trader.enable(wallet, trader_name, amount, slippage_bps)
     return {
         "success": True,
         "message": f"Now following {trader_name}! Copy trading activated.",
         "trader": trader_name,
-        "wallet": wallet_data.get("wallet")
-    }
\ No newline at end of file
+        "wallet": wallet,
+        "amount_usd": amount,
+        "copiers": copy_trader.copier_count(trader_name)
+    }
@@ -0,0 +1,238 @@
+"""
+Leaderboard engine
+Per-trader PnL, ROI, win rate and trade counts over rolling daily, weekly
+and monthly windows and all time. Fills are persisted in SQLite; each window
+keeps running aggregates plus one ranked index per sort field, and expires
+fills as they age out, so every update is O(log n). Fills written by other
+workers are folded in by id before each read
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_right, insort
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ranked_index import RankedIndex
+
+LEADERBOARD_DB_PATH = os.getenv("LEADERBOARD_DB_PATH", os.path.join("leaderboard_data", "fills.db"))
+PERIODS = {
+    "daily": 86400,
+    "weekly": 7 * 86400,
+    "monthly": 30 * 86400,
+    "all-time": None
+}
+SORT_FIELDS = ("pnl", "roi", "win_rate", "trades")
+TRIM_THRESHOLD = 65536      # Expired log entries kept before compacting
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    trader TEXT NOT NULL,
+    pnl REAL NOT NULL,
+    cost REAL NOT NULL,
+    closing INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fills_ts ON fills (ts);
+"""
+
+# (ts, seq, trader, pnl, cost, closing); seq keeps equal timestamps in arrival order
+Fill = Tuple[float, int, str, float, float, bool]
+
+# Per-trader aggregate slots
+PNL, COST, TRADES, CLOSED, WINS = range(5)
+
+
+def trader_metrics(stats: List[float]) -> Dict[str, float]:
+    return {
+        "pnl": stats[PNL],
+        "roi": stats[PNL] / stats[COST] * 100 if stats[COST] > 0 else 0.0,
+        "win_rate": stats[WINS] / stats[CLOSED] * 100 if stats[CLOSED] > 0 else 0.0,
+        "trades": stats[TRADES]
+    }
+
+
+class _Window:
+    """Aggregates and rankings for one period"""
+
+    def __init__(self, seconds: Optional[int]):
+        self.seconds = seconds
+        self.stats: Dict[str, List[float]] = {}
+        self.indexes = {field: RankedIndex() for field in SORT_FIELDS}
+        self.cursor = 0     # First log entry still inside the window
+        self.dirty = set()
+
+    def apply(self, trader: str, pnl: float, cost: float, closing: bool, sign: int):
+        """Adjust a trader's aggregates; rankings catch up on flush"""
+        stats = self.stats.get(trader)
+        if stats is None:
+            stats = self.stats[trader] = [0.0, 0.0, 0, 0, 0]
+        stats[PNL] += sign * pnl
+        stats[COST] += sign * cost
+        stats[TRADES] += sign
+        if closing:
+            stats[CLOSED] += sign
+            stats[WINS] += sign * (pnl > 0)
+        self.dirty.add(trader)
+
+    def flush(self):
+        """Re-rank each trader touched since the last flush once"""
+        for trader in self.dirty:
+            stats = self.stats.get(trader)
+            if stats is not None and stats[TRADES] <= 0:
+                # Dropping the entry also discards accumulated float error
+                del self.stats[trader]
+                stats = None
+            if stats is None:
+                for index in self.indexes.values():
+                    index.remove(trader)
+                continue
+            for field, value in trader_metrics(stats).items():
+                self.indexes[field].update(trader, value)
+        self.dirty.clear()
+
+
+class LeaderboardEngine:
+    """Rolling-window trader rankings fed by trade fills"""
+
+    def __init__(self, path: Optional[str] = None):
+        path = path or LEADERBOARD_DB_PATH
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._seq = count()
+        self.windows = {period: _Window(seconds) for period, seconds in PERIODS.items()}
+        self.log: List[Fill] = []     # Fills inside the longest rolling window, by time
+        self.horizon = max(s for s in PERIODS.values() if s)
+        self.last_id = 0    # Highest fill id folded into the windows
+        # One read transaction so the totals, the log and last_id describe the same rows
+        self._conn.execute("BEGIN")
+        try:
+            self._load()
+        finally:
+            self._conn.execute("COMMIT")
+
+    def _load(self):
+        """Each window's totals from one GROUP BY; only the rolling log is read row by row"""
+        now = time.time()
+        self.last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM fills").fetchone()[0]
+        for window in self.windows.values():
+            cutoff = now - window.seconds if window.seconds else float("-inf")
+            rows = self._conn.execute(
+                "SELECT trader, SUM(pnl), SUM(cost), COUNT(*), SUM(closing), SUM(closing AND pnl > 0) "
+                "FROM fills WHERE ts > ? GROUP BY trader", (cutoff,)
+            ).fetchall()
+            for trader, *stats in rows:
+                window.stats[trader] = stats
+                window.dirty.add(trader)
+            window.flush()
+
+        rows = self._conn.execute(
+            "SELECT ts, trader, pnl, cost, closing FROM fills WHERE ts > ? ORDER BY ts, id", (now - self.horizon,)
+        ).fetchall()
+        self.log = [(ts, next(self._seq), trader, pnl, cost, bool(closing)) for ts, trader, pnl, cost, closing in rows]
+        timestamps = [fill[0] for fill in self.log]
+        for window in self.windows.values():
+            if window.seconds is not None:
+                window.cursor = bisect_right(timestamps, now - window.seconds)
+
+    def _apply_rolling(self, fill: Fill, now: float):
+        """Log a fill and add it to the rolling windows it falls in; windows must be expired to now"""
+        ts, _, trader, pnl, cost, closing = fill
+        if ts <= now - self.horizon:
+            return
+        if self.log and fill < self.log[-1]:
+            insort(self.log, fill)
+        else:
+            self.log.append(fill)
+        for window in self.windows.values():
+            if window.seconds is None:
+                continue
+            if ts > now - window.seconds:
+                window.apply(trader, pnl, cost, closing, 1)
+            else:
+                # A late fill already outside the window lands before its cursor
+                window.cursor += 1
+
+    def _expire(self, now: float):
+        for window in self.windows.values():
+            if window.seconds is None:
+                continue
+            cutoff = now - window.seconds
+            log = self.log
+            while window.cursor < len(log) and log[window.cursor][0] <= cutoff:
+                _, _, trader, pnl, cost, closing = log[window.cursor]
+                window.apply(trader, pnl, cost, closing, -1)
+                window.cursor += 1
+            window.flush()
+
+        oldest = min(w.cursor for w in self.windows.values() if w.seconds is not None)
+        if oldest > TRIM_THRESHOLD and oldest * 2 > len(self.log):
+            del self.log[:oldest]
+            for window in self.windows.values():
+                if window.seconds is not None:
+                    window.cursor -= oldest
+
+    def _catch_up(self, now: float):
+        """Expire the windows to now, then fold in fills past last_id from this or any other worker"""
+        self._expire(now)
+        rows = self._conn.execute(
+            "SELECT id, ts, trader, pnl, cost, closing FROM fills WHERE id > ? ORDER BY id", (self.last_id,)
+        ).fetchall()
+        if not rows:
+            return
+        all_time = self.windows["all-time"]
+        for fill_id, ts, trader, pnl, cost, closing in rows:
+            all_time.apply(trader, pnl, cost, bool(closing), 1)
+            self._apply_rolling((ts, next(self._seq), trader, pnl, cost, bool(closing)), now)
+        self.last_id = rows[-1][0]
+        for window in self.windows.values():
+            window.flush()
+
+    def record(self, fills: Iterable[Tuple[str, float, float, bool, Optional[float]]]) -> int:
+        """Ingest (trader, pnl, cost, closing, timestamp) fills; one transaction per batch"""
+        now = time.time()
+        rows = [(ts if ts is not None else now, trader, float(pnl), float(cost), int(bool(closing)))
+                for trader, pnl, cost, closing, ts in fills]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT INTO fills (ts, trader, pnl, cost, closing) VALUES (?, ?, ?, ?, ?)",
+                                       rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._catch_up(now)
+        return len(rows)
+
+    def top(self, period: str, limit: int = 50, offset: int = 0, sort_by: str = "pnl") -> Tuple[List[Dict], int]:
+        """Ranked rows for a period and the number of ranked traders"""
+        with self._lock:
+            self._catch_up(time.time())
+            window = self.windows[period]
+            entries = window.indexes[sort_by].top(limit, offset)
+            rows = [
+                {"rank": offset + i + 1, "name": trader, **trader_metrics(window.stats[trader])}
+                for i, (trader, _) in enumerate(entries)
+            ]
+            return rows, len(window.stats)
+
+    def rank(self, period: str, trader: str, sort_by: str = "pnl") -> Optional[Dict]:
+        with self._lock:
+            self._catch_up(time.time())
+            window = self.windows[period]
+            rank = window.indexes[sort_by].rank(trader)
+            if rank is None:
+                return None
+            return {"rank": rank, "name": trader, **trader_metrics(window.stats[trader])}
@@ -0,0 +1,212 @@
+"""
+Live update hub
+Topic pub-sub over SSE and websockets. Producers publish once and each
+message is serialised once for all subscribers; periodic sources are polled
+server-side only while someone is listening. Every subscriber has a bounded
+queue, and a consumer that falls behind is told to resync, then dropped
+"""
+
+import asyncio
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+router = APIRouter()
+
+SUBSCRIBER_QUEUE = 64       # Messages buffered per subscriber
+MAX_RESYNCS = 3             # Overflows tolerated before a subscriber is dropped
+RESYNC_WINDOW = 60          # Seconds after which the overflow count resets
+KEEPALIVE = 15              # Seconds between keepalives on an idle stream
+MAX_TOPICS = 16
+
+RESYNC_TOPIC = "_resync"
+PING_TOPIC = "_ping"
+
+
+class Subscriber:
+    """One connection's bounded message queue"""
+
+    def __init__(self, topics: List[str], queue_size: int):
+        self.topics = topics
+        self.queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(queue_size)
+        self.resyncs = 0
+        self.first_resync = 0.0
+        self.closed = False
+
+    def offer(self, message: str) -> bool:
+        """Queue a message; on overflow replace the backlog with a resync notice"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        # Slow consumer: its backlog is stale anyway, so drop it rather than block producers
+        now = time.time()
+        if now - self.first_resync > RESYNC_WINDOW:
+            self.resyncs, self.first_resync = 0, now
+        self.resyncs += 1
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        if self.resyncs > MAX_RESYNCS:
+            self.closed = True
+            self.queue.put_nowait(None)
+        else:
+            self.queue.put_nowait(json.dumps({"topic": RESYNC_TOPIC, "data": {"topics": self.topics}}))
+        return False
+
+
+class LiveHub:
+    """Topic registry, fan-out and server-side polling of periodic sources"""
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE):
+        self.queue_size = queue_size
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self.last: Dict[str, str] = {}      # topic -> last message, replayed to new subscribers
+        self.sources: Dict[str, tuple] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+        self.dropped = 0
+
+    def publish(self, topic: str, data, retain: bool = True):
+        """Publish from any thread; cheap when nobody is subscribed"""
+        message = json.dumps({"topic": topic, "data": data}, default=str)
+        with self._lock:
+            if retain:
+                self.last[topic] = message
+            self.published += 1
+            loop = self.loop
+        if loop is not None and self.subscribers.get(topic):
+            loop.call_soon_threadsafe(self._fan_out, topic, message)
+
+    def _fan_out(self, topic: str, message: str):
+        for subscriber in list(self.subscribers.get(topic, ())):
+            if subscriber.offer(message):
+                self.delivered += 1
+            else:
+                self.overflows += 1
+                if subscriber.closed:
+                    self.dropped += 1
+                    self.unsubscribe(subscriber)
+
+    def add_source(self, topic: str, fetch: Callable[[], object], interval: float):
+        """Poll fetch every interval seconds while topic has subscribers; unchanged values are not resent"""
+        self.sources[topic] = (fetch, interval)
+
+    async def _poll(self, topic: str):
+        fetch, interval = self.sources[topic]
+        while self.subscribers.get(topic):
+            try:
+                data = await asyncio.to_thread(fetch)
+                message = json.dumps({"topic": topic, "data": data}, default=str)
+                if message != self.last.get(topic):
+                    self.publish(topic, data)
+            except Exception as e:
+                print(f"Live source {topic} failed: {e}")
+            await asyncio.sleep(interval)
+        self._tasks.pop(topic, None)
+
+    def subscribe(self, topics: List[str]) -> Subscriber:
+        """Register a subscriber on the running loop and replay each topic's last message"""
+        self.loop = asyncio.get_running_loop()
+        subscriber = Subscriber(topics, self.queue_size)
+        for topic in topics:
+            self.subscribers.setdefault(topic, set()).add(subscriber)
+            if topic in self.last:
+                subscriber.offer(self.last[topic])
+            if topic in self.sources and topic not in self._tasks:
+                self._tasks[topic] = asyncio.create_task(self._poll(topic))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        for topic in subscriber.topics:
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.subscribers[topic]
+
+    async def messages(self, subscriber: Subscriber):
+        """Messages for a subscriber, with keepalives, until it is dropped"""
+        while True:
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE)
+            except asyncio.TimeoutError:
+                message = json.dumps({"topic": PING_TOPIC, "data": None})
+            if message is None:
+                return
+            yield message
+
+    def stats(self) -> Dict:
+        return {
+            "topics": {topic: len(subscribers) for topic, subscribers in self.subscribers.items()},
+            "sources": sorted(self.sources),
+            "polling": sorted(self._tasks),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "dropped": self.dropped
+        }
+
+
+# Global live hub instance
+live_hub = LiveHub()
+
+
+def parse_topics(topics: str) -> List[str]:
+    parsed = [t for t in dict.fromkeys(topic.strip() for topic in topics.split(",")) if t]
+    if not parsed or len(parsed) > MAX_TOPICS:
+        raise HTTPException(400, f"Provide between 1 and {MAX_TOPICS} comma-separated topics")
+    return parsed
+
+
+@router.get("/api/live/stream")
+async def live_stream(topics: str):
+    """Server-sent events for the given comma-separated topics"""
+    subscriber = live_hub.subscribe(parse_topics(topics))
+
+    async def events():
+        try:
+            async for message in live_hub.messages(subscriber):
+                yield f"data: {message}\n\n"
+        finally:
+            live_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/api/live/ws")
+async def live_socket(websocket: WebSocket, topics: str):
+    """The same stream over a websocket"""
+    try:
+        parsed = parse_topics(topics)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    subscriber = live_hub.subscribe(parsed)
+    try:
+        async for message in live_hub.messages(subscriber):
+            await websocket.send_text(message)
+        await websocket.close(code=1013)  # Dropped as a slow consumer
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_hub.unsubscribe(subscriber)
+
+
+@router.get("/api/live/stats")
+async def live_stats():
+    """Subscriber counts and delivery counters"""
+    return live_hub.stats()
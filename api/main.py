@@ -21,6 +21,12 @@ except Exception as e:
 
 # Import API routers
 routers_to_include = []
+try:
+    from live_hub import live_hub, router as live_router
+    routers_to_include.append(live_router)
+except ImportError:
+    live_hub = None
+
 try:
     from sio_token import router as sio_router
     routers_to_include.append(sio_router)
@@ -45,12 +51,42 @@ try:
 except ImportError:
     pass
 
+try:
+    from governance import router as governance_router
+    routers_to_include.append(governance_router)
+except ImportError:
+    pass
+
+try:
+    from leaderboard import router as leaderboard_router
+    routers_to_include.append(leaderboard_router)
+except ImportError:
+    pass
+
 try:
     from staking import router as staking_router
     routers_to_include.append(staking_router)
 except ImportError:
     pass
 
+try:
+    from analytics import router as analytics_router
+    routers_to_include.append(analytics_router)
+except ImportError:
+    pass
+
+try:
+    from portfolio import router as portfolio_router
+    routers_to_include.append(portfolio_router)
+except ImportError:
+    pass
+
+try:
+    from jupiter_quotes import router as jupiter_quotes_router
+    routers_to_include.append(jupiter_quotes_router)
+except ImportError:
+    pass
+
 app = FastAPI(
     title="Singularity.io API",
     description="Backend API for Singularity.io - Solana blockchain integration platform",
@@ -178,3 +214,12 @@ def get_full_wallet_balance(address: str):
         },
         "status": "success" if SOLANA_AVAILABLE else "client_unavailable"
     }
+
+def get_neural_state():
+    """Advance the network once per interval for every viewer instead of once per client"""
+    update_neural_network()
+    return get_neural_network()
+
+if live_hub is not None:
+    live_hub.add_source("network", get_network_stats, 10)
+    live_hub.add_source("neural", get_neural_state, 10)
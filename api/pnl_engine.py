@@ -0,0 +1,293 @@
+"""
+FIFO PnL engine
+Matches sells against buy lots per (trader, mint) in first-in-first-out
+order for whole batches at once: the cost of the first x units sold is a
+piecewise-linear function of x over the cumulative buy stream, so each
+sell's cost basis is two interpolations. Open lots stay in compact arrays.
+Trades written by other workers are folded in by id before each read
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+PNL_DB_PATH = os.getenv("PNL_DB_PATH", os.path.join("leaderboard_data", "trades.db"))
+DUST = 1e-9     # Remaining lot quantity treated as fully consumed
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    trader TEXT NOT NULL,
+    mint TEXT NOT NULL,
+    side TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    price REAL NOT NULL
+);
+"""
+
+Position = Tuple[str, str]  # (trader, mint)
+
+
+def segmented_cummin(values: np.ndarray, group: np.ndarray) -> np.ndarray:
+    """Running minimum that restarts at each new group; groups must be contiguous"""
+    out = values.copy()
+    n, step = len(out), 1
+    while step < n:
+        # Reads come from the previous pass: np.where copies before the write
+        shifted = np.where(group[step:] == group[:-step], out[:-step], np.inf)
+        np.minimum(out[step:], shifted, out=out[step:])
+        step *= 2
+    return out
+
+
+def match_fifo(group: np.ndarray, is_buy: np.ndarray, quantity: np.ndarray,
+               price: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(matched quantity, cost basis, remaining lot quantity) per event
+
+    Events must be ordered by group, then time. Sells beyond the quantity
+    bought so far are left unmatched rather than opening a short.
+    """
+    n = len(group)
+    buy_qty = np.where(is_buy, quantity, 0.0)
+    sell_qty = quantity - buy_qty
+    bought = np.cumsum(buy_qty)
+    sold = np.cumsum(sell_qty)
+
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = group[1:] != group[:-1]
+    start_index = np.maximum.accumulate(np.where(starts, np.arange(n), 0))
+    buy_base = (bought - buy_qty)[start_index]      # Buy-stream coordinate where the group begins
+    sell_base = (sold - sell_qty)[start_index]
+
+    local_bought = bought - buy_base
+    local_sold = sold - sell_base
+    # Shortfall clamp: x_k = min(x_{k-1} + q_k, b_k) unrolls to a running minimum
+    shortfall = np.minimum(segmented_cummin(local_bought - local_sold, group), 0.0)
+    consumed = buy_base + local_sold + shortfall    # Buy-stream units sold so far, per event
+
+    previous = np.empty(n)
+    previous[0] = 0.0
+    previous[1:] = consumed[:-1]
+    previous[starts] = buy_base[starts]
+    matched = np.where(is_buy, 0.0, consumed - previous)
+
+    buys = np.flatnonzero(is_buy)
+    stream_qty = np.concatenate(([0.0], bought[buys]))
+    stream_cost = np.concatenate(([0.0], np.cumsum(quantity[buys] * price[buys])))
+    cost = np.where(is_buy, 0.0, np.interp(consumed, stream_qty, stream_cost) -
+                    np.interp(previous, stream_qty, stream_cost))
+
+    # Whatever of each lot lies beyond the group's final consumed point is still open
+    ends = np.ones(n, dtype=bool)
+    ends[:-1] = starts[1:]
+    final_consumed = consumed[np.flatnonzero(ends)][np.cumsum(starts) - 1]
+    remaining = np.where(is_buy, np.clip(bought - np.maximum(bought - buy_qty, final_consumed), 0.0, None), 0.0)
+    return matched, cost, remaining
+
+
+class PnlEngine:
+    """Realised and unrealised PnL per (trader, mint) with FIFO lot matching"""
+
+    def __init__(self, path: Optional[str] = None):
+        path = path or PNL_DB_PATH
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._reset()
+        self.recompute()
+
+    def _reset(self):
+        self.lots: Dict[Position, Tuple[np.ndarray, np.ndarray]] = {}   # Open (quantity, price) arrays, oldest first
+        self.realised: Dict[Position, float] = {}
+        self.closed_cost: Dict[Position, float] = {}    # Cost basis of everything sold
+        self.invested: Dict[Position, float] = {}       # Notional of everything bought
+        self.by_trader: Dict[str, set] = {}
+        self.marks: Dict[str, float] = {}               # Last fill price per mint
+        self.mark_ts: Dict[str, float] = {}
+        self.last_id = 0                                # Highest trade id applied
+
+    def _apply(self, trader: np.ndarray, mint: np.ndarray, is_buy: np.ndarray, quantity: np.ndarray,
+               price: np.ndarray, ts: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Match one batch against the open lots; returns per-fill (realised, cost, matched) in input order"""
+        n = len(trader)
+        traders, trader_code = np.unique(trader, return_inverse=True)
+        mints, mint_code = np.unique(mint, return_inverse=True)
+        codes, position = np.unique(trader_code * len(mints) + mint_code, return_inverse=True)
+        traders, mints = traders.tolist(), mints.tolist()
+        positions = [(traders[c // len(mints)], mints[c % len(mints)]) for c in codes.tolist()]
+
+        # Open lots re-enter the stream as buys ahead of the batch
+        carried = [(p, self.lots[key]) for p, key in enumerate(positions) if key in self.lots]
+        if carried:
+            lot_group = np.concatenate([np.full(len(q), p) for p, (q, _) in carried])
+            lot_qty = np.concatenate([q for _, (q, _) in carried])
+            lot_price = np.concatenate([pr for _, (_, pr) in carried])
+        else:
+            lot_group = np.zeros(0, dtype=np.int64)
+            lot_qty = lot_price = np.zeros(0)
+        m = len(lot_group)
+
+        group = np.concatenate([lot_group, position])
+        event_ts = np.concatenate([np.full(m, -np.inf), ts])
+        order = np.lexsort((np.arange(m + n), event_ts, group))
+        group = group[order]
+        event_buy = np.concatenate([np.ones(m, dtype=bool), is_buy])[order]
+        event_qty = np.concatenate([lot_qty, quantity])[order]
+        event_price = np.concatenate([lot_price, price])[order]
+
+        matched, cost, remaining = match_fifo(group, event_buy, event_qty, event_price)
+        realised = matched * event_price - cost
+
+        # Back to input order for the fills themselves
+        source = order - m
+        fills = source >= 0
+        out_realised = np.zeros(n)
+        out_cost = np.zeros(n)
+        out_matched = np.zeros(n)
+        out_realised[source[fills]] = realised[fills]
+        out_cost[source[fills]] = cost[fills]
+        out_matched[source[fills]] = matched[fills]
+
+        groups = len(positions)
+        realised_sum = np.bincount(group, weights=realised, minlength=groups).tolist()
+        cost_sum = np.bincount(group, weights=cost, minlength=groups).tolist()
+        invested_sum = np.bincount(position, weights=np.where(is_buy, quantity * price, 0.0), minlength=groups).tolist()
+        open_mask = remaining > DUST
+        open_group = group[open_mask]
+        boundaries = np.searchsorted(open_group, np.arange(groups + 1))
+        open_qty, open_price = remaining[open_mask], event_price[open_mask]
+
+        for p, key in enumerate(positions):
+            self.realised[key] = self.realised.get(key, 0.0) + realised_sum[p]
+            self.closed_cost[key] = self.closed_cost.get(key, 0.0) + cost_sum[p]
+            self.invested[key] = self.invested.get(key, 0.0) + invested_sum[p]
+            self.by_trader.setdefault(key[0], set()).add(key[1])
+            lo, hi = boundaries[p], boundaries[p + 1]
+            if hi > lo:
+                self.lots[key] = (open_qty[lo:hi].copy(), open_price[lo:hi].copy())
+            else:
+                self.lots.pop(key, None)
+
+        # Latest price per mint marks open positions
+        latest = np.lexsort((ts, mint))
+        last_of_mint = np.ones(n, dtype=bool)
+        last_of_mint[:-1] = mint[latest][1:] != mint[latest][:-1]
+        for i in latest[last_of_mint].tolist():
+            key = str(mint[i])
+            if ts[i] >= self.mark_ts.get(key, -np.inf):
+                self.marks[key], self.mark_ts[key] = float(price[i]), float(ts[i])
+
+        return out_realised, out_cost, out_matched
+
+    def process(self, fills: Iterable[Tuple[str, str, str, float, float, Optional[float]]]) -> List[Dict]:
+        """Persist and match (trader, mint, side, quantity, price, timestamp) fills
+
+        Fills older than ones already processed for the same position are
+        matched after them; recompute() restores strict time order.
+        """
+        now = time.time()
+        rows = [(ts if ts is not None else now, trader, mint, side.lower(), float(quantity), float(price))
+                for trader, mint, side, quantity, price, ts in fills]
+        if not rows:
+            return []
+        for row in rows:
+            if row[3] not in ("buy", "sell") or row[4] <= 0 or row[5] < 0:
+                raise ValueError("Fills need side buy or sell, a positive quantity and a non-negative price")
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Other workers' trades come first, so ours are matched after them as they were written
+                self._catch_up()
+                self._conn.executemany(
+                    "INSERT INTO trades (ts, trader, mint, side, quantity, price) VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+                # The write lock keeps our rows contiguous and last
+                self.last_id = self._conn.execute("SELECT MAX(id) FROM trades").fetchone()[0]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            realised, cost, matched = self._apply_rows(rows)
+
+        return [
+            {"trader": row[1], "mint": row[2], "side": row[3], "timestamp": row[0],
+             "realised_pnl": r, "cost_basis": c, "matched_quantity": q}
+            for row, r, c, q in zip(rows, realised.tolist(), cost.tolist(), matched.tolist())
+        ]
+
+    def _apply_rows(self, rows: List[Tuple]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Match (ts, trader, mint, side, quantity, price) rows as one batch"""
+        ts, trader, mint, side, quantity, price = (np.array(column) for column in zip(*rows))
+        return self._apply(trader, mint, side == "buy", quantity.astype(float), price.astype(float), ts.astype(float))
+
+    def _catch_up(self) -> int:
+        """Apply trades past last_id, written by any worker; caller holds the lock"""
+        rows = self._conn.execute(
+            "SELECT id, ts, trader, mint, side, quantity, price FROM trades WHERE id > ? ORDER BY id", (self.last_id,)
+        ).fetchall()
+        if rows:
+            self.last_id = rows[-1][0]
+            self._apply_rows([row[1:] for row in rows])
+        return len(rows)
+
+    def recompute(self) -> int:
+        """Rebuild every position from the full trade history in one vectorised pass"""
+        with self._lock:
+            self._reset()
+            return self._catch_up()
+
+    def positions(self, trader: str, marks: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """Per-mint open quantity, cost and realised/unrealised PnL for a trader"""
+        out = []
+        with self._lock:
+            self._catch_up()
+            for mint in sorted(self.by_trader.get(trader, ())):
+                key = (trader, mint)
+                qty, price = self.lots.get(key, (np.zeros(0), np.zeros(0)))
+                quantity = float(qty.sum())
+                open_cost = float(qty @ price)
+                mark = (marks or {}).get(mint, self.marks.get(mint))
+                out.append({
+                    "mint": mint,
+                    "quantity": quantity,
+                    "open_lots": len(qty),
+                    "cost_basis": open_cost,
+                    "average_price": open_cost / quantity if quantity > 0 else 0.0,
+                    "mark_price": mark,
+                    "realised_pnl": self.realised[key],
+                    "unrealised_pnl": quantity * mark - open_cost if mark is not None else 0.0,
+                    "invested": self.invested[key]
+                })
+        return out
+
+    def summary(self, trader: str, marks: Optional[Dict[str, float]] = None) -> Optional[Dict]:
+        """Trader totals; ROI is total PnL over everything invested"""
+        positions = self.positions(trader, marks)
+        if not positions:
+            return None
+        realised = sum(p["realised_pnl"] for p in positions)
+        unrealised = sum(p["unrealised_pnl"] for p in positions)
+        invested = sum(p["invested"] for p in positions)
+        return {
+            "realised_pnl": realised,
+            "unrealised_pnl": unrealised,
+            "total_pnl": realised + unrealised,
+            "invested": invested,
+            "roi": (realised + unrealised) / invested * 100 if invested > 0 else 0.0,
+            "open_positions": sum(1 for p in positions if p["quantity"] > 0)
+        }
+
+
+# Global PnL engine instance
+pnl_engine = PnlEngine()
@@ -1,14 +1,27 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import requests
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 
+import numpy as np
+
+from analytics import ensure_price_history, TOKENS
+from portfolio_risk import risk_engine
+from portfolio_history import history_store, tracked_wallets
+from portfolio_valuation import PriceOracle, value_holdings, value_wallets, holdings_from_token_accounts
+from solana_rpc_cache import get_balance, get_token_accounts_by_program
+from voting_snapshot import is_address
+
 router = APIRouter()
 
 class PortfolioRequest(BaseModel):
     wallet_address: str
 
+class PortfolioBatchRequest(BaseModel):
+    wallets: List[str]
+
 # Mock price data - in production would use real price feeds
 token_prices = {
     'So11111111111111111111111111111111111111112': 188.50,  # SOL
@@ -17,111 +30,194 @@ token_prices = {
     'orcaEKTdK7LKz57vaAYr9QeNsVEPfiu6QeMU1kektZE': 2.40    # ORCA
 }
 
+SOL_MINT = 'So11111111111111111111111111111111111111112'
+
+# Mock 24h changes - in production would use real price feeds
+token_changes = {
+    SOL_MINT: 5.2
+}
+
+price_oracle = PriceOracle(token_prices, token_changes)
+
+ANALYTICS_SYMBOLS = {token["symbol"] for token in TOKENS}
+MAX_BATCH_WALLETS = 100  # Each wallet costs two RPC calls
+FETCH_CONCURRENCY = 8    # Wallets fetched at once when a batch brings no pool of its own
+MAX_RISK_WINDOW = 365    # Daily periods
+
+def fetch_wallet_holdings(wallet_address: str, cached: bool = True):
+    """Fetch a wallet's SOL and SPL balances as (mints, raw amounts, decimals) lists"""
+    # Uncached reads leave no files behind in the RPC cache directory
+    ttl = {} if cached else {"cache_ttl": 0}
+    result = get_token_accounts_by_program(wallet_address, **ttl)
+    mints, raw_amounts, decimals = holdings_from_token_accounts(result["result"]["value"])
+    
+    sol_result = get_balance(wallet_address, **ttl)
+    if "result" in sol_result:
+        mints.insert(0, SOL_MINT)
+        raw_amounts.insert(0, int(sol_result["result"]["value"]))
+        decimals.insert(0, 9)
+    
+    return mints, raw_amounts, decimals
+
 @router.get("/api/portfolio/{wallet_address}")
 async def get_portfolio(wallet_address: str):
     """Get portfolio overview for a wallet"""
     try:
-        # Get token balances
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getTokenAccountsByOwner",
-            "params": [
-                wallet_address,
-                {"programId": "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"},
-                {"encoding": "jsonParsed"}
-            ]
-        }
-        
-        response = requests.post("https://api.mainnet-beta.solana.com", json=payload)
-        result = response.json()
-        
-        if "error" in result:
-            raise HTTPException(400, f"RPC Error: {result['error']['message']}")
-        
-        token_accounts = result["result"]["value"]
-        holdings = []
-        total_value = 0
-        
-        # Add SOL balance
-        sol_payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getBalance",
-            "params": [wallet_address]
-        }
+        mints, raw_amounts, decimals = await run_in_threadpool(fetch_wallet_holdings, wallet_address)
+        valuation = value_holdings(price_oracle, mints, raw_amounts, decimals)
         
-        sol_response = requests.post("https://api.mainnet-beta.solana.com", json=sol_payload)
-        sol_result = sol_response.json()
-        
-        if "result" in sol_result:
-            sol_balance = sol_result["result"]["value"] / 1e9
-            sol_value = sol_balance * token_prices.get('So11111111111111111111111111111111111111112', 188.50)
-            total_value += sol_value
-            
-            holdings.append({
-                "symbol": "SOL",
-                "mint": "So11111111111111111111111111111111111111112",
-                "amount": sol_balance,
-                "value": sol_value,
-                "price": token_prices.get('So11111111111111111111111111111111111111112', 188.50),
-                "change_24h": 5.2  # Mock data
-            })
-        
-        # Process token accounts
-        for account in token_accounts:
-            account_data = account["account"]["data"]["parsed"]["info"]
-            token_amount = account_data["tokenAmount"]
-            mint = account_data["mint"]
-            
-            if float(token_amount["amount"]) > 0:
-                amount = float(token_amount["uiAmount"]) if token_amount["uiAmount"] else 0
-                price = token_prices.get(mint, 0)
-                value = amount * price
-                total_value += value
-                
-                holdings.append({
-                    "symbol": get_token_symbol(mint),
-                    "mint": mint,
-                    "amount": amount,
-                    "value": value,
-                    "price": price,
-                    "change_24h": (hash(mint) % 20) - 10  # Mock change
-                })
-        
-        # Calculate daily change (mock)
-        daily_change = total_value * 0.05  # 5% mock change
+        holdings = [
+            {
+                "symbol": get_token_symbol(mint),
+                "mint": mint,
+                "amount": amount,
+                "value": value,
+                "price": price,
+                "weight": weight,
+                "change_24h": change
+            }
+            for mint, amount, value, price, weight, change in zip(
+                valuation["mint"].tolist(),
+                valuation["amount"].tolist(),
+                valuation["value"].tolist(),
+                valuation["price"].tolist(),
+                valuation["weight"].tolist(),
+                valuation["change_24h"].tolist()
+            )
+        ]
         
         return {
             "wallet": wallet_address,
-            "total_value": total_value,
-            "daily_change": daily_change,
-            "daily_change_percent": (daily_change / total_value * 100) if total_value > 0 else 0,
+            "total_value": float(valuation["total_value"][0]),
+            "daily_change": float(valuation["daily_change"][0]),
+            "daily_change_percent": float(valuation["daily_change_percent"][0]),
             "asset_count": len(holdings),
             "holdings": holdings,
             "updated_at": datetime.now().isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"Failed to get portfolio: {str(e)}")
 
+@router.get("/api/portfolio/risk/{wallet_address}")
+async def get_portfolio_risk(wallet_address: str, window: int = 30):
+    """Get risk analytics (volatility, Sharpe, drawdown, VaR/CVaR, correlations) for a wallet"""
+    # Risk states are cached per wallet, so only real addresses may create one
+    check_address(wallet_address)
+    if window < 2 or window > MAX_RISK_WINDOW:
+        raise HTTPException(400, f"Window must be between 2 and {MAX_RISK_WINDOW} periods")
+    
+    portfolio = await get_portfolio(wallet_address)
+    
+    # Only holdings with price history in the analytics universe can be analysed
+    holdings = {}
+    for holding in portfolio["holdings"]:
+        symbol = holding["symbol"]
+        if symbol in ANALYTICS_SYMBOLS and holding["value"] > 0:
+            ensure_price_history(symbol)
+            holdings[symbol] = holdings.get(symbol, 0) + holding["value"]
+    
+    return {
+        "wallet": wallet_address,
+        "window": window,
+        "total_value": portfolio["total_value"],
+        "risk": risk_engine.analyse(wallet_address, holdings, window),
+        "updated_at": datetime.now().isoformat()
+    }
+
+@router.post("/api/portfolio/batch")
+def get_portfolio_batch(request: PortfolioBatchRequest):
+    """Value many wallets in one pass (internal reporting)"""
+    # Sync so the blocking RPC fetches run in the threadpool, not on the event loop
+    if len(request.wallets) > MAX_BATCH_WALLETS:
+        raise HTTPException(400, f"At most {MAX_BATCH_WALLETS} wallets per batch")
+    return {
+        "wallets": value_wallet_batch(request.wallets),
+        "updated_at": datetime.now().isoformat()
+    }
+
+def value_wallet_batch(wallets: List[str], cached: bool = True,
+                       pool: Optional[ThreadPoolExecutor] = None) -> List[Dict]:
+    """Fetch holdings for many wallets concurrently and value them together"""
+    def fetch(wallet: str):
+        try:
+            return fetch_wallet_holdings(wallet, cached)
+        except Exception as e:
+            return e
+    
+    if pool is not None:
+        fetched = list(pool.map(fetch, wallets))
+    else:
+        with ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY) as own_pool:
+            fetched = list(own_pool.map(fetch, wallets))
+    
+    wallet_ids, mints, raw_amounts, decimals = [], [], [], []
+    errors = {}
+    
+    for i, (wallet, holdings) in enumerate(zip(wallets, fetched)):
+        if isinstance(holdings, Exception):
+            errors[wallet] = str(holdings)
+            continue
+        w_mints, w_raw, w_decimals = holdings
+        wallet_ids.extend([i] * len(w_mints))
+        mints.extend(w_mints)
+        raw_amounts.extend(w_raw)
+        decimals.extend(w_decimals)
+    
+    valuation = value_wallets(price_oracle, wallet_ids, mints, raw_amounts, decimals, n_wallets=len(wallets))
+    asset_counts = np.bincount(valuation["wallet_id"], minlength=len(wallets))
+    
+    return [
+        {
+            "wallet": wallet,
+            "total_value": total,
+            "daily_change": change,
+            "daily_change_percent": change_pct,
+            "asset_count": count,
+            **({"error": errors[wallet]} if wallet in errors else {})
+        }
+        for wallet, total, change, change_pct, count in zip(
+            wallets,
+            valuation["total_value"].tolist(),
+            valuation["daily_change"].tolist(),
+            valuation["daily_change_percent"].tolist(),
+            asset_counts.tolist()
+        )
+    ]
+
+def check_address(wallet_address: str):
+    if not is_address(wallet_address):
+        raise HTTPException(400, "Invalid wallet address")
+
+@router.post("/api/portfolio/track")
+async def track_portfolio(request: PortfolioRequest):
+    """Enrol a wallet in the hourly snapshots that build its performance history"""
+    check_address(request.wallet_address)
+    if not tracked_wallets.add(request.wallet_address):
+        raise HTTPException(503, "Wallet tracking is at capacity")
+    return {"success": True, "wallet": request.wallet_address}
+
 @router.get("/api/portfolio/performance/{wallet_address}")
-async def get_portfolio_performance(wallet_address: str, days: int = 30):
-    """Get portfolio performance history"""
-    # Generate mock performance data
-    performance_data = []
-    base_value = 5000
+async def get_portfolio_performance(wallet_address: str, days: int = 30, points: int = 200):
+    """Get portfolio performance history; wallets have history once tracked"""
+    check_address(wallet_address)
+    if days < 1 or points < 1:
+        raise HTTPException(400, "Days and points must be positive")
     
-    for i in range(days):
-        date = datetime.now() - timedelta(days=days-i)
-        # Simulate portfolio growth with some volatility
-        value = base_value * (1 + 0.002 * i + (hash(str(date)) % 100 - 50) / 1000)
-        
-        performance_data.append({
-            "date": date.isoformat(),
-            "value": value,
-            "change": (value - base_value) / base_value * 100
-        })
+    end = int(datetime.now().timestamp())
+    timestamps, values = history_store.query(wallet_address, end - days * 86400, end, max_points=points)
+    
+    performance_data = []
+    if len(values):
+        base_value = values[0]
+        dates = np.datetime_as_string(timestamps.astype("datetime64[s]")).tolist()
+        changes = ((values - base_value) / base_value * 100) if base_value else np.zeros(len(values))
+        performance_data = [
+            {"date": date, "value": value, "change": change}
+            for date, value, change in zip(dates, values.tolist(), changes.tolist())
+        ]
     
     return {
         "wallet": wallet_address,
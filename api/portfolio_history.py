@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Portfolio value time series
+Per-wallet valuations stored as delta-encoded column chunks in sharded
+SQLite files, with range queries, downsampling and bounded retention
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+HISTORY_DIR = os.getenv("PORTFOLIO_HISTORY_DIR", "portfolio_history")
+NUM_SHARDS = 64
+CHUNK_POINTS = 256                  # Points per encoded chunk
+RETENTION_SECONDS = 400 * 86400     # Chunks older than this are dropped
+VALUE_SCALE = 100                   # Values are stored as integer cents
+SNAPSHOT_INTERVAL = 3600            # Seconds between scheduled snapshots
+SNAPSHOT_BATCH = 500                # Wallets valued per batch
+SNAPSHOT_CONCURRENCY = 64           # Wallets fetched at once; two RPC calls each
+MAX_TRACKED_WALLETS = 500000        # Enrolment cap; each wallet costs RPC calls every snapshot
+
+
+def encode_column(values: np.ndarray) -> bytes:
+    """Delta-encode an int64 column into the narrowest integer width, then deflate"""
+    deltas = np.diff(values, prepend=0)
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if deltas.min(initial=0) >= info.min and deltas.max(initial=0) <= info.max:
+            break
+    else:
+        dtype = np.int64
+    return bytes([np.dtype(dtype).itemsize]) + zlib.compress(deltas.astype(dtype).tobytes())
+
+
+def decode_column(blob: bytes) -> np.ndarray:
+    width = blob[0]
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32, 8: np.int64}[width]
+    deltas = np.frombuffer(zlib.decompress(blob[1:]), dtype=dtype)
+    return np.cumsum(deltas.astype(np.int64))
+
+
+class PortfolioHistoryStore:
+    """Sharded store of (timestamp, value) series keyed by wallet"""
+
+    def __init__(self, directory: str = HISTORY_DIR, num_shards: int = NUM_SHARDS,
+                 retention: int = RETENTION_SECONDS):
+        self.directory = directory
+        self.num_shards = num_shards
+        self.retention = retention
+        self._conns: Dict[int, sqlite3.Connection] = {}
+        self._locks = [threading.Lock() for _ in range(num_shards)]
+        os.makedirs(directory, exist_ok=True)
+
+    def _conn(self, shard: int) -> sqlite3.Connection:
+        conn = self._conns.get(shard)
+        if conn is None:
+            path = os.path.join(self.directory, f"shard_{shard:03d}.db")
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    wallet TEXT NOT NULL,
+                    start_ts INTEGER NOT NULL,
+                    end_ts INTEGER NOT NULL,
+                    points INTEGER NOT NULL,
+                    ts_data BLOB NOT NULL,
+                    value_data BLOB NOT NULL,
+                    PRIMARY KEY (wallet, start_ts)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS chunks_end ON chunks (end_ts)")
+            self._conns[shard] = conn
+        return conn
+
+    def _shard(self, wallet: str) -> int:
+        return zlib.crc32(wallet.encode()) % self.num_shards
+
+    def record(self, wallet: str, value: float, ts: Optional[int] = None):
+        """Append a single valuation"""
+        self.record_many([(wallet, value)], ts)
+
+    def record_many(self, points: Iterable[Tuple[str, float]], ts: Optional[int] = None):
+        """Append one valuation per wallet, committing once per shard"""
+        ts = int(time.time()) if ts is None else int(ts)
+        by_shard: Dict[int, List[Tuple[str, float]]] = {}
+        for wallet, value in points:
+            by_shard.setdefault(self._shard(wallet), []).append((wallet, value))
+
+        for shard, shard_points in by_shard.items():
+            with self._locks[shard]:
+                conn = self._conn(shard)
+                with conn:
+                    for wallet, value in shard_points:
+                        self._append(conn, wallet, ts, int(round(value * VALUE_SCALE)))
+
+    def _append(self, conn: sqlite3.Connection, wallet: str, ts: int, value: int):
+        row = conn.execute(
+            "SELECT start_ts, end_ts, points, ts_data, value_data FROM chunks "
+            "WHERE wallet = ? ORDER BY start_ts DESC LIMIT 1",
+            (wallet,)
+        ).fetchone()
+
+        if row is not None and row[2] < CHUNK_POINTS and ts > row[1]:
+            start_ts = row[0]
+            timestamps = np.append(decode_column(row[3]), ts)
+            values = np.append(decode_column(row[4]), value)
+        elif row is not None and ts <= row[1]:
+            return  # Out-of-order or duplicate snapshot
+        else:
+            start_ts = ts
+            timestamps = np.array([ts], dtype=np.int64)
+            values = np.array([value], dtype=np.int64)
+
+        conn.execute(
+            "INSERT OR REPLACE INTO chunks (wallet, start_ts, end_ts, points, ts_data, value_data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (wallet, start_ts, ts, len(timestamps), encode_column(timestamps), encode_column(values))
+        )
+
+    def backfill(self, wallet: str, timestamps: np.ndarray, values: np.ndarray) -> int:
+        """Insert historical points older than the wallet's existing series; returns points written"""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.round(np.asarray(values, dtype=np.float64) * VALUE_SCALE).astype(np.int64)
+        order = np.argsort(timestamps, kind="stable")
+        timestamps, values = timestamps[order], values[order]
+        # Keep the last value recorded for any repeated timestamp
+        keep = np.append(timestamps[1:] != timestamps[:-1], True)
+        timestamps, values = timestamps[keep], values[keep]
+
+        shard = self._shard(wallet)
+        with self._locks[shard]:
+            conn = self._conn(shard)
+            earliest = conn.execute(
+                "SELECT MIN(start_ts) FROM chunks WHERE wallet = ?", (wallet,)
+            ).fetchone()[0]
+            if earliest is not None:
+                mask = timestamps < earliest
+                timestamps, values = timestamps[mask], values[mask]
+
+            with conn:
+                for i in range(0, len(timestamps), CHUNK_POINTS):
+                    ts_chunk = timestamps[i:i + CHUNK_POINTS]
+                    conn.execute(
+                        "INSERT OR REPLACE INTO chunks (wallet, start_ts, end_ts, points, ts_data, value_data) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (wallet, int(ts_chunk[0]), int(ts_chunk[-1]), len(ts_chunk),
+                         encode_column(ts_chunk), encode_column(values[i:i + CHUNK_POINTS]))
+                    )
+        return len(timestamps)
+
+    def query(self, wallet: str, start: Optional[int] = None, end: Optional[int] = None,
+              max_points: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (timestamps, values) in [start, end], downsampled to max_points"""
+        start = 0 if start is None else int(start)
+        end = 2 ** 62 if end is None else int(end)
+        shard = self._shard(wallet)
+        with self._locks[shard]:
+            rows = self._conn(shard).execute(
+                "SELECT ts_data, value_data FROM chunks "
+                "WHERE wallet = ? AND start_ts <= ? AND end_ts >= ? ORDER BY start_ts",
+                (wallet, end, start)
+            ).fetchall()
+
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        timestamps = np.concatenate([decode_column(r[0]) for r in rows])
+        values = np.concatenate([decode_column(r[1]) for r in rows]) / VALUE_SCALE
+        mask = (timestamps >= start) & (timestamps <= end)
+        timestamps, values = timestamps[mask], values[mask]
+
+        if max_points and len(timestamps) > max_points:
+            timestamps, values = downsample(timestamps, values, max_points)
+        return timestamps, values
+
+    def has_history(self, wallet: str) -> bool:
+        shard = self._shard(wallet)
+        with self._locks[shard]:
+            row = self._conn(shard).execute(
+                "SELECT 1 FROM chunks WHERE wallet = ? LIMIT 1", (wallet,)
+            ).fetchone()
+        return row is not None
+
+    def enforce_retention(self, now: Optional[int] = None) -> int:
+        """Delete chunks that ended before the retention window; returns rows removed"""
+        cutoff = (int(time.time()) if now is None else int(now)) - self.retention
+        removed = 0
+        for shard in range(self.num_shards):
+            with self._locks[shard]:
+                conn = self._conn(shard)
+                with conn:
+                    removed += conn.execute("DELETE FROM chunks WHERE end_ts < ?", (cutoff,)).rowcount
+        return removed
+
+    def close(self):
+        for shard, conn in list(self._conns.items()):
+            with self._locks[shard]:
+                conn.close()
+        self._conns.clear()
+
+
+def downsample(timestamps: np.ndarray, values: np.ndarray, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the last point of each of max_points equal-width time buckets"""
+    if max_points < 1:
+        raise ValueError("max_points must be positive")
+    edges = np.linspace(timestamps[0], timestamps[-1], max_points + 1)
+    bucket = np.clip(np.searchsorted(edges, timestamps, side="right") - 1, 0, max_points - 1)
+    last = np.flatnonzero(np.diff(bucket, append=max_points))
+    return timestamps[last], values[last]
+
+
+class TrackedWallets:
+    """Persistent set of wallets included in scheduled snapshots"""
+
+    def __init__(self, directory: str = HISTORY_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "tracked.db"), check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS wallets (wallet TEXT PRIMARY KEY, added_at INTEGER)")
+        self._lock = threading.Lock()
+
+    def add(self, wallet: str, limit: int = MAX_TRACKED_WALLETS) -> bool:
+        """Enrol a wallet unless the set is full; True if it is tracked afterwards"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO wallets SELECT ?, ? WHERE (SELECT COUNT(*) FROM wallets) < ?",
+                (wallet, int(time.time()), limit)
+            )
+            return self._conn.execute("SELECT 1 FROM wallets WHERE wallet = ?", (wallet,)).fetchone() is not None
+
+    def remove(self, wallet: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM wallets WHERE wallet = ?", (wallet,))
+
+    def iter_batches(self, size: int = SNAPSHOT_BATCH) -> Iterable[List[str]]:
+        """Page through tracked wallets without loading the whole set"""
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT wallet FROM wallets WHERE wallet > ? ORDER BY wallet LIMIT ?", (last, size)
+                ).fetchall()
+            if not rows:
+                return
+            batch = [r[0] for r in rows]
+            yield batch
+            last = batch[-1]
+
+
+def run_snapshot(store: "PortfolioHistoryStore", tracked: TrackedWallets) -> int:
+    """Value every tracked wallet and record the results; returns wallets recorded"""
+    from portfolio import value_wallet_batch
+
+    ts = int(time.time())
+    recorded = 0
+    # One pool for the whole run; hourly balances would only churn the RPC file cache
+    with ThreadPoolExecutor(max_workers=SNAPSHOT_CONCURRENCY) as pool:
+        for batch in tracked.iter_batches():
+            results = value_wallet_batch(batch, cached=False, pool=pool)
+            store.record_many(
+                ((r["wallet"], r["total_value"]) for r in results if "error" not in r), ts
+            )
+            recorded += sum(1 for r in results if "error" not in r)
+    store.enforce_retention(ts)
+    return recorded
+
+
+def run_forever(interval: int = SNAPSHOT_INTERVAL):
+    """Snapshot worker loop, e.g. `python portfolio_history.py` under a process manager"""
+    while True:
+        started = time.time()
+        try:
+            count = run_snapshot(history_store, tracked_wallets)
+            print(f"Recorded {count} wallet valuations in {time.time() - started:.1f}s")
+        except Exception as e:
+            print(f"Snapshot run failed: {e}")
+        time.sleep(max(0.0, interval - (time.time() - started)))
+
+
+# Global store instances
+history_store = PortfolioHistoryStore()
+tracked_wallets = TrackedWallets()
+
+if __name__ == "__main__":
+    run_forever()
@@ -0,0 +1,186 @@
+"""
+Portfolio risk analytics
+Volatility, Sharpe ratio, max drawdown, historical VaR/CVaR and the
+covariance/correlation matrix over an aligned matrix of candle returns,
+maintained incrementally per (wallet, window)
+"""
+
+import math
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from candle_store import CandleStore, RESOLUTIONS, candle_store
+
+RISK_FREE_RATE = float(os.getenv("RISK_FREE_RATE", "0.0"))   # Annual
+CONFIDENCE_LEVELS = (0.95, 0.99)
+RESOLUTION = "1d"
+MAX_STATES = 4096           # Cached (wallet, window) states, least recently used evicted
+
+
+def aligned_closes(store: CandleStore, symbols: List[str], start: Optional[int] = None,
+                   resolution: str = RESOLUTION) -> Tuple[np.ndarray, np.ndarray]:
+    """Closed-candle closes for each symbol on their common timestamps, shape (T, N)"""
+    series = []
+    for symbol in symbols:
+        candles = store.query(symbol, resolution, start=start)
+        # The newest candle is still open
+        series.append((candles["timestamp"][:-1], candles["close"][:-1]))
+
+    common = series[0][0]
+    for timestamps, _ in series[1:]:
+        common = np.intersect1d(common, timestamps, assume_unique=True)
+
+    closes = np.empty((len(common), len(symbols)))
+    for j, (timestamps, close) in enumerate(series):
+        closes[:, j] = close[np.searchsorted(timestamps, common)]
+    return common, closes
+
+
+class RiskState:
+    """Rolling window of aligned log returns with running first and second moments"""
+
+    def __init__(self, symbols: List[str], weights: np.ndarray, window: int):
+        self.symbols = symbols
+        self.weights = weights
+        self.window = window
+        n = len(symbols)
+        self.rows: deque = deque()
+        self.sum = np.zeros(n)
+        self.sum_outer = np.zeros((n, n))
+        self.last_timestamp: Optional[int] = None
+        self.last_closes: Optional[np.ndarray] = None
+        self.result: Optional[Dict] = None
+
+    def push(self, timestamps: np.ndarray, closes: np.ndarray) -> int:
+        """Fold newly closed candles in, evicting rows beyond the window; returns rows added"""
+        if not len(closes):
+            return 0
+        if self.last_closes is not None:
+            # Prepend the previous close so the first new candle yields a return
+            closes = np.vstack([self.last_closes, closes])
+        self.last_timestamp = int(timestamps[-1])
+        self.last_closes = closes[-1]
+        if len(closes) < 2:
+            return 0
+
+        returns = np.diff(np.log(closes), axis=0)
+        for row in returns:
+            self.rows.append(row)
+            self.sum += row
+            self.sum_outer += np.outer(row, row)
+            if len(self.rows) > self.window:
+                old = self.rows.popleft()
+                self.sum -= old
+                self.sum_outer -= np.outer(old, old)
+
+        self.result = None
+        return len(returns)
+
+    def covariance(self) -> np.ndarray:
+        n = len(self.rows)
+        if n < 2:
+            return np.zeros_like(self.sum_outer)
+        mean = self.sum / n
+        return (self.sum_outer - n * np.outer(mean, mean)) / (n - 1)
+
+    def compute(self, periods_per_year: float) -> Dict:
+        """Risk metrics for the current window"""
+        if self.result is not None:
+            return self.result
+
+        returns = np.array(self.rows) if self.rows else np.zeros((0, len(self.symbols)))
+        portfolio = returns @ self.weights if len(returns) else np.zeros(0)
+        cov = self.covariance()
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = np.where(np.outer(std, std) > 0, cov / np.outer(std, std), 0.0)
+
+        # Portfolio variance from the running covariance rather than rescanning returns
+        variance = float(self.weights @ cov @ self.weights)
+        volatility = math.sqrt(max(variance, 0.0) * periods_per_year)
+        mean_return = float(self.sum @ self.weights / len(self.rows)) if self.rows else 0.0
+        annual_return = mean_return * periods_per_year
+        sharpe = (annual_return - RISK_FREE_RATE) / volatility if volatility > 0 else 0.0
+
+        equity = np.exp(np.cumsum(portfolio)) if len(portfolio) else np.ones(1)
+        peaks = np.maximum.accumulate(np.concatenate(([1.0], equity)))
+        max_drawdown = float(np.max(1 - np.concatenate(([1.0], equity)) / peaks))
+
+        var, cvar = {}, {}
+        if len(portfolio):
+            simple = np.expm1(portfolio)
+            for level in CONFIDENCE_LEVELS:
+                threshold = np.quantile(simple, 1 - level)
+                tail = simple[simple <= threshold]
+                key = f"{int(level * 100)}"
+                var[key] = float(-threshold)
+                cvar[key] = float(-tail.mean()) if len(tail) else float(-threshold)
+
+        self.result = {
+            "symbols": self.symbols,
+            "weights": self.weights.tolist(),
+            "observations": len(self.rows),
+            "volatility": volatility,
+            "annual_return": annual_return,
+            "sharpe_ratio": sharpe,
+            "max_drawdown": max_drawdown,
+            "value_at_risk": var,
+            "conditional_value_at_risk": cvar,
+            "asset_volatility": (std * math.sqrt(periods_per_year)).tolist(),
+            "covariance": cov.tolist(),
+            "correlation": corr.tolist()
+        }
+        return self.result
+
+
+class RiskEngine:
+    """Caches a RiskState per (wallet, window) and advances it as candles close"""
+
+    def __init__(self, store: CandleStore, resolution: str = RESOLUTION):
+        self.store = store
+        self.resolution = resolution
+        self.periods_per_year = 365 * 86400 / RESOLUTIONS[resolution]
+        # Keyed by request parameters, so LRU-bounded
+        self._states: "OrderedDict[Tuple[str, int], RiskState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def analyse(self, wallet: str, holdings: Dict[str, float], window: int = 30) -> Dict:
+        """Risk metrics for holdings given as {symbol: value}"""
+        symbols = sorted(s for s, v in holdings.items() if v > 0)
+        if not symbols:
+            return {"symbols": [], "observations": 0}
+        values = np.array([holdings[s] for s in symbols])
+        weights = values / values.sum()
+
+        key = (wallet, window)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or state.symbols != symbols:
+                state = RiskState(symbols, weights, window)
+                self._states[key] = state
+                if len(self._states) > MAX_STATES:
+                    self._states.popitem(last=False)
+            elif not np.allclose(state.weights, weights):
+                # Same universe: the return window stays valid, only the weighting changes
+                state.weights = weights
+                state.result = None
+            self._states.move_to_end(key)
+
+            start = None
+            if state.last_timestamp is not None:
+                start = state.last_timestamp + RESOLUTIONS[self.resolution]
+
+            timestamps, closes = aligned_closes(self.store, symbols, start, self.resolution)
+            if state.last_timestamp is None:
+                # Only the last window + 1 closes are needed to seed the returns
+                timestamps, closes = timestamps[-(window + 1):], closes[-(window + 1):]
+            state.push(timestamps, closes)
+            return state.compute(self.periods_per_year)
+
+
+# Global risk engine instance
+risk_engine = RiskEngine(candle_store)
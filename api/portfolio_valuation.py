@@ -0,0 +1,116 @@
+"""
+Vectorised portfolio valuation
+Holdings are passed as arrays (mints, raw amounts, decimals) and joined
+against a sorted price oracle in one pass; many wallets can be valued at once
+"""
+
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class PriceOracle:
+    """Sorted mint -> (price, 24h change) table supporting vectorised lookups"""
+
+    def __init__(self, prices: Optional[Dict[str, float]] = None,
+                 changes: Optional[Dict[str, float]] = None):
+        self._prices: Dict[str, float] = dict(prices or {})
+        self._changes: Dict[str, float] = dict(changes or {})
+        self._lock = threading.Lock()
+        self._rebuild()
+
+    def _rebuild(self):
+        mints = sorted(set(self._prices) | set(self._changes))
+        self.mints = np.array(mints, dtype=str)
+        self.prices = np.array([self._prices.get(m, 0.0) for m in mints], dtype=np.float64)
+        self.changes = np.array([self._changes.get(m, 0.0) for m in mints], dtype=np.float64)
+
+    def update(self, mint: str, price: Optional[float] = None, change_24h: Optional[float] = None):
+        with self._lock:
+            if price is not None:
+                self._prices[mint] = price
+            if change_24h is not None:
+                self._changes[mint] = change_24h
+            self._rebuild()
+
+    def update_many(self, prices: Dict[str, float], changes: Optional[Dict[str, float]] = None):
+        with self._lock:
+            self._prices.update(prices)
+            self._changes.update(changes or {})
+            self._rebuild()
+
+    def lookup(self, mints: np.ndarray):
+        """Return (prices, changes) arrays aligned with mints; unknown mints price at 0"""
+        with self._lock:
+            table, prices, changes = self.mints, self.prices, self.changes
+        if not len(table):
+            zeros = np.zeros(len(mints))
+            return zeros, zeros.copy()
+        pos = np.clip(np.searchsorted(table, mints), 0, len(table) - 1)
+        found = table[pos] == mints
+        return np.where(found, prices[pos], 0.0), np.where(found, changes[pos], 0.0)
+
+
+def value_holdings(oracle: PriceOracle, mints: Sequence[str], raw_amounts: Sequence[int],
+                   decimals: Sequence[int]) -> Dict[str, np.ndarray]:
+    """Value one wallet's holdings; returns aligned column arrays"""
+    return value_wallets(oracle, np.zeros(len(mints), dtype=np.int64), mints,
+                         raw_amounts, decimals, n_wallets=1)
+
+
+def value_wallets(oracle: PriceOracle, wallet_ids: Sequence[int], mints: Sequence[str],
+                  raw_amounts: Sequence[int], decimals: Sequence[int],
+                  n_wallets: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Value a flat batch of holdings for many wallets in one vectorised pass
+
+    wallet_ids[i] is the 0-based wallet index owning holding i. Per-holding
+    columns are returned alongside per-wallet totals.
+    """
+    wallet_ids = np.asarray(wallet_ids, dtype=np.int64)
+    mints = np.asarray(mints, dtype=str)
+    raw = np.asarray(raw_amounts, dtype=np.float64)
+    scale = np.power(10.0, np.asarray(decimals, dtype=np.float64))
+    if n_wallets is None:
+        n_wallets = int(wallet_ids.max()) + 1 if len(wallet_ids) else 0
+
+    amounts = raw / scale
+    prices, changes = oracle.lookup(mints)
+    values = amounts * prices
+    # Value 24h ago implied by the current value and percentage change; a change of
+    # -100% or below implies no finite prior value, so such holdings count as unchanged
+    growth = 1 + changes / 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        previous = np.where(growth > 0, values / growth, values)
+
+    totals = np.bincount(wallet_ids, weights=values, minlength=n_wallets)
+    previous_totals = np.bincount(wallet_ids, weights=previous, minlength=n_wallets)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.where(totals[wallet_ids] > 0, values / totals[wallet_ids], 0.0)
+        change_pct = np.where(previous_totals > 0, (totals / previous_totals - 1) * 100, 0.0)
+
+    return {
+        "wallet_id": wallet_ids,
+        "mint": mints,
+        "amount": amounts,
+        "price": prices,
+        "value": values,
+        "weight": weights,
+        "change_24h": changes,
+        "total_value": totals,
+        "daily_change": totals - previous_totals,
+        "daily_change_percent": change_pct
+    }
+
+
+def holdings_from_token_accounts(token_accounts: List[Dict]):
+    """Flatten jsonParsed token accounts into (mints, raw amounts, decimals) arrays"""
+    mints, raw_amounts, decimals = [], [], []
+    for account in token_accounts:
+        info = account["account"]["data"]["parsed"]["info"]
+        token_amount = info["tokenAmount"]
+        if int(token_amount["amount"]) > 0:
+            mints.append(info["mint"])
+            raw_amounts.append(int(token_amount["amount"]))
+            decimals.append(int(token_amount["decimals"]))
+    return mints, raw_amounts, decimals
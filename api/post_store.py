@@ -0,0 +1,297 @@
+"""
+Community post store
+Posts are appended to size-capped JSON-lines segments, each with a
+fixed-width (id, offset) sidecar index, so any page is a binary search and
+a few positioned reads. Only a bounded tail of recent posts is kept in
+memory; per-user indexes live in SQLite
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process only
+    fcntl = None
+
+SOCIAL_DATA_DIR = os.getenv("SOCIAL_DATA_DIR", "social_data")
+SEGMENT_BYTES = 4 * 1024 * 1024     # Segment size before rolling to a new file
+HOT_TAIL = 1000                     # Recent posts served from memory
+INDEX_DTYPE = np.dtype([("id", "<i8"), ("offset", "<i8")])
+
+
+def encode_cursor(post: Dict) -> str:
+    return f"{post['timestamp']:.6f}:{post['id']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    timestamp, post_id = cursor.split(":")
+    return float(timestamp), int(post_id)
+
+
+class PostStore:
+    """Append-only segmented post log with a hot in-memory tail"""
+
+    def __init__(self, directory: Optional[str] = None, segment_bytes: int = SEGMENT_BYTES, hot_tail: int = HOT_TAIL):
+        self.directory = directory or os.path.join(SOCIAL_DATA_DIR, "posts")
+        self.segment_bytes = segment_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self.hot: Deque[Dict] = deque(maxlen=hot_tail)
+        self.segments: List[int] = []       # First post id of each segment, ascending
+        self.next_id = 1
+        self.last_timestamp = 0.0
+        self._lock_fd = os.open(os.path.join(self.directory, "append.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        self._tail_segment = -1
+        self._tail_offset = 0
+        self.listeners: List[Callable[[Dict], None]] = []   # Called with every new post, local or not
+
+        self._index = sqlite3.connect(os.path.join(self.directory, "user_index.db"), check_same_thread=False)
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.execute("PRAGMA synchronous=NORMAL")
+        self._index.execute("""
+            CREATE TABLE IF NOT EXISTS user_posts (
+                wallet TEXT NOT NULL,
+                post_id INTEGER NOT NULL,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                PRIMARY KEY (wallet, post_id)
+            ) WITHOUT ROWID
+        """)
+
+        with self._locked():
+            self._recover()
+
+    # Files
+
+    def _segment_path(self, first_id: int) -> str:
+        return os.path.join(self.directory, f"{first_id:012d}.jsonl")
+
+    def _index_path(self, first_id: int) -> str:
+        return os.path.join(self.directory, f"{first_id:012d}.idx")
+
+    def _list_segments(self) -> List[int]:
+        return sorted(int(name[:-6]) for name in os.listdir(self.directory) if name.endswith(".jsonl"))
+
+    @contextmanager
+    def _locked(self):
+        """Serialise appends across threads and worker processes"""
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _recover(self):
+        """Repair the newest segment after a crash and load the hot tail"""
+        self.segments = self._list_segments()
+        if not self.segments:
+            return
+        first_id = self.segments[-1]
+        path = self._segment_path(first_id)
+        with open(path, "rb") as f:
+            data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # Torn write: drop the partial record
+            with open(path, "r+b") as f:
+                f.truncate(complete)
+
+        # The sidecar is written after the record, so it can only lag behind
+        records, offsets, offset = [], [], 0
+        for line in data[:complete].splitlines(keepends=True):
+            records.append(json.loads(line))
+            offsets.append(offset)
+            offset += len(line)
+        index = np.array([(r["id"], o) for r, o in zip(records, offsets)], dtype=INDEX_DTYPE)
+        with open(self._index_path(first_id), "wb") as f:
+            f.write(index.tobytes())
+
+        self._tail_segment, self._tail_offset = first_id, complete
+        if records:
+            self.next_id = records[-1]["id"] + 1
+            self.last_timestamp = records[-1]["timestamp"]
+        elif len(self.segments) > 1:
+            self.next_id = first_id
+        self._fill_hot()
+
+    def _fill_hot(self):
+        """Reload the hot tail from the newest segments"""
+        self.hot.clear()
+        if self.next_id > 1:
+            newest = self._read_before(self.next_id, self.hot.maxlen)
+            self.hot.extend(reversed(newest))
+
+    def _catch_up(self):
+        """Fold in posts appended by other workers since our last look"""
+        segments = self._list_segments()
+        if not segments:
+            return
+        if segments[-1] == self._tail_segment and os.path.getsize(self._segment_path(self._tail_segment)) == self._tail_offset:
+            return
+        self.segments = segments
+        for first_id in segments:
+            if first_id < self._tail_segment:
+                continue
+            start = self._tail_offset if first_id == self._tail_segment else 0
+            with open(self._segment_path(first_id), "rb") as f:
+                f.seek(start)
+                data = f.read()
+            complete = data.rfind(b"\n") + 1
+            for line in data[:complete].splitlines():
+                post = json.loads(line)
+                self.hot.append(post)
+                self._notify(post)
+                self.next_id = post["id"] + 1
+                self.last_timestamp = post["timestamp"]
+            self._tail_segment, self._tail_offset = first_id, start + complete
+
+    def refresh(self):
+        with self._lock:
+            self._catch_up()
+
+    # Writes
+
+    def append(self, wallet: str, post: Dict) -> Dict:
+        """Append a post; assigns its id and a timestamp that never goes backwards"""
+        with self._locked():
+            self._catch_up()
+            post_id = self.next_id
+            timestamp = max(time.time(), self.last_timestamp)
+            record = {**post, "id": post_id, "timestamp": timestamp}
+
+            if not self.segments or self._tail_offset >= self.segment_bytes:
+                self.segments.append(post_id)
+                self._tail_segment, self._tail_offset = post_id, 0
+            segment = self._tail_segment
+            line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+            offset = self._tail_offset
+            with open(self._segment_path(segment), "ab") as f:
+                f.write(line)
+            with open(self._index_path(segment), "ab") as f:
+                f.write(np.array([(post_id, offset)], dtype=INDEX_DTYPE).tobytes())
+            with self._index:
+                self._index.execute("INSERT OR REPLACE INTO user_posts (wallet, post_id, segment, offset) VALUES (?, ?, ?, ?)",
+                                    (wallet, post_id, segment, offset))
+
+            self._tail_offset = offset + len(line)
+            self.next_id = post_id + 1
+            self.last_timestamp = timestamp
+            self.hot.append(record)
+            self._notify(record)
+        return record
+
+    def _notify(self, post: Dict):
+        for listener in self.listeners:
+            listener(post)
+
+    def subscribe(self, listener: Callable[[Dict], None], after_id: int = 0):
+        """Replay stored posts newer than after_id to listener, then keep it informed of new ones"""
+        with self._lock:
+            self._catch_up()
+            for post in self.scan(after_id):
+                listener(post)
+            self.listeners.append(listener)
+
+    # Reads
+
+    def _read_at(self, segment: int, offset: int) -> Dict:
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def _read_before(self, before_id: int, limit: int) -> List[Dict]:
+        """Up to limit posts with id < before_id, newest first, from the segments"""
+        out: List[Dict] = []
+        s = bisect_right(self.segments, before_id - 1) - 1
+        while s >= 0 and len(out) < limit:
+            first_id = self.segments[s]
+            index_path = self._index_path(first_id)
+            if os.path.getsize(index_path) == 0:
+                before_id = first_id
+                s -= 1
+                continue
+            # Mapped rather than loaded, so a cold page touches only the pages it searches
+            index = np.memmap(index_path, dtype=INDEX_DTYPE, mode="r")
+            end = int(np.searchsorted(index["id"], before_id))
+            start = max(0, end - (limit - len(out)))
+            if end > start:
+                with open(self._segment_path(first_id), "rb") as f:
+                    f.seek(int(index["offset"][start]))
+                    lines = f.read(self._span(index, first_id, start, end)).splitlines()
+                out.extend(json.loads(line) for line in reversed(lines[:end - start]))
+            before_id = first_id
+            s -= 1
+        return out
+
+    def get(self, post_id: int) -> Optional[Dict]:
+        """A single post by id"""
+        with self._lock:
+            if self.hot and post_id >= self.hot[0]["id"]:
+                return self.hot[post_id - self.hot[0]["id"]] if post_id < self.next_id else None
+            if post_id < 1:
+                return None
+            found = self._read_before(post_id + 1, 1)
+        return found[0] if found and found[0]["id"] == post_id else None
+
+    def scan(self, after_id: int = 0) -> Iterator[Dict]:
+        """Stored posts with id > after_id, oldest first, one segment in memory at a time"""
+        segments = list(self.segments)
+        # Start in the segment holding after_id + 1; earlier segments are skipped unread
+        start = max(0, bisect_right(segments, after_id + 1) - 1)
+        for first_id in segments[start:]:
+            with open(self._segment_path(first_id), "rb") as f:
+                if first_id <= after_id:
+                    index = np.fromfile(self._index_path(first_id), dtype=INDEX_DTYPE)
+                    skip = int(np.searchsorted(index["id"], after_id + 1))
+                    if skip == len(index):
+                        continue
+                    f.seek(int(index["offset"][skip]))
+                for line in f:
+                    if line.endswith(b"\n"):
+                        yield json.loads(line)
+
+    def _span(self, index: np.ndarray, first_id: int, start: int, end: int) -> int:
+        """Bytes covering records start..end-1 of a segment"""
+        if end < len(index):
+            return int(index["offset"][end] - index["offset"][start])
+        return os.path.getsize(self._segment_path(first_id)) - int(index["offset"][start])
+
+    def page(self, cursor: Optional[str] = None, limit: int = 20) -> Tuple[List[Dict], Optional[str]]:
+        """Newest-first posts strictly older than cursor"""
+        with self._lock:
+            self._catch_up()
+            before_id = decode_cursor(cursor)[1] if cursor else self.next_id
+            out = []
+            for post in reversed(self.hot):
+                if post["id"] < before_id:
+                    out.append(post)
+                    if len(out) == limit:
+                        break
+            if len(out) < limit:
+                oldest_hot = self.hot[0]["id"] if self.hot else self.next_id
+                out.extend(self._read_before(min(before_id, oldest_hot), limit - len(out)))
+        return out, (encode_cursor(out[-1]) if len(out) == limit else None)
+
+    def user_page(self, wallet: str, cursor: Optional[str] = None, limit: int = 20) -> Tuple[List[Dict], Optional[str]]:
+        """Newest-first posts by one wallet"""
+        before_id = decode_cursor(cursor)[1] if cursor else 2 ** 62
+        with self._lock:
+            rows = self._index.execute(
+                "SELECT segment, offset FROM user_posts WHERE wallet = ? AND post_id < ? ORDER BY post_id DESC LIMIT ?",
+                (wallet, before_id, limit)
+            ).fetchall()
+        out = [self._read_at(segment, offset) for segment, offset in rows]
+        return out, (encode_cursor(out[-1]) if len(out) == limit else None)
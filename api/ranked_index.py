@@ -0,0 +1,95 @@
+"""
+Ranked index
+Sorted-bucket list keyed by score with an id -> score map, giving
+logarithmic updates, cheap top-K scans and rank-of-id lookups
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+BUCKET_LOAD = 512
+
+
+class RankedIndex:
+    """Ordered (score, id) index, highest score first"""
+
+    def __init__(self, load: int = BUCKET_LOAD):
+        self.load = load
+        self._buckets: List[List[Tuple[float, Hashable]]] = []
+        self._maxes: List[Tuple[float, Hashable]] = []  # Last entry of each bucket
+        self._scores: Dict[Hashable, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self._scores
+
+    def score(self, item_id: Hashable) -> Optional[float]:
+        return self._scores.get(item_id)
+
+    def update(self, item_id: Hashable, score: float):
+        """Insert or move an item to its new score"""
+        if item_id in self._scores:
+            if self._scores[item_id] == score:
+                return
+            self._remove_entry((-self._scores[item_id], item_id))
+        self._scores[item_id] = score
+        self._insert_entry((-score, item_id))
+
+    def remove(self, item_id: Hashable) -> bool:
+        """Drop an item, returning False if it was not indexed"""
+        if item_id not in self._scores:
+            return False
+        self._remove_entry((-self._scores.pop(item_id), item_id))
+        return True
+
+    def rank(self, item_id: Hashable) -> Optional[int]:
+        """1-based rank of an item, or None if it is not indexed"""
+        if item_id not in self._scores:
+            return None
+        entry = (-self._scores[item_id], item_id)
+        b = bisect_left(self._maxes, entry)
+        return sum(len(bucket) for bucket in self._buckets[:b]) + bisect_left(self._buckets[b], entry) + 1
+
+    def top(self, k: int, offset: int = 0) -> List[Tuple[Hashable, float]]:
+        """Highest-scoring k items as (id, score) pairs"""
+        out = []
+        for item_id, score in self.iter(offset):
+            if len(out) >= k:
+                break
+            out.append((item_id, score))
+        return out
+
+    def iter(self, offset: int = 0) -> Iterator[Tuple[Hashable, float]]:
+        """Iterate (id, score) from the highest score, skipping offset items"""
+        for bucket in self._buckets:
+            if offset >= len(bucket):
+                offset -= len(bucket)
+                continue
+            for neg_score, item_id in bucket[offset:]:
+                yield item_id, -neg_score
+            offset = 0
+
+    def _insert_entry(self, entry: Tuple[float, Hashable]):
+        if not self._buckets:
+            self._buckets.append([entry])
+            self._maxes.append(entry)
+            return
+        b = min(bisect_left(self._maxes, entry), len(self._buckets) - 1)
+        bucket = self._buckets[b]
+        insort(bucket, entry)
+        self._maxes[b] = bucket[-1]
+        if len(bucket) > 2 * self.load:
+            self._buckets[b:b + 1] = [bucket[:self.load], bucket[self.load:]]
+            self._maxes[b:b + 1] = [bucket[self.load - 1], bucket[-1]]
+
+    def _remove_entry(self, entry: Tuple[float, Hashable]):
+        b = bisect_left(self._maxes, entry)
+        bucket = self._buckets[b]
+        del bucket[bisect_left(bucket, entry)]
+        if bucket:
+            self._maxes[b] = bucket[-1]
+        else:
+            del self._buckets[b]
+            del self._maxes[b]
@@ -2,6 +2,8 @@ from fastapi import APIRouter
 import time
 import random
 
+from live_hub import live_hub
+
 router = APIRouter()
 
 @router.get("/api/revenue/metrics")
@@ -30,4 +32,6 @@ def get_revenue_metrics():
     base_metrics["revenue_change"] = random.uniform(15, 25)
     base_metrics["user_change"] = random.uniform(3, 8)
     
-    return base_metrics
\ No newline at end of file
+    return base_metrics
+
+live_hub.add_source("revenue", get_revenue_metrics, 10)
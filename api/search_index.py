@@ -0,0 +1,250 @@
+"""
+Social search index
+Inverted index over community posts and trading signals, updated as each
+document arrives. Queries intersect posting lists shortest-first with
+vectorised binary searches and rank the survivors with BM25. The post part
+is checkpointed to disk with its high-water post id, so a restart replays
+only newer posts
+"""
+
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+K1 = 1.2            # BM25 term-frequency saturation
+B = 0.75            # BM25 length normalisation
+MAX_QUERY_TERMS = 8
+CHECKPOINT_EVERY = 1000     # New posts between checkpoints
+
+# Base58 excludes 0, O, I and l; Solana mints encode to 32-44 characters
+BASE58_MINT = r"[1-9A-HJ-NP-Za-km-z]{32,44}"
+TOKEN_PATTERN = re.compile(
+    r"(?<![A-Za-z0-9$])(?:"
+    r"(?P<cashtag>\$[A-Za-z][A-Za-z0-9]{0,11})"
+    r"|(?P<mint>" + BASE58_MINT + r")"
+    r"|(?P<word>[A-Za-z0-9]+)"
+    r")(?![A-Za-z0-9])"
+)
+MINT_PATTERN = re.compile(BASE58_MINT + r"$")
+STOPWORDS = {"a", "an", "and", "are", "as", "at", "be", "for", "in", "is", "it", "of", "on", "or", "the", "to"}
+
+DOC_KINDS = ("post", "signal")
+
+
+def tokenize(text: str) -> List[str]:
+    """Cashtags become "$sol" plus the bare symbol, mints keep their case, words are lowercased"""
+    terms = []
+    for match in TOKEN_PATTERN.finditer(text):
+        if match.group("cashtag"):
+            symbol = match.group("cashtag").lower()
+            terms.extend((symbol, symbol[1:]))
+        elif match.group("mint") and any(c.isdigit() for c in match.group("mint")):
+            terms.append(match.group("mint"))
+        else:
+            word = match.group(0).lower()
+            if len(word) > 1 and word not in STOPWORDS:
+                terms.append(word)
+    return terms
+
+
+def token_terms(token: str) -> List[str]:
+    """Terms for a signal's token field, which is either a symbol or a mint"""
+    if MINT_PATTERN.match(token):
+        return [token]
+    symbol = token.lstrip("$").lower()
+    return ["$" + symbol, symbol]
+
+
+class _Postings:
+    """Growable parallel arrays of ascending doc numbers and term frequencies"""
+
+    __slots__ = ("docs", "freqs", "size")
+
+    def __init__(self):
+        self.docs = np.empty(4, dtype=np.int64)
+        self.freqs = np.empty(4, dtype=np.float32)
+        self.size = 0
+
+    def append(self, doc: int, freq: int):
+        if self.size == len(self.docs):
+            self.docs = np.resize(self.docs, self.size * 2)
+            self.freqs = np.resize(self.freqs, self.size * 2)
+        self.docs[self.size] = doc
+        self.freqs[self.size] = freq
+        self.size += 1
+
+
+class SearchIndex:
+    """Append-only inverted index; documents are numbered in arrival order"""
+
+    def __init__(self, resolvers: Dict[str, Callable[[int], Optional[Dict]]], checkpoint_path: Optional[str] = None,
+                 checkpoint_every: int = CHECKPOINT_EVERY):
+        self.resolvers = resolvers
+        self.postings: Dict[str, _Postings] = {}
+        self.doc_kind = np.empty(1024, dtype=np.int8)
+        self.doc_key = np.empty(1024, dtype=np.int64)
+        self.doc_length = np.empty(1024, dtype=np.float32)
+        self.doc_count = 0
+        self.total_length = 0
+        self.last_post_id = 0       # High-water mark of indexed posts
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            try:
+                self._load(checkpoint_path)
+            except Exception as e:
+                print(f"Search index checkpoint unreadable, rebuilding: {e}")
+
+    def _add(self, kind: str, key: int, terms: List[str]):
+        with self._lock:
+            doc = self.doc_count
+            if doc == len(self.doc_kind):
+                self.doc_kind = np.resize(self.doc_kind, doc * 2)
+                self.doc_key = np.resize(self.doc_key, doc * 2)
+                self.doc_length = np.resize(self.doc_length, doc * 2)
+            self.doc_kind[doc] = DOC_KINDS.index(kind)
+            self.doc_key[doc] = key
+            self.doc_length[doc] = len(terms)
+            self.doc_count += 1
+            self.total_length += len(terms)
+
+            freqs: Dict[str, int] = {}
+            for term in terms:
+                freqs[term] = freqs.get(term, 0) + 1
+            for term, freq in freqs.items():
+                postings = self.postings.get(term)
+                if postings is None:
+                    postings = self.postings[term] = _Postings()
+                postings.append(doc, freq)
+
+    def add_post(self, post: Dict):
+        # Replay after a checkpoint can overlap posts already indexed
+        if post["id"] <= self.last_post_id:
+            return
+        self._add("post", post["id"], tokenize(post["content"]))
+        self.last_post_id = post["id"]
+        self._unsaved += 1
+        if self.checkpoint_path and self._unsaved >= self.checkpoint_every:
+            self.checkpoint()
+
+    def add_signal(self, signal: Dict):
+        terms = tokenize(f"{signal['trader']} {signal['action']}") + token_terms(signal["token"])
+        self._add("signal", signal["id"], terms)
+
+    # Checkpoints
+
+    def checkpoint(self):
+        """Write the post documents and their postings if any were added since the last checkpoint
+
+        Signals are not persisted, so they are left out.
+        """
+        with self._lock:
+            if not self._unsaved and os.path.exists(self.checkpoint_path):
+                return
+            n = self.doc_count
+            keep = self.doc_kind[:n] == DOC_KINDS.index("post")
+            renumber = np.cumsum(keep) - 1
+            terms, docs, freqs, counts = [], [], [], []
+            for term, postings in self.postings.items():
+                mask = keep[postings.docs[:postings.size]]
+                if mask.any():
+                    terms.append(term)
+                    docs.append(renumber[postings.docs[:postings.size][mask]])
+                    freqs.append(postings.freqs[:postings.size][mask])
+                    counts.append(int(mask.sum()))
+            data = {
+                "terms": np.array(terms, dtype=str),
+                "counts": np.array(counts, dtype=np.int64),
+                "docs": np.concatenate(docs) if docs else np.zeros(0, dtype=np.int64),
+                "freqs": np.concatenate(freqs) if freqs else np.zeros(0, dtype=np.float32),
+                "doc_key": self.doc_key[:n][keep],
+                "doc_length": self.doc_length[:n][keep],
+                "last_post_id": np.int64(self.last_post_id)
+            }
+            self._unsaved = 0
+        tmp = f"{self.checkpoint_path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, **data)
+        os.replace(tmp, self.checkpoint_path)
+
+    def _load(self, path: str):
+        with np.load(path) as data:
+            ends = np.cumsum(data["counts"])
+            docs, freqs = data["docs"], data["freqs"]
+            for term, end, count in zip(data["terms"].tolist(), ends.tolist(), data["counts"].tolist()):
+                postings = self.postings[term] = _Postings()
+                postings.docs = docs[end - count:end].copy()
+                postings.freqs = freqs[end - count:end].copy()
+                postings.size = count
+            n = len(data["doc_key"])
+            capacity = max(1024, 1 << n.bit_length())
+            self.doc_kind = np.zeros(capacity, dtype=np.int8)       # Every persisted doc is a post
+            self.doc_key = np.resize(data["doc_key"], capacity)
+            self.doc_length = np.resize(data["doc_length"], capacity)
+            self.doc_count = n
+            self.total_length = int(data["doc_length"].sum())
+            self.last_post_id = int(data["last_post_id"])
+
+    def _match(self, terms: List[str], kind: Optional[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Doc numbers containing every term and their BM25 scores"""
+        lists = [self.postings.get(term) for term in terms]
+        if any(p is None for p in lists):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        lists.sort(key=lambda p: p.size)
+
+        n = self.doc_count
+        average_length = self.total_length / n if n else 1.0
+        # Candidates come from the rarest term and only ever shrink
+        docs = lists[0].docs[:lists[0].size].copy()
+        tf = [lists[0].freqs[:lists[0].size]]
+        for postings in lists[1:]:
+            other = postings.docs[:postings.size]
+            position = np.searchsorted(other, docs)
+            hit = position < postings.size
+            hit[hit] = other[position[hit]] == docs[hit]
+            docs = docs[hit]
+            tf = [f[hit] for f in tf] + [postings.freqs[position[hit]]]
+            if not len(docs):
+                break
+
+        if kind is not None:
+            keep = self.doc_kind[docs] == DOC_KINDS.index(kind)
+            docs, tf = docs[keep], [f[keep] for f in tf]
+
+        norm = K1 * (1 - B + B * self.doc_length[docs] / average_length)
+        scores = np.zeros(len(docs))
+        for postings, f in zip(lists, tf):
+            idf = np.log(1 + (n - postings.size + 0.5) / (postings.size + 0.5))
+            scores += idf * f * (K1 + 1) / (f + norm)
+        return docs, scores
+
+    def search(self, query: str, kind: Optional[str] = None, limit: int = 20) -> Tuple[List[Dict], int]:
+        """Top documents matching every query term, best first; also returns the match count"""
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        # A bare cashtag also indexes its symbol; requiring both adds nothing
+        terms = [t for t in terms if not ("$" + t in terms)] or terms
+        if not terms:
+            return [], 0
+
+        with self._lock:
+            docs, scores = self._match(terms, kind)
+            # Highest score first, newest first among equal scores
+            order = np.lexsort((-docs, -scores))
+            ranked_kind = self.doc_kind[docs[order]]
+            ranked_key = self.doc_key[docs[order]]
+            ranked_score = scores[order]
+
+        results = []
+        for kind_code, key, score in zip(ranked_kind.tolist(), ranked_key.tolist(), ranked_score.tolist()):
+            doc = self.resolvers[DOC_KINDS[kind_code]](key)
+            # Signals past retention are dropped here rather than purged from postings
+            if doc is None:
+                continue
+            results.append({"type": DOC_KINDS[kind_code], "score": round(score, 4), **doc})
+            if len(results) == limit:
+                break
+        return results, len(ranked_key)
@@ -0,0 +1,197 @@
+"""
+Trading signal timelines
+Fan-out-on-write: a published signal's id is pushed into a bounded ring
+buffer per follower, so reading a wallet's feed is O(page). Traders with
+very large followings skip the fan-out and are merged in at read time.
+Signals are persisted in SQLite; follower timelines are an LRU cache
+rebuilt from the trader rings on a miss
+"""
+
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Callable, Deque, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+SOCIAL_DATA_DIR = os.getenv("SOCIAL_DATA_DIR", "social_data")
+TIMELINE_SIZE = 200         # Signal ids kept per follower
+TRADER_RING_SIZE = 200      # Recent signal ids kept per trader
+FANOUT_LIMIT = 10000        # Followers above which a trader is read on demand
+SIGNAL_RETENTION = 100000   # Signals kept in total; older ids drop out of every timeline
+MAX_TIMELINES = 50000       # Follower timelines cached; evicted ones are rebuilt from trader rings
+PRUNE_EVERY = 1000          # Signals published between deletes of rows past retention
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    trader TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+
+class SignalTimelines:
+    """Signal store with per-follower timelines and per-trader rings
+
+    AUTOINCREMENT ids stay unique across restarts and workers; each worker
+    folds in rows past the last id it has seen before serving a read.
+    """
+
+    def __init__(self, followers_of: Callable[[str], Iterable[str]], follower_count: Callable[[str], int],
+                 path: Optional[str] = None, timeline_size: int = TIMELINE_SIZE, fanout_limit: int = FANOUT_LIMIT,
+                 retention: int = SIGNAL_RETENTION, max_timelines: int = MAX_TIMELINES):
+        path = path or os.path.join(SOCIAL_DATA_DIR, "signals.db")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        self.followers_of = followers_of
+        self.follower_count = follower_count
+        self.timeline_size = timeline_size
+        self.fanout_limit = fanout_limit
+        self.retention = retention
+        self.max_timelines = max_timelines
+        self.signals: "OrderedDict[int, Dict]" = OrderedDict()
+        # wallet -> (followed traders it was built for, signal ids), least recently read first
+        self.timelines: "OrderedDict[str, Tuple[FrozenSet[str], Deque[int]]]" = OrderedDict()
+        self.trader_rings: Dict[str, Deque[int]] = {}
+        self.listeners: List[Callable[[Dict], None]] = []   # Called with every new signal, local or not
+        self.publish_listeners: List[Callable[[Dict], None]] = []   # Called once, by the publishing worker
+        self._lock = threading.RLock()
+
+        newest = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM signals").fetchone()[0]
+        self.last_id = max(0, newest - retention)
+        with self._lock:
+            self._catch_up()
+
+    def is_fanout(self, trader: str) -> bool:
+        return self.follower_count(trader) <= self.fanout_limit
+
+    def publish(self, signal: Dict) -> Dict:
+        """Store a signal and push its id to each follower's timeline"""
+        # uid identifies the signal even to stores that outlive this database
+        data = {**signal, "uid": uuid.uuid4().hex}
+        with self._lock:
+            cursor = self._conn.execute("INSERT INTO signals (trader, data) VALUES (?, ?)",
+                                        (signal["trader"], json.dumps(data, separators=(",", ":"))))
+            signal_id = cursor.lastrowid
+            if signal_id % PRUNE_EVERY == 0:
+                self._conn.execute("DELETE FROM signals WHERE id <= ?", (signal_id - self.retention,))
+            self._catch_up()
+        published = {**data, "id": signal_id}
+        for listener in self.publish_listeners:
+            try:
+                listener(published)
+            except Exception as e:
+                print(f"Signal publish listener error: {e}")
+        return published
+
+    def _catch_up(self):
+        """Fold in signals published by this or any other worker since our last look"""
+        rows = self._conn.execute("SELECT id, data FROM signals WHERE id > ? ORDER BY id", (self.last_id,)).fetchall()
+        for signal_id, data in rows:
+            self._fold({**json.loads(data), "id": signal_id})
+            self.last_id = signal_id
+
+    def _fold(self, signal: Dict):
+        signal_id, trader = signal["id"], signal["trader"]
+        self.signals[signal_id] = signal
+        if len(self.signals) > self.retention:
+            self.signals.popitem(last=False)
+
+        self.trader_rings.setdefault(trader, deque(maxlen=TRADER_RING_SIZE)).append(signal_id)
+        # Only cached timelines are pushed to; the rest are rebuilt when next read
+        if self.timelines and self.is_fanout(trader):
+            for wallet in self.followers_of(trader):
+                cached = self.timelines.get(wallet)
+                if cached is not None:
+                    cached[1].append(signal_id)
+        for listener in self.listeners:
+            listener(signal)
+
+    def refresh(self):
+        with self._lock:
+            self._catch_up()
+
+    def subscribe(self, listener: Callable[[Dict], None]):
+        """Replay retained signals to listener, then keep it informed of new ones"""
+        with self._lock:
+            self._catch_up()
+            for signal in self.signals.values():
+                listener(signal)
+            self.listeners.append(listener)
+
+    def on_publish(self, listener: Callable[[Dict], None]):
+        """Call listener with each signal published through this store, exactly once across workers"""
+        self.publish_listeners.append(listener)
+
+    def _timeline(self, wallet: str, following: Set[str]) -> Deque[int]:
+        cached = self.timelines.get(wallet)
+        if cached is not None and cached[0] == following:
+            self.timelines.move_to_end(wallet)
+            return cached[1]
+        # Missing, evicted or built for another set of traders: merge the followed rings
+        rings = [self.trader_rings[trader] for trader in following
+                 if trader in self.trader_rings and self.is_fanout(trader)]
+        timeline = deque(heapq.merge(*rings), maxlen=self.timeline_size)
+        self.timelines[wallet] = (frozenset(following), timeline)
+        self.timelines.move_to_end(wallet)
+        if len(self.timelines) > self.max_timelines:
+            self.timelines.popitem(last=False)
+        return timeline
+
+    def on_follow(self, wallet: str, trader: str):
+        """Drop the wallet's cached timeline so its next read includes the trader's recent signals"""
+        with self._lock:
+            self.timelines.pop(wallet, None)
+
+    def _newest_first(self, ids: Deque[int], before: Optional[int]) -> Iterator[int]:
+        for signal_id in reversed(ids):
+            if before is None or signal_id < before:
+                yield signal_id
+
+    def timeline(self, wallet: str, following: Set[str], cursor: Optional[int] = None,
+                 limit: int = 20) -> Tuple[List[Dict], Optional[int]]:
+        """Newest-first signals from traders the wallet follows, before cursor"""
+        with self._lock:
+            self._catch_up()
+            sources = [self._newest_first(self._timeline(wallet, following), cursor)]
+            # Fan-out-on-read for traders whose signals were not pushed
+            for trader in following:
+                if not self.is_fanout(trader) and trader in self.trader_rings:
+                    sources.append(self._newest_first(self.trader_rings[trader], cursor))
+
+            page = []
+            last_id = None
+            for signal_id in heapq.merge(*sources, reverse=True):
+                if signal_id == last_id:
+                    continue
+                last_id = signal_id
+                signal = self.signals.get(signal_id)
+                # Unfollowed traders are filtered here rather than purged from rings
+                if signal is None or signal["trader"] not in following:
+                    continue
+                page.append(signal)
+                if len(page) == limit:
+                    break
+
+        next_cursor = page[-1]["id"] if len(page) == limit else None
+        return page, next_cursor
+
+    def get(self, signal_id: int) -> Optional[Dict]:
+        """A retained signal by id"""
+        return self.signals.get(signal_id)
+
+    def recent(self, limit: int = 10) -> List[Dict]:
+        """Latest signals across all traders, oldest first"""
+        with self._lock:
+            self._catch_up()
+            return list(islice(reversed(self.signals.values()), limit))[::-1]
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException
-import requests
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict
 from solana_rpc_cache import get_token_accounts_by_owner, get_token_supply, get_account_info
+from jupiter_quotes import quote_cache
 
 router = APIRouter()
 
@@ -40,14 +41,11 @@ async def get_sio_balance(wallet_address: str):
         raise HTTPException(500, f"Failed to get S-IO balance: {str(e)}")
 
 @router.get("/api/sio/price")
-async def get_sio_price():
-    """Get current S-IO token price via Jupiter"""
+def get_sio_price():
+    """Get current S-IO token price via Jupiter; sync because a quote miss blocks on HTTP"""
     try:
         # Get S-IO to SOL price
-        quote_url = f"https://quote-api.jup.ag/v6/quote?inputMint={SIO_TOKEN_MINT}&outputMint=So11111111111111111111111111111111111111112&amount=1000000&slippageBps=50"
-        
-        response = requests.get(quote_url)
-        quote = response.json()
+        quote = quote_cache.get_quote(SIO_TOKEN_MINT, "So11111111111111111111111111111111111111112", 1000000, 50)
         
         if "outAmount" in quote:
             sol_amount = int(quote["outAmount"]) / 1e9
@@ -89,7 +87,7 @@ async def get_sio_stats():
             total_supply = float(result["result"]["value"]["uiAmount"] or 0)
         
         # Get price
-        price_data = await get_sio_price()
+        price_data = await run_in_threadpool(get_sio_price)
         price = price_data["price_usd"]
         
         market_cap = total_supply * price
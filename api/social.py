@@ -3,8 +3,17 @@ from pydantic import BaseModel
 from typing import List, Optional
 import json
 import os
+import time
 from datetime import datetime
 
+from copy_trading import DEFAULT_COPY_AMOUNT, DEFAULT_SLIPPAGE_BPS, FINAL_STATUSES, SIGN_WINDOW, copy_trader
+from follow_graph import FollowGraph
+from live_hub import live_hub
+from pnl_engine import pnl_engine
+from post_store import PostStore
+from search_index import DOC_KINDS, SearchIndex
+from signal_timelines import SignalTimelines
+
 router = APIRouter()
 
 # Data models
@@ -26,49 +35,128 @@ class FollowRequest(BaseModel):
     trader_name: str
     wallet: str
 
+class CopySettingsRequest(BaseModel):
+    trader_name: str
+    wallet: str
+    amount_usd: float = DEFAULT_COPY_AMOUNT
+    slippage_bps: int = DEFAULT_SLIPPAGE_BPS
+
 class PostRequest(BaseModel):
     content: str
     wallet: str
 
+class SignalRequest(BaseModel):
+    trader: str
+    action: str
+    token: str
+    price: str
+    confidence: int
+
 # In-memory storage (replace with database in production)
-trading_signals = []
-community_posts = []
-followers = {}  # {wallet: [trader_names]}
-trader_stats = {
-    'CryptoKing': {'roi': 156.7, 'followers': 2847, 'verified': True},
-    'SolanaWhale': {'roi': 134.2, 'followers': 1923, 'verified': True},
-    'DeFiMaster': {'roi': 98.5, 'followers': 1456, 'verified': False}
+community_posts = PostStore()  # Segmented on disk; only a bounded recent tail in memory
+followers = FollowGraph()  # wallet -> trader edges with reverse index and counters
+trader_stats = {  # Profile flags; ROI and PnL come from pnl_engine
+    'CryptoKing': {'verified': True},
+    'SolanaWhale': {'verified': True},
+    'DeFiMaster': {'verified': False}
 }
 
+signal_timelines = SignalTimelines(
+    followers_of=followers.iter_followers,
+    follower_count=followers.follower_count
+)
+
+search_index = SearchIndex(
+    resolvers={"post": community_posts.get, "signal": signal_timelines.get},
+    checkpoint_path=os.path.join(community_posts.directory, "search_index.npz")
+)
+# Replays only posts newer than the checkpoint, then indexes each new one
+community_posts.subscribe(search_index.add_post, after_id=search_index.last_post_id)
+search_index.checkpoint()
+signal_timelines.subscribe(search_index.add_signal)
+
 @router.get("/api/social/traders")
 async def get_top_traders():
     """Get top performing traders"""
-    return {
-        "traders": [
-            {"name": name, **stats, "avatar": "👑" if name == "CryptoKing" else "🐋" if name == "SolanaWhale" else "🚀"}
-            for name, stats in trader_stats.items()
-        ]
-    }
+    traders = []
+    for name, stats in trader_stats.items():
+        pnl = pnl_engine.summary(name) or {"roi": 0.0, "total_pnl": 0.0}
+        traders.append({
+            "name": name, **stats, "roi": round(pnl["roi"], 2), "pnl": round(pnl["total_pnl"], 2),
+            "followers": followers.follower_count(name),
+            "avatar": "👑" if name == "CryptoKing" else "🐋" if name == "SolanaWhale" else "🚀"
+        })
+    traders.sort(key=lambda trader: trader["roi"], reverse=True)
+    return {"traders": traders}
 
 @router.get("/api/social/signals")
 async def get_trading_signals():
     """Get latest trading signals"""
-    return {"signals": trading_signals[-10:]}  # Last 10 signals
+    return {"signals": signal_timelines.recent(10)}  # Last 10 signals
+
+@router.get("/api/social/signals/{wallet}")
+async def get_signal_timeline(wallet: str, cursor: Optional[int] = None, limit: int = 20):
+    """Get signals from the traders a wallet follows, newest first"""
+    if limit < 1 or limit > 100:
+        raise HTTPException(400, "limit must be between 1 and 100")
+    signals, next_cursor = signal_timelines.timeline(wallet, followers.following_set(wallet), cursor, limit)
+    return {"signals": signals, "next_cursor": next_cursor}
+
+@router.post("/api/social/signal")
+async def publish_signal(request: SignalRequest):
+    """Publish a trading signal to the trader's followers"""
+    signal = TradeSignal(
+        trader=request.trader,
+        action=request.action,
+        token=request.token,
+        price=request.price,
+        confidence=request.confidence,
+        timestamp=datetime.now()
+    )
+    published = signal_timelines.publish({**vars(signal), "timestamp": signal.timestamp.isoformat()})
+    live_hub.publish("signals", published, retain=False)
+    try:
+        copies = copy_trader.enqueue_signal(published)
+    except ValueError as e:
+        return {"success": True, "signal_id": published["id"], "copy_trades": 0, "copy_error": str(e)}
+    return {"success": True, "signal_id": published["id"], "copy_trades": copies}
 
 @router.get("/api/social/posts")
-async def get_community_posts():
-    """Get community posts"""
-    return {"posts": community_posts[-20:]}  # Last 20 posts
+async def get_community_posts(cursor: Optional[str] = None, limit: int = 20):
+    """Get community posts, newest first; pass next_cursor to page back"""
+    check_page_limit(limit, 100)
+    try:
+        posts, next_cursor = community_posts.page(cursor, limit)
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+    return {"posts": posts, "next_cursor": next_cursor}
+
+@router.get("/api/social/posts/{wallet}")
+async def get_user_posts(wallet: str, cursor: Optional[str] = None, limit: int = 20):
+    """Get a wallet's community posts, newest first"""
+    check_page_limit(limit, 100)
+    try:
+        posts, next_cursor = community_posts.user_page(wallet, cursor, limit)
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+    return {"posts": posts, "next_cursor": next_cursor}
+
+@router.get("/api/social/search")
+async def search_social(q: str, type: Optional[str] = None, limit: int = 20):
+    """Search posts and signals by keyword, $cashtag or token mint"""
+    check_page_limit(limit, 100)
+    if type is not None and type not in DOC_KINDS:
+        raise HTTPException(400, f"type must be one of: {', '.join(DOC_KINDS)}")
+    community_posts.refresh()
+    signal_timelines.refresh()
+    results, total = search_index.search(q, type, limit)
+    return {"query": q, "results": results, "total": total}
 
 @router.post("/api/social/follow")
 async def follow_trader(request: FollowRequest):
     """Follow a trader"""
-    if request.wallet not in followers:
-        followers[request.wallet] = []
-    
-    if request.trader_name not in followers[request.wallet]:
-        followers[request.wallet].append(request.trader_name)
-        trader_stats[request.trader_name]['followers'] += 1
+    if followers.follow(request.wallet, request.trader_name):
+        signal_timelines.on_follow(request.wallet, request.trader_name)
         return {"success": True, "message": f"Now following {request.trader_name}"}
     
     return {"success": False, "message": "Already following this trader"}
@@ -76,13 +164,40 @@ async def follow_trader(request: FollowRequest):
 @router.post("/api/social/unfollow")
 async def unfollow_trader(request: FollowRequest):
     """Unfollow a trader"""
-    if request.wallet in followers and request.trader_name in followers[request.wallet]:
-        followers[request.wallet].remove(request.trader_name)
-        trader_stats[request.trader_name]['followers'] -= 1
+    if followers.unfollow(request.wallet, request.trader_name):
+        copy_trader.disable(request.wallet, request.trader_name)
         return {"success": True, "message": f"Unfollowed {request.trader_name}"}
     
     return {"success": False, "message": "Not following this trader"}
 
+@router.post("/api/social/copy-settings")
+async def enable_copy_trading(request: CopySettingsRequest):
+    """Copy a followed trader's future signals at a fixed USDC size"""
+    if request.amount_usd <= 0:
+        raise HTTPException(400, "amount_usd must be positive")
+    if not 1 <= request.slippage_bps <= 1000:
+        raise HTTPException(400, "slippage_bps must be between 1 and 1000")
+    if not followers.is_following(request.wallet, request.trader_name):
+        raise HTTPException(400, "Follow the trader before copying their signals")
+    copy_trader.enable(request.wallet, request.trader_name, request.amount_usd, request.slippage_bps)
+    return {
+        "success": True,
+        "message": f"Copying {request.trader_name} with ${request.amount_usd:g} per signal",
+        "copiers": copy_trader.copier_count(request.trader_name)
+    }
+
+@router.post("/api/social/copy-settings/disable")
+async def disable_copy_trading(request: FollowRequest):
+    """Stop copying a trader's signals while still following them"""
+    if copy_trader.disable(request.wallet, request.trader_name):
+        return {"success": True, "message": f"Stopped copying {request.trader_name}"}
+    return {"success": False, "message": "Not copying this trader"}
+
+@router.get("/api/social/copy-settings/{wallet}")
+async def get_copy_settings(wallet: str):
+    """Traders a wallet copies"""
+    return {"copying": copy_trader.settings(wallet)}
+
 @router.post("/api/social/post")
 async def create_post(request: PostRequest):
     """Create a community post"""
@@ -91,21 +206,117 @@ async def create_post(request: PostRequest):
         content=request.content,
         timestamp=datetime.now()
     )
-    community_posts.append(post)
-    return {"success": True, "message": "Post created successfully"}
+    stored = community_posts.append(request.wallet, {"user": post.user, "content": post.content, "likes": post.likes})
+    return {"success": True, "message": "Post created successfully", "post_id": stored["id"]}
+
+def check_page_limit(limit: int, maximum: int = 200):
+    if limit < 1 or limit > maximum:
+        raise HTTPException(400, f"limit must be between 1 and {maximum}")
 
 @router.get("/api/social/following/{wallet}")
-async def get_following(wallet: str):
+async def get_following(wallet: str, cursor: Optional[str] = None, limit: int = 50):
     """Get traders that a wallet is following"""
-    return {"following": followers.get(wallet, [])}
+    check_page_limit(limit)
+    following, next_cursor = followers.following(wallet, cursor, limit)
+    return {"following": following, "count": followers.following_count(wallet), "next_cursor": next_cursor}
+
+@router.get("/api/social/followers/{name}")
+async def get_followers(name: str, cursor: Optional[str] = None, limit: int = 50):
+    """Get the wallets following a trader"""
+    check_page_limit(limit)
+    page, next_cursor = followers.followers(name, cursor, limit)
+    return {"followers": page, "count": followers.follower_count(name), "next_cursor": next_cursor}
+
+@router.get("/api/social/mutuals/{wallet}")
+async def get_mutuals(wallet: str, cursor: Optional[str] = None, limit: int = 50):
+    """Get accounts that a wallet follows and that follow it back"""
+    check_page_limit(limit)
+    mutuals, next_cursor = followers.mutuals(wallet, cursor, limit)
+    return {"mutuals": mutuals, "next_cursor": next_cursor}
+
+@router.get("/api/social/relationship/{a}/{b}")
+async def get_relationship(a: str, b: str):
+    """Follow relationship between two accounts and how much their followings overlap"""
+    a_follows_b = followers.is_following(a, b)
+    b_follows_a = followers.is_following(b, a)
+    return {
+        "a_follows_b": a_follows_b,
+        "b_follows_a": b_follows_a,
+        "mutual": a_follows_b and b_follows_a,
+        **followers.follower_overlap(a, b)
+    }
 
 @router.post("/api/social/copy-trade")
 async def execute_copy_trade(trade_data: dict):
-    """Execute a copy trade"""
-    # This would integrate with Jupiter API for actual trading
-    # For now, return success simulation
+    """Queue a copy trade; poll its status with the returned job_id"""
+    for field in ("wallet", "action", "token", "price", "amount"):
+        if field not in trade_data:
+            raise HTTPException(400, f"Missing field: {field}")
+    try:
+        job = copy_trader.submit(
+            wallet=trade_data["wallet"],
+            action=trade_data["action"],
+            token=trade_data["token"],
+            price=trade_data["price"],
+            quantity=float(trade_data["amount"]),
+            key=trade_data.get("idempotency_key")
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     return {
         "success": True,
-        "transaction_id": "simulated_tx_" + str(datetime.now().timestamp()),
-        "message": f"Copy trade executed: {trade_data['action']} {trade_data['token']}"
-    }
\ No newline at end of file
+        "job_id": job["key"],
+        "status": job["status"],
+        "message": f"Copy trade queued: {trade_data['action']} {trade_data['token']}"
+    }
+
+def copy_trade_view(job: dict) -> dict:
+    """A job as the client sees it; the unsigned transaction is only offered while it is fresh"""
+    return {
+        **job,
+        "done": job["status"] in FINAL_STATUSES,
+        "tx_expired": job["status"] == "awaiting_signature" and time.time() - job["updated_at"] > SIGN_WINDOW
+    }
+
+@router.get("/api/social/copy-trade/stats")
+async def get_copy_trade_stats():
+    """Copy-trade job counts and quote sharing"""
+    return copy_trader.stats()
+
+@router.get("/api/social/copy-trade/pending/{wallet}")
+async def get_pending_copy_trades(wallet: str, limit: int = 20):
+    """Copy trades built for a wallet and waiting for it to sign"""
+    check_page_limit(limit, 100)
+    return {"jobs": [copy_trade_view(job) for job in copy_trader.pending(wallet, limit)]}
+
+@router.get("/api/social/copy-trade/{job_id}")
+async def get_copy_trade(job_id: str):
+    """Status of a copy-trade job"""
+    job = copy_trader.job(job_id)
+    if job is None:
+        raise HTTPException(404, "Copy trade not found")
+    return copy_trade_view(job)
+
+@router.post("/api/social/copy-trade/{job_id}/signature")
+async def submit_copy_trade_signature(job_id: str, data: dict):
+    """Record the signature of the swap the wallet signed and sent; the job fills once it confirms"""
+    if not data.get("signature"):
+        raise HTTPException(400, "Missing field: signature")
+    if copy_trader.job(job_id) is None:
+        raise HTTPException(404, "Copy trade not found")
+    try:
+        job = copy_trader.submit_signature(job_id, data["signature"])
+    except ValueError as e:
+        raise HTTPException(409, str(e))
+    return copy_trade_view(job)
+
+@router.post("/api/social/copy-trade/{job_id}/rebuild")
+async def rebuild_copy_trade(job_id: str):
+    """Requote and rebuild a transaction that was not signed in time"""
+    if copy_trader.job(job_id) is None:
+        raise HTTPException(404, "Copy trade not found")
+    try:
+        job = copy_trader.rebuild(job_id)
+    except ValueError as e:
+        raise HTTPException(409, str(e))
+    return copy_trade_view(job)
@@ -7,6 +7,7 @@ Bypasses rate limiting with intelligent caching
 import json
 import os
 import requests
+import threading
 import time
 import hashlib
 from typing import Dict, List, Optional, Any
@@ -21,17 +22,36 @@ class SolanaRPCCache:
     def __init__(self, rpc_urls: List[str]):
         self.rpc_urls = rpc_urls
         self.current_rpc_index = 0
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json',
-            'User-Agent': 'Singularity.io/1.0'
-        })
+        # Shared across worker threads: sessions are per thread, the endpoint rotation is locked
+        self._local = threading.local()
+        self._lock = threading.Lock()
         
         # Ensure cache directory exists
         os.makedirs(CACHE_DIR, exist_ok=True)
     
+    @property
+    def session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({
+                'Content-Type': 'application/json',
+                'User-Agent': 'Singularity.io/1.0'
+            })
+            self._local.session = session
+        return session
+    
+    def _rotate(self, rpc_url: str):
+        """Move off a failing endpoint unless another thread already has"""
+        with self._lock:
+            if self.rpc_urls[self.current_rpc_index] == rpc_url:
+                self.current_rpc_index = (self.current_rpc_index + 1) % len(self.rpc_urls)
+    
     def call(self, method: str, params: List[Any], cache_ttl: int = CACHE_EXPIRY) -> Dict:
-        """Make RPC call with intelligent caching"""
+        """Make RPC call with intelligent caching; cache_ttl <= 0 bypasses the cache"""
+        if cache_ttl <= 0:
+            return self._make_rpc_call(method, params, None)
+        
         cache_key = self._generate_cache_key(method, params)
         
         # Check cache first
@@ -67,13 +87,14 @@ class SolanaRPCCache:
         except Exception:
             return None
     
-    def _make_rpc_call(self, method: str, params: List[Any], cache_key: str) -> Dict:
+    def _make_rpc_call(self, method: str, params: List[Any], cache_key: Optional[str]) -> Dict:
         """Make RPC call with fallback and caching"""
         last_error = None
         
         # Try each RPC endpoint
         for attempt in range(len(self.rpc_urls)):
-            rpc_url = self.rpc_urls[self.current_rpc_index]
+            with self._lock:
+                rpc_url = self.rpc_urls[self.current_rpc_index]
             
             try:
                 payload = {
@@ -90,18 +111,19 @@ class SolanaRPCCache:
                     
                     if "error" not in result:
                         # Cache successful result
-                        self._save_to_cache(cache_key, result)
+                        if cache_key:
+                            self._save_to_cache(cache_key, result)
                         return result
                     else:
                         last_error = result["error"]
                 
                 # Rate limit or error - try next RPC
-                self.current_rpc_index = (self.current_rpc_index + 1) % len(self.rpc_urls)
+                self._rotate(rpc_url)
                 time.sleep(RATE_LIMIT_DELAY)
                 
             except Exception as e:
                 last_error = str(e)
-                self.current_rpc_index = (self.current_rpc_index + 1) % len(self.rpc_urls)
+                self._rotate(rpc_url)
                 time.sleep(RATE_LIMIT_DELAY)
         
         # All RPCs failed
@@ -111,8 +133,11 @@ class SolanaRPCCache:
         """Save result to cache"""
         cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
         try:
-            with open(cache_file, 'w') as f:
+            # Write then rename so a concurrent reader never sees a partial file
+            tmp = f"{cache_file}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w') as f:
                 json.dump(data, f, indent=2)
+            os.replace(tmp, cache_file)
         except Exception as e:
             print(f"Failed to save cache: {e}")
 
@@ -123,6 +148,9 @@ RPC_ENDPOINTS = [
     "https://mainnet.helius-rpc.com/?api-key=demo"
 ]
 
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+TOKEN_2022_PROGRAM_ID = "TokenzQdBNbLqP5VEhdkAS6EPFLC1PY1Zw7mD1DxsLu"
+
 # Ensure cache directory exists
 os.makedirs(CACHE_DIR, exist_ok=True)
 
@@ -145,4 +173,18 @@ def get_token_supply(mint_address: str) -> Dict:
 def get_account_info(address: str) -> Dict:
     """Get account info with caching"""
     params = [address, {"encoding": "jsonParsed"}]
-    return rpc_cache.call("getAccountInfo", params, cache_ttl=60)  # 1 minute cache
\ No newline at end of file
+    return rpc_cache.call("getAccountInfo", params, cache_ttl=60)  # 1 minute cache
+
+def get_balance(address: str, cache_ttl: int = 30) -> Dict:
+    """Get SOL balance with caching"""
+    return rpc_cache.call("getBalance", [address], cache_ttl=cache_ttl)  # 30 second cache unless overridden
+
+def get_token_accounts_by_program(wallet_address: str, program_id: str = TOKEN_PROGRAM_ID,
+                                  cache_ttl: int = 60) -> Dict:
+    """Get all token accounts owned by a wallet for a token program with caching"""
+    params = [
+        wallet_address,
+        {"programId": program_id},
+        {"encoding": "jsonParsed"}
+    ]
+    return rpc_cache.call("getTokenAccountsByOwner", params, cache_ttl=cache_ttl)  # 1 minute cache unless overridden
\ No newline at end of file
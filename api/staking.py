@@ -1,69 +1,130 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Dict
+import asyncio
 import json
 from datetime import datetime, timedelta
 
+from staking_ledger import StakingLedger
+
 router = APIRouter()
 
 class StakeRequest(BaseModel):
     wallet: str
     amount: float
+    pool_id: str = "sio_pool"
 
 class UnstakeRequest(BaseModel):
     wallet: str
     amount: float
+    pool_id: str = "sio_pool"
 
 class ClaimRequest(BaseModel):
     wallet: str
 
-# In-memory storage (replace with database in production)
+# Pool configuration seeded into the ledger on first start
 staking_pools = {
     "sio_pool": {
         "name": "S-IO Pool",
         "apy": 24.5,
-        "total_staked": 18500000,
         "min_stake": 100
     },
     "sio_sol_lp": {
         "name": "S-IO-SOL LP",
         "apy": 45.2,
-        "total_staked": 5200000,
         "min_stake": 50
     }
 }
 
-user_stakes = {}  # {wallet: {pool: {amount, start_time, last_claim}}}
+staking_ledger = StakingLedger(seed_pools=staking_pools)
+
+def pool_summary(pool: Dict) -> Dict:
+    return {
+        "name": pool["name"],
+        "apy": pool["apy"],
+        "total_staked": pool["total_staked"],
+        "min_stake": pool["min_stake"],
+        "stakers": pool["stakers"],
+        "rewards_accrued": pool["rewards_accrued"],
+        "rewards_claimed": pool["rewards_claimed"],
+        "rewards_outstanding": pool["rewards_accrued"] - pool["rewards_claimed"]
+    }
 
 @router.get("/api/staking/pools")
 async def get_staking_pools():
     """Get available staking pools"""
-    return {"pools": staking_pools}
+    return {"pools": {pool_id: pool_summary(pool) for pool_id, pool in staking_ledger.pools().items()}}
+
+@router.get("/api/staking/pools/{pool_id}")
+async def get_staking_pool(pool_id: str):
+    """Get a single pool's TVL, staker count and reward totals"""
+    pools = staking_ledger.pools()
+    if pool_id not in pools:
+        raise HTTPException(404, f"Unknown staking pool: {pool_id}")
+    return {"pool_id": pool_id, **pool_summary(pools[pool_id])}
+
+@router.get("/api/staking/pools/{pool_id}/stakers")
+async def get_top_stakers(pool_id: str, top: int = 10, offset: int = 0):
+    """Largest stakers in a pool"""
+    if top < 1 or top > 500:
+        raise HTTPException(400, "top must be between 1 and 500")
+    if offset < 0:
+        raise HTTPException(400, "offset must not be negative")
+    pools = staking_ledger.pools()
+    if pool_id not in pools:
+        raise HTTPException(404, f"Unknown staking pool: {pool_id}")
+    
+    stakers = staking_ledger.top_stakers(pool_id, top, offset)
+    total_staked = pools[pool_id]["total_staked"]
+    return {
+        "pool_id": pool_id,
+        "stakers": [
+            {
+                "rank": offset + i + 1,
+                "wallet": wallet,
+                "amount": amount,
+                "share": (amount / total_staked * 100) if total_staked > 0 else 0
+            }
+            for i, (wallet, amount) in enumerate(stakers)
+        ]
+    }
+
+@router.get("/api/staking/pools/{pool_id}/rank/{wallet}")
+async def get_staker_rank(pool_id: str, wallet: str):
+    """A wallet's rank among a pool's stakers"""
+    ranked = staking_ledger.staker_rank(pool_id, wallet)
+    if ranked is None:
+        raise HTTPException(404, "Wallet has no stake in this pool")
+    
+    rank, amount = ranked
+    return {
+        "pool_id": pool_id,
+        "wallet": wallet,
+        "rank": rank,
+        "amount": amount,
+        "stakers": len(staking_ledger.staker_index(pool_id))
+    }
 
 @router.get("/api/staking/user/{wallet}")
 async def get_user_staking(wallet: str):
     """Get user's staking information"""
-    if wallet not in user_stakes:
+    positions = staking_ledger.wallet_stakes(wallet)
+    if not positions:
         return {
             "total_staked": 0,
             "pending_rewards": 0,
             "stakes": {}
         }
     
+    pools = staking_ledger.pools()
     total_staked = 0
     total_rewards = 0
     stakes = {}
     
-    for pool_id, stake_info in user_stakes[wallet].items():
-        pool = staking_pools[pool_id]
+    for pool_id, stake_info in positions.items():
+        pool = pools[pool_id]
         amount = stake_info["amount"]
-        start_time = stake_info["start_time"]
-        last_claim = stake_info.get("last_claim", start_time)
-        
-        # Calculate rewards
-        time_diff = (datetime.now() - last_claim).total_seconds()
-        daily_rate = pool["apy"] / 100 / 365
-        rewards = amount * daily_rate * (time_diff / 86400)
+        rewards = stake_info["pending_rewards"]
         
         total_staked += amount
         total_rewards += rewards
@@ -73,7 +134,7 @@ async def get_user_staking(wallet: str):
             "amount": amount,
             "apy": pool["apy"],
             "pending_rewards": rewards,
-            "start_time": start_time.isoformat()
+            "start_time": datetime.fromtimestamp(stake_info["start_time"]).isoformat()
         }
     
     return {
@@ -85,79 +146,30 @@ async def get_user_staking(wallet: str):
 @router.post("/api/staking/stake")
 async def stake_tokens(request: StakeRequest):
     """Stake S-IO tokens"""
-    pool_id = "sio_pool"  # Default pool
-    pool = staking_pools[pool_id]
-    
-    if request.amount < pool["min_stake"]:
-        raise HTTPException(400, f"Minimum stake is {pool['min_stake']} S-IO")
-    
-    if request.wallet not in user_stakes:
-        user_stakes[request.wallet] = {}
-    
-    if pool_id in user_stakes[request.wallet]:
-        # Add to existing stake
-        user_stakes[request.wallet][pool_id]["amount"] += request.amount
-    else:
-        # Create new stake
-        user_stakes[request.wallet][pool_id] = {
-            "amount": request.amount,
-            "start_time": datetime.now(),
-            "last_claim": datetime.now()
-        }
-    
-    staking_pools[pool_id]["total_staked"] += request.amount
+    await asyncio.wrap_future(staking_ledger.stake(request.wallet, request.pool_id, request.amount))
     
     return {
         "success": True,
-        "message": f"Successfully staked {request.amount} S-IO tokens",
+        "message": f"Successfully staked {request.amount} S-IO tokens in {request.pool_id}",
         "transaction_id": f"stake_{datetime.now().timestamp()}"
     }
 
 @router.post("/api/staking/unstake")
 async def unstake_tokens(request: UnstakeRequest):
     """Unstake S-IO tokens"""
-    pool_id = "sio_pool"
-    
-    if request.wallet not in user_stakes or pool_id not in user_stakes[request.wallet]:
-        raise HTTPException(400, "No tokens staked")
-    
-    stake_info = user_stakes[request.wallet][pool_id]
-    
-    if request.amount > stake_info["amount"]:
-        raise HTTPException(400, "Cannot unstake more than staked amount")
-    
-    stake_info["amount"] -= request.amount
-    staking_pools[pool_id]["total_staked"] -= request.amount
-    
-    if stake_info["amount"] == 0:
-        del user_stakes[request.wallet][pool_id]
+    await asyncio.wrap_future(staking_ledger.unstake(request.wallet, request.pool_id, request.amount))
     
     return {
         "success": True,
-        "message": f"Successfully unstaked {request.amount} S-IO tokens",
+        "message": f"Successfully unstaked {request.amount} S-IO tokens from {request.pool_id}",
         "transaction_id": f"unstake_{datetime.now().timestamp()}"
     }
 
 @router.post("/api/staking/claim")
 async def claim_rewards(request: ClaimRequest):
     """Claim staking rewards"""
-    if request.wallet not in user_stakes:
-        raise HTTPException(400, "No staking positions found")
-    
-    total_claimed = 0
-    
-    for pool_id, stake_info in user_stakes[request.wallet].items():
-        pool = staking_pools[pool_id]
-        amount = stake_info["amount"]
-        last_claim = stake_info.get("last_claim", stake_info["start_time"])
-        
-        # Calculate rewards
-        time_diff = (datetime.now() - last_claim).total_seconds()
-        daily_rate = pool["apy"] / 100 / 365
-        rewards = amount * daily_rate * (time_diff / 86400)
-        
-        total_claimed += rewards
-        stake_info["last_claim"] = datetime.now()
+    result = await asyncio.wrap_future(staking_ledger.claim(request.wallet))
+    total_claimed = result["total"]
     
     return {
         "success": True,
@@ -166,11 +178,17 @@ async def claim_rewards(request: ClaimRequest):
         "transaction_id": f"claim_{datetime.now().timestamp()}"
     }
 
+@router.get("/api/staking/epochs")
+async def get_reward_epochs(limit: int = 10):
+    """Recent epoch distributions with per-pool rewards and realised APY"""
+    return {"epochs": staking_ledger.recent_epochs(min(max(limit, 1), 100))}
+
 @router.get("/api/staking/apy")
 async def get_current_apy():
     """Get current APY rates"""
+    pools = staking_ledger.pools()
     return {
-        "sio_pool_apy": staking_pools["sio_pool"]["apy"],
-        "sio_sol_lp_apy": staking_pools["sio_sol_lp"]["apy"],
+        "sio_pool_apy": pools["sio_pool"]["apy"],
+        "sio_sol_lp_apy": pools["sio_sol_lp"]["apy"],
         "updated_at": datetime.now().isoformat()
     }
\ No newline at end of file
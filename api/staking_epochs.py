@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Epoch reward distribution
+Computes every staking position's reward for an epoch in one vectorised
+pass over time-weighted balances, records it, and settles all positions to
+the epoch boundary in a single ledger transaction
+"""
+
+import gc
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from staking_ledger import SECONDS_PER_YEAR, LedgerBatch, StakingLedger
+
+EPOCH_SECONDS = int(os.getenv("STAKING_EPOCH_SECONDS", "86400"))
+
+# Signed effect of a journal row on the position balance
+BALANCE_SIGN = {"stake": 1.0, "unstake": -1.0, "claim": 0.0}
+
+
+def reward_index_at(rates: Tuple[np.ndarray, np.ndarray, np.ndarray], t: np.ndarray) -> np.ndarray:
+    """Pool reward_per_token at times t from its (ts, apy, reward_per_token) breakpoints"""
+    ts, apy, index = rates
+    j = np.clip(np.searchsorted(ts, t, side="right") - 1, 0, len(ts) - 1)
+    return index[j] + apy[j] / 100 * (t - ts[j]) / SECONDS_PER_YEAR
+
+
+def time_weighted_rewards(position_pool: np.ndarray, end_balance: np.ndarray, event_position: np.ndarray,
+                          event_ts: np.ndarray, event_before: np.ndarray, event_after: np.ndarray,
+                          start: float, end: float,
+                          rates: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(reward, time-weighted average balance) per position over [start, end]
+
+    Each position's balance is split into constant segments at its events;
+    a segment earns balance * (R(t1) - R(t0)) where R is the pool's
+    cumulative reward per token, so APY changes mid-epoch are exact.
+    Events must be ordered by position, then time.
+    """
+    n = len(position_pool)
+    first = np.ones(len(event_position), dtype=bool)
+    last = np.ones(len(event_position), dtype=bool)
+    if len(event_position):
+        changed = event_position[1:] != event_position[:-1]
+        first[1:] = changed
+        last[:-1] = changed
+
+    quiet = np.ones(n, dtype=bool)
+    quiet[event_position] = False
+    quiet_positions = np.flatnonzero(quiet)
+
+    next_ts = np.empty_like(event_ts)
+    next_ts[:-1] = event_ts[1:]
+    seg_position = np.concatenate([quiet_positions, event_position[first], event_position])
+    seg_t0 = np.concatenate([np.full(len(quiet_positions), start), np.full(first.sum(), start), event_ts])
+    seg_t1 = np.concatenate([np.full(len(quiet_positions), end), event_ts[first], np.where(last, end, next_ts)])
+    seg_balance = np.concatenate([end_balance[quiet_positions], event_before[first], event_after])
+
+    seg_pool = position_pool[seg_position]
+    delta_index = np.zeros(len(seg_position))
+    for pool_code, pool_rates in rates.items():
+        mask = seg_pool == pool_code
+        delta_index[mask] = reward_index_at(pool_rates, seg_t1[mask]) - reward_index_at(pool_rates, seg_t0[mask])
+
+    rewards = np.bincount(seg_position, weights=seg_balance * delta_index, minlength=n)
+    weighted = np.bincount(seg_position, weights=seg_balance * (seg_t1 - seg_t0), minlength=n)
+    return rewards, weighted / max(end - start, 1e-9)
+
+
+def _epoch_operation(batch: LedgerBatch) -> Dict:
+    conn = batch.conn
+    end = batch.now
+    start = conn.execute("SELECT MAX(end_ts) FROM epochs").fetchone()[0]
+    if start is None:
+        start = conn.execute("SELECT MIN(ts) FROM journal").fetchone()[0] or end - EPOCH_SECONDS
+
+    pool_ids = sorted(batch.pools)
+    pool_codes = {pool_id: i for i, pool_id in enumerate(pool_ids)}
+    rates = {}
+    for pool_id in pool_ids:
+        pool = batch.pool(pool_id)
+        rows = conn.execute("SELECT ts, apy, reward_per_token FROM pool_rates WHERE pool_id = ? ORDER BY ts",
+                            (pool_id,)).fetchall()
+        # The current accumulator closes the curve at the epoch end
+        rows.append((end, pool["apy"], pool["reward_per_token"]))
+        rates[pool_codes[pool_id]] = tuple(np.array(column, dtype=np.float64) for column in zip(*rows))
+
+    stakes = conn.execute("SELECT wallet, pool_id, amount FROM stakes").fetchall()
+    wallets, stake_pools, amounts = zip(*stakes) if stakes else ((), (), ())
+    keys: List[Tuple[str, str]] = list(zip(wallets, stake_pools))
+    open_positions = len(keys)
+    position_of = dict(zip(keys, range(open_positions)))
+
+    # Millions of short-lived row tuples would otherwise trigger repeated GC passes; this
+    # runs on the shared writer thread, so collection is paused only while building rows
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        events = conn.execute(
+            "SELECT ts, wallet, pool_id, kind, amount, balance FROM journal "
+            "WHERE ts > ? AND ts <= ? AND wallet IS NOT NULL ORDER BY id",
+            (start, end)
+        ).fetchall()
+        event_rows = []
+        for ts, wallet, pool_id, kind, amount, balance in events:
+            key = (wallet, pool_id)
+            position = position_of.get(key)
+            if position is None:
+                # Closed during the epoch: still earns for the time it was open
+                position = position_of[key] = len(keys)
+                keys.append(key)
+            event_rows.append((position, ts, balance - BALANCE_SIGN.get(kind, 0.0) * amount, balance))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    position_pool = np.array([pool_codes[key[1]] for key in keys], dtype=np.int64)
+    end_balance = np.zeros(len(keys))
+    end_balance[:open_positions] = np.array(amounts, dtype=np.float64)
+    if event_rows:
+        event_position, event_ts, event_before, event_after = (np.array(c) for c in zip(*event_rows))
+        event_position = event_position.astype(np.int64)
+        # Group by position; a stable sort keeps journal order within each
+        order = np.argsort(event_position, kind="stable")
+        event_position, event_ts = event_position[order], event_ts[order]
+        event_before, event_after = event_before[order], event_after[order]
+    else:
+        event_position = np.zeros(0, dtype=np.int64)
+        event_ts = event_before = event_after = np.zeros(0)
+
+    rewards, average = time_weighted_rewards(position_pool, end_balance, event_position, event_ts,
+                                             event_before, event_after, start, end, rates)
+
+    # Settle open positions to the epoch boundary so claims only add accrual since
+    index_now = " ".join("WHEN ? THEN ?" for _ in pool_ids)
+    params = [value for pool_id in pool_ids for value in (pool_id, batch.pools[pool_id]["reward_per_token"])]
+    conn.execute(
+        f"UPDATE stakes SET pending_rewards = pending_rewards + amount * ((CASE pool_id {index_now} END) - reward_index), "
+        f"reward_index = CASE pool_id {index_now} END",
+        params + params
+    )
+
+    pool_rewards = np.bincount(position_pool, weights=rewards, minlength=len(pool_ids))
+    pool_average = np.bincount(position_pool, weights=average, minlength=len(pool_ids))
+    years = (end - start) / SECONDS_PER_YEAR
+    summary = {
+        pool_id: {
+            "rewards": float(pool_rewards[i]),
+            "average_staked": float(pool_average[i]),
+            "realised_apy": float(pool_rewards[i] / pool_average[i] / years * 100) if pool_average[i] > 0 and years > 0 else 0.0
+        }
+        for i, pool_id in enumerate(pool_ids)
+    }
+
+    cursor = conn.execute(
+        "INSERT INTO epochs (start_ts, end_ts, positions, total_rewards, pools) VALUES (?, ?, ?, ?, ?)",
+        (start, end, len(keys), float(rewards.sum()), json.dumps(summary))
+    )
+    epoch_id = cursor.lastrowid
+    paid = np.flatnonzero(rewards > 0)
+    conn.executemany(
+        "INSERT INTO epoch_rewards (epoch_id, wallet, pool_id, average_balance, reward) VALUES (?, ?, ?, ?, ?)",
+        ((epoch_id, keys[i][0], keys[i][1], a, r) for i, a, r in zip(paid.tolist(), average[paid].tolist(),
+                                                                      rewards[paid].tolist()))
+    )
+
+    return {
+        "epoch_id": epoch_id,
+        "start": start,
+        "end": end,
+        "positions": len(keys),
+        "total_rewards": float(rewards.sum()),
+        "pools": summary
+    }
+
+
+def distribute_epoch(ledger: StakingLedger) -> Dict:
+    """Close the epoch since the previous one; runs as a single ledger transaction"""
+    return ledger.submit(_epoch_operation).result()
+
+
+def run_forever(ledger: Optional[StakingLedger] = None, interval: int = EPOCH_SECONDS):
+    """Close an epoch every interval seconds"""
+    if ledger is None:
+        from staking import staking_ledger as ledger
+    while True:
+        started = time.time()
+        try:
+            result = distribute_epoch(ledger)
+            print(f"Epoch {result['epoch_id']}: {result['positions']} positions, "
+                  f"{result['total_rewards']:.4f} S-IO in {time.time() - started:.2f}s")
+        except Exception as e:
+            print(f"Epoch distribution failed: {e}")
+        time.sleep(max(0, interval - (time.time() - started)))
+
+
+if __name__ == "__main__":
+    run_forever()
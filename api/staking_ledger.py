@@ -0,0 +1,430 @@
+"""
+Durable staking ledger
+Pools, stake positions and an operation journal in SQLite (WAL). Stake,
+unstake and claim requests are queued to a writer thread that applies them
+in group-committed transactions, keeping pool aggregates in the same
+transaction as the positions they summarise
+"""
+
+import json
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from ranked_index import RankedIndex
+
+STAKING_DB_PATH = os.getenv("STAKING_DB_PATH", os.path.join("staking_data", "staking.db"))
+SECONDS_PER_YEAR = 365 * 86400
+WRITE_BATCH = 256           # Operations per transaction
+WRITE_BATCH_WAIT = 0.005    # Seconds the writer waits to fill a batch
+WRITE_QUEUE_LIMIT = 20000   # Queued operations before requests are refused
+CACHE_KIB = 65536           # SQLite page cache per connection; epoch jobs touch every position
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pools (
+    pool_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    apy REAL NOT NULL,
+    min_stake REAL NOT NULL,
+    total_staked REAL NOT NULL DEFAULT 0,
+    stakers INTEGER NOT NULL DEFAULT 0,
+    reward_per_token REAL NOT NULL DEFAULT 0,
+    last_update REAL NOT NULL,
+    rewards_accrued REAL NOT NULL DEFAULT 0,
+    rewards_claimed REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS stakes (
+    wallet TEXT NOT NULL,
+    pool_id TEXT NOT NULL,
+    amount REAL NOT NULL,
+    start_time REAL NOT NULL,
+    last_claim REAL NOT NULL,
+    reward_index REAL NOT NULL,
+    pending_rewards REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (wallet, pool_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    wallet TEXT,
+    pool_id TEXT NOT NULL,
+    amount REAL NOT NULL,
+    balance REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS journal_ts ON journal (ts);
+CREATE TABLE IF NOT EXISTS pool_rates (
+    pool_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    apy REAL NOT NULL,
+    reward_per_token REAL NOT NULL,
+    PRIMARY KEY (pool_id, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS epochs (
+    id INTEGER PRIMARY KEY,
+    start_ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    positions INTEGER NOT NULL,
+    total_rewards REAL NOT NULL,
+    pools TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS epoch_rewards (
+    epoch_id INTEGER NOT NULL,
+    wallet TEXT NOT NULL,
+    pool_id TEXT NOT NULL,
+    average_balance REAL NOT NULL,
+    reward REAL NOT NULL,
+    PRIMARY KEY (epoch_id, wallet, pool_id)
+) WITHOUT ROWID;
+"""
+
+POOL_COLUMNS = ("pool_id", "name", "apy", "min_stake", "total_staked", "stakers", "reward_per_token",
+                "last_update", "rewards_accrued", "rewards_claimed")
+STAKE_COLUMNS = ("wallet", "pool_id", "amount", "start_time", "last_claim", "reward_index", "pending_rewards")
+
+SELECT_POOLS = f"SELECT {', '.join(POOL_COLUMNS)} FROM pools"
+SELECT_STAKE = f"SELECT {', '.join(STAKE_COLUMNS)} FROM stakes WHERE wallet = ? AND pool_id = ?"
+SELECT_WALLET = f"SELECT {', '.join(STAKE_COLUMNS)} FROM stakes WHERE wallet = ?"
+UPSERT_STAKE = f"INSERT OR REPLACE INTO stakes ({', '.join(STAKE_COLUMNS)}) VALUES ({', '.join('?' * len(STAKE_COLUMNS))})"
+DELETE_STAKE = "DELETE FROM stakes WHERE wallet = ? AND pool_id = ?"
+UPDATE_POOL = ("UPDATE pools SET apy = ?, total_staked = ?, stakers = ?, reward_per_token = ?, last_update = ?, "
+               "rewards_accrued = ?, rewards_claimed = ? WHERE pool_id = ?")
+INSERT_JOURNAL = "INSERT INTO journal (ts, kind, wallet, pool_id, amount, balance) VALUES (?, ?, ?, ?, ?, ?)"
+INSERT_RATE = "INSERT OR REPLACE INTO pool_rates (pool_id, ts, apy, reward_per_token) VALUES (?, ?, ?, ?)"
+SELECT_JOURNAL_TAIL = "SELECT id, wallet, pool_id, balance FROM journal WHERE id > ? AND wallet IS NOT NULL ORDER BY id"
+# Pool totals rebuilt from the positions that own them; accrued rewards become what is claimed plus what is owed
+RECONCILE_POOLS = """
+UPDATE pools SET
+    total_staked = (SELECT COALESCE(SUM(amount), 0) FROM stakes WHERE stakes.pool_id = pools.pool_id),
+    stakers = (SELECT COUNT(*) FROM stakes WHERE stakes.pool_id = pools.pool_id AND amount > 0),
+    rewards_accrued = rewards_claimed + (
+        SELECT COALESCE(SUM(pending_rewards + amount * (pools.reward_per_token - reward_index)), 0)
+        FROM stakes WHERE stakes.pool_id = pools.pool_id)
+"""
+
+
+def update_pool(pool: Dict, now: float) -> Dict:
+    """Advance a pool's reward_per_token to now at its current APY"""
+    elapsed = now - pool["last_update"]
+    if elapsed > 0:
+        delta = pool["apy"] / 100 * elapsed / SECONDS_PER_YEAR
+        pool["reward_per_token"] += delta
+        pool["rewards_accrued"] += pool["total_staked"] * delta
+        pool["last_update"] = now
+    return pool
+
+
+def accrue_stake(stake: Dict, pool: Dict) -> float:
+    """Bring a stake's pending rewards up to date with its (already updated) pool"""
+    stake["pending_rewards"] += stake["amount"] * (pool["reward_per_token"] - stake["reward_index"])
+    stake["reward_index"] = pool["reward_per_token"]
+    return stake["pending_rewards"]
+
+
+class LedgerBatch:
+    """Write context for one group-committed transaction"""
+
+    def __init__(self, conn: sqlite3.Connection, pools: Dict[str, Dict], now: float):
+        self.conn = conn
+        self.pools = pools
+        self.now = now
+
+    def pool(self, pool_id: str) -> Dict:
+        if pool_id not in self.pools:
+            raise HTTPException(404, f"Unknown staking pool: {pool_id}")
+        return update_pool(self.pools[pool_id], self.now)
+
+    def stake(self, wallet: str, pool_id: str) -> Optional[Dict]:
+        row = self.conn.execute(SELECT_STAKE, (wallet, pool_id)).fetchone()
+        return dict(zip(STAKE_COLUMNS, row)) if row else None
+
+    def wallet_stakes(self, wallet: str) -> List[Dict]:
+        return [dict(zip(STAKE_COLUMNS, row)) for row in self.conn.execute(SELECT_WALLET, (wallet,))]
+
+    def save_stake(self, stake: Dict):
+        self.conn.execute(UPSERT_STAKE, tuple(stake[c] for c in STAKE_COLUMNS))
+
+    def delete_stake(self, stake: Dict):
+        self.conn.execute(DELETE_STAKE, (stake["wallet"], stake["pool_id"]))
+
+    def journal(self, kind: str, wallet: Optional[str], pool_id: str, amount: float, balance: float):
+        self.conn.execute(INSERT_JOURNAL, (self.now, kind, wallet, pool_id, amount, balance))
+
+    def record_rate(self, pool_id: str):
+        """Add a breakpoint to the pool's reward_per_token history at its current APY"""
+        pool = self.pool(pool_id)
+        self.conn.execute(INSERT_RATE, (pool_id, self.now, pool["apy"], pool["reward_per_token"]))
+
+
+Operation = Callable[[LedgerBatch], Dict]
+
+
+class StakingLedger:
+    """SQLite-backed staking state with a single group-committing writer per worker"""
+
+    def __init__(self, path: str = STAKING_DB_PATH, seed_pools: Optional[Dict[str, Dict]] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._write_conn = self._connect()
+        self._write_conn.executescript(SCHEMA)
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+        # Per-pool stakers ranked by amount, built on first use and advanced from the journal
+        self._staker_indexes: Optional[Dict[str, RankedIndex]] = None
+        self._journal_pos = 0
+        self._index_lock = threading.Lock()
+        if seed_pools:
+            self._seed(seed_pools)
+
+        self._queue: "queue.Queue[Tuple[Operation, Future]]" = queue.Queue(maxsize=WRITE_QUEUE_LIMIT)
+        self._writer = threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: transactions are opened explicitly around each batch
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_KIB}")
+        return conn
+
+    def _seed(self, pools: Dict[str, Dict]):
+        now = time.time()
+        conn = self._write_conn
+        conn.execute("BEGIN IMMEDIATE")
+        for pool_id, pool in pools.items():
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO pools (pool_id, name, apy, min_stake, last_update) VALUES (?, ?, ?, ?, ?)",
+                (pool_id, pool["name"], pool["apy"], pool["min_stake"], now)
+            )
+            if cursor.rowcount:
+                conn.execute(INSERT_RATE, (pool_id, now, pool["apy"], 0.0))
+        # Databases seeded with an unowned total_staked accrued rewards nobody can claim
+        conn.execute(RECONCILE_POOLS)
+        conn.execute("COMMIT")
+
+    # Writes
+
+    def submit(self, operation: Operation) -> Future:
+        """Queue an operation; the future resolves with its result once the batch commits"""
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((operation, future))
+        except queue.Full:
+            future.set_exception(HTTPException(503, "Staking ledger is busy, retry shortly"))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + WRITE_BATCH_WAIT
+            while len(batch) < WRITE_BATCH:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[Operation, Future]]):
+        conn = self._write_conn
+        outcomes: List[Tuple[bool, object]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            pools = {row[0]: dict(zip(POOL_COLUMNS, row)) for row in conn.execute(SELECT_POOLS)}
+            ledger = LedgerBatch(conn, pools, time.time())
+            for operation, _ in batch:
+                # Operations validate before mutating, so a rejected one leaves nothing behind
+                conn.execute("SAVEPOINT op")
+                try:
+                    outcomes.append((True, operation(ledger)))
+                    conn.execute("RELEASE op")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    outcomes.append((False, e))
+            conn.executemany(UPDATE_POOL, [
+                (p["apy"], p["total_staked"], p["stakers"], p["reward_per_token"], p["last_update"],
+                 p["rewards_accrued"], p["rewards_claimed"], pool_id)
+                for pool_id, p in pools.items()
+            ])
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (ok, value), (_, future) in zip(outcomes, batch):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def stake(self, wallet: str, pool_id: str, amount: float) -> Future:
+        def operation(ledger: LedgerBatch) -> Dict:
+            # NaN slips past the comparisons below and would fail the whole batch's pool update
+            if not math.isfinite(amount):
+                raise HTTPException(400, "Stake amount must be a finite number")
+            pool = ledger.pool(pool_id)
+            if amount < pool["min_stake"]:
+                raise HTTPException(400, f"Minimum stake is {pool['min_stake']} S-IO")
+
+            stake = ledger.stake(wallet, pool_id)
+            if stake is None:
+                stake = {"wallet": wallet, "pool_id": pool_id, "amount": 0.0, "start_time": ledger.now,
+                         "last_claim": ledger.now, "reward_index": pool["reward_per_token"], "pending_rewards": 0.0}
+            else:
+                # Settle rewards earned on the old amount first
+                accrue_stake(stake, pool)
+            if stake["amount"] == 0:
+                pool["stakers"] += 1
+            stake["amount"] += amount
+            pool["total_staked"] += amount
+            ledger.save_stake(stake)
+            ledger.journal("stake", wallet, pool_id, amount, stake["amount"])
+            return {"pool_id": pool_id, "amount": stake["amount"]}
+        return self.submit(operation)
+
+    def unstake(self, wallet: str, pool_id: str, amount: float) -> Future:
+        def operation(ledger: LedgerBatch) -> Dict:
+            if not math.isfinite(amount) or amount <= 0:
+                raise HTTPException(400, "Unstake amount must be positive")
+            pool = ledger.pool(pool_id)
+            stake = ledger.stake(wallet, pool_id)
+            if stake is None or stake["amount"] == 0:
+                raise HTTPException(400, "No tokens staked")
+            if amount > stake["amount"]:
+                raise HTTPException(400, "Cannot unstake more than staked amount")
+
+            accrue_stake(stake, pool)
+            stake["amount"] -= amount
+            pool["total_staked"] -= amount
+            if stake["amount"] == 0:
+                pool["stakers"] -= 1
+            # A fully unstaked position is kept until its pending rewards are claimed
+            if stake["amount"] == 0 and stake["pending_rewards"] <= 0:
+                ledger.delete_stake(stake)
+            else:
+                ledger.save_stake(stake)
+            ledger.journal("unstake", wallet, pool_id, amount, stake["amount"])
+            return {"pool_id": pool_id, "amount": stake["amount"]}
+        return self.submit(operation)
+
+    def claim(self, wallet: str) -> Future:
+        def operation(ledger: LedgerBatch) -> Dict:
+            stakes = ledger.wallet_stakes(wallet)
+            if not stakes:
+                raise HTTPException(400, "No staking positions found")
+
+            claimed = {}
+            for stake in stakes:
+                pool = ledger.pool(stake["pool_id"])
+                rewards = accrue_stake(stake, pool)
+                pool["rewards_claimed"] += rewards
+                stake["pending_rewards"] = 0.0
+                stake["last_claim"] = ledger.now
+                claimed[stake["pool_id"]] = rewards
+                if stake["amount"] == 0:
+                    ledger.delete_stake(stake)
+                else:
+                    ledger.save_stake(stake)
+                ledger.journal("claim", wallet, stake["pool_id"], rewards, stake["amount"])
+            return {"claimed": claimed, "total": sum(claimed.values())}
+        return self.submit(operation)
+
+    def set_apy(self, pool_id: str, apy: float) -> Future:
+        def operation(ledger: LedgerBatch) -> Dict:
+            if not math.isfinite(apy) or apy < 0:
+                raise HTTPException(400, "APY must be a non-negative number")
+            # Rewards up to now stay accrued at the old rate
+            pool = ledger.pool(pool_id)
+            pool["apy"] = apy
+            ledger.record_rate(pool_id)
+            ledger.journal("apy", None, pool_id, apy, pool["total_staked"])
+            return {"pool_id": pool_id, "apy": apy}
+        return self.submit(operation)
+
+    # Reads
+
+    def _read(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._read_lock:
+            return self._read_conn.execute(sql, params).fetchall()
+
+    def recent_epochs(self, limit: int = 10) -> List[Dict]:
+        rows = self._read("SELECT id, start_ts, end_ts, positions, total_rewards, pools FROM epochs ORDER BY id DESC LIMIT ?",
+                          (limit,))
+        return [
+            {"epoch_id": row[0], "start": row[1], "end": row[2], "positions": row[3],
+             "total_rewards": row[4], "pools": json.loads(row[5])}
+            for row in rows
+        ]
+
+    def pools(self, now: Optional[float] = None) -> Dict[str, Dict]:
+        """Pool rows with rewards accrued up to now (computed, not written)"""
+        now = time.time() if now is None else now
+        return {row[0]: update_pool(dict(zip(POOL_COLUMNS, row)), now) for row in self._read(SELECT_POOLS)}
+
+    def wallet_stakes(self, wallet: str, now: Optional[float] = None) -> Dict[str, Dict]:
+        """A wallet's positions by pool with pending rewards up to now"""
+        pools = self.pools(now)
+        stakes = {}
+        for row in self._read(SELECT_WALLET, (wallet,)):
+            stake = dict(zip(STAKE_COLUMNS, row))
+            accrue_stake(stake, pools[stake["pool_id"]])
+            stakes[stake["pool_id"]] = stake
+        return stakes
+
+    def staker_index(self, pool_id: str) -> RankedIndex:
+        """Ranked stakers of a pool, caught up with writes from every worker"""
+        with self._index_lock:
+            if self._staker_indexes is None:
+                self._build_indexes()
+            else:
+                for row_id, wallet, row_pool, balance in self._read(SELECT_JOURNAL_TAIL, (self._journal_pos,)):
+                    self._journal_pos = row_id
+                    self._index_balance(row_pool, wallet, balance)
+            if pool_id not in self._staker_indexes:
+                raise HTTPException(404, f"Unknown staking pool: {pool_id}")
+            return self._staker_indexes[pool_id]
+
+    def _build_indexes(self):
+        with self._read_lock:
+            conn = self._read_conn
+            conn.execute("BEGIN")
+            try:
+                # One read transaction so the journal position matches the stakes scanned
+                self._journal_pos = conn.execute("SELECT COALESCE(MAX(id), 0) FROM journal").fetchone()[0]
+                pool_ids = [row[0] for row in conn.execute("SELECT pool_id FROM pools")]
+                rows = conn.execute("SELECT pool_id, wallet, amount FROM stakes WHERE amount > 0").fetchall()
+            finally:
+                conn.execute("COMMIT")
+        self._staker_indexes = {pool_id: RankedIndex() for pool_id in pool_ids}
+        for pool_id, wallet, amount in rows:
+            self._staker_indexes[pool_id].update(wallet, amount)
+
+    def _index_balance(self, pool_id: str, wallet: str, balance: float):
+        index = self._staker_indexes.setdefault(pool_id, RankedIndex())
+        if balance > 0:
+            index.update(wallet, balance)
+        else:
+            index.remove(wallet)
+
+    def top_stakers(self, pool_id: str, k: int, offset: int = 0) -> List[Tuple[str, float]]:
+        return self.staker_index(pool_id).top(k, offset)
+
+    def staker_rank(self, pool_id: str, wallet: str) -> Optional[Tuple[int, float]]:
+        """(1-based rank, amount) of a wallet in a pool, or None if it has no stake there"""
+        index = self.staker_index(pool_id)
+        rank = index.rank(wallet)
+        return None if rank is None else (rank, index.score(wallet))
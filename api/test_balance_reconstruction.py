@@ -0,0 +1,188 @@
+"""
+Balance reconstruction tests
+Recorded getTransaction payloads replayed through a stubbed RPC: token
+balance parsing, native vs wrapped SOL and resuming from a checkpoint
+"""
+
+import numpy as np
+import pytest
+
+import balance_reconstruction
+from balance_reconstruction import NATIVE_SOL, SOL_MINT, ReconstructionJob, transaction_deltas
+from portfolio_history import PortfolioHistoryStore
+from solana_rpc_cache import TOKEN_PROGRAM_ID
+
+WALLET = "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU"
+OTHER = "9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM"
+USDC = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+SOL_PRICE, USDC_PRICE = 188.50, 1.00
+
+
+def token_balance(index, mint, owner, amount, decimals):
+    return {"accountIndex": index, "mint": mint, "owner": owner, "programId": TOKEN_PROGRAM_ID,
+            "uiTokenAmount": {"amount": str(amount), "decimals": decimals,
+                              "uiAmount": amount / 10 ** decimals, "uiAmountString": str(amount / 10 ** decimals)}}
+
+
+def parsed_keys(*keys):
+    return [{"pubkey": key, "signer": i == 0, "writable": True, "source": "transaction"}
+            for i, key in enumerate(keys)]
+
+
+# Newest first, as getSignaturesForAddress returns them
+TRANSACTIONS = {
+    # Wrap 1 SOL: lamports leave the wallet, the wSOL token account is credited
+    "sig4": {
+        "blockTime": 400, "slot": 4,
+        "meta": {"err": None, "fee": 5000,
+                 "preBalances": [6_000_005_000, 2_039_280, 1], "postBalances": [5_000_000_000, 1_002_039_280, 1],
+                 "preTokenBalances": [], "postTokenBalances": [token_balance(1, SOL_MINT, WALLET, 10 ** 9, 9)]},
+        "transaction": {"message": {"accountKeys": parsed_keys(WALLET, "wsolAccount", TOKEN_PROGRAM_ID)}},
+    },
+    # Touches the wallet's account list without changing its balances
+    "sig3": {
+        "blockTime": 300, "slot": 3,
+        "meta": {"err": None, "fee": 5000, "preBalances": [10 ** 9, 6_000_005_000], "postBalances": [10 ** 9 - 5000, 6_000_005_000],
+                 "preTokenBalances": [], "postTokenBalances": []},
+        "transaction": {"message": {"accountKeys": parsed_keys(OTHER, WALLET)}},
+    },
+    # USDC received from another owner; the wallet pays the fee
+    "sig2": {
+        "blockTime": 200, "slot": 2,
+        "meta": {"err": None, "fee": 5000,
+                 "preBalances": [6_000_010_000, 2_039_280, 2_039_280], "postBalances": [6_000_005_000, 2_039_280, 2_039_280],
+                 "preTokenBalances": [token_balance(2, USDC, OTHER, 1_000_000_000, 6)],
+                 "postTokenBalances": [token_balance(1, USDC, WALLET, 300_000_000, 6),
+                                       token_balance(2, USDC, OTHER, 700_000_000, 6)]},
+        "transaction": {"message": {"accountKeys": parsed_keys(WALLET, "usdcAccount", "otherUsdcAccount")}},
+    },
+    # Plain SOL transfer in; legacy string account keys
+    "sig1": {
+        "blockTime": None, "slot": 1,
+        "meta": {"err": None, "fee": 5000, "preBalances": [7_000_015_000, 0], "postBalances": [1_000_000_000, 6_000_010_000],
+                 "preTokenBalances": [], "postTokenBalances": []},
+        "transaction": {"message": {"accountKeys": [OTHER, WALLET]}},
+    },
+}
+BLOCK_TIMES = {"sig4": 400, "sig3": 300, "sig2": 200, "sig1": 100}
+
+
+def token_account(mint, amount, decimals):
+    return {"pubkey": f"{mint[:8]}Account", "account": {"data": {"parsed": {"info": {
+        "mint": mint, "owner": WALLET, "tokenAmount": {"amount": str(amount), "decimals": decimals}}}}}}
+
+
+class RecordedRpc:
+    """Serves current holdings, signature pages and the recorded transactions"""
+
+    def __init__(self):
+        self.calls = []
+        self.lamports = 5_000_000_000
+        self.missing = set()    # Signatures whose getTransaction returns null
+
+    def __call__(self, method, params):
+        self.calls.append((method, params[0]))
+        if method == "getTokenAccountsByOwner":
+            accounts = []
+            if params[1]["programId"] == TOKEN_PROGRAM_ID:
+                accounts = [token_account(SOL_MINT, 10 ** 9, 9), token_account(USDC, 300_000_000, 6)]
+            return {"result": {"value": accounts}}
+        if method == "getBalance":
+            return {"result": {"value": self.lamports}}
+        if method == "getSignaturesForAddress":
+            signatures = list(TRANSACTIONS)
+            before = params[1].get("before")
+            start = signatures.index(before) + 1 if before else 0
+            page = signatures[start:start + params[1]["limit"]]
+            return {"result": [{"signature": sig, "blockTime": BLOCK_TIMES[sig]} for sig in page]}
+        if method == "getTransaction":
+            return {"result": None if params[0] in self.missing else TRANSACTIONS[params[0]]}
+        raise AssertionError(f"Unexpected RPC method {method}")
+
+    def count(self, method):
+        return sum(1 for called, _ in self.calls if called == method)
+
+
+@pytest.fixture(autouse=True)
+def fast_paging(monkeypatch):
+    monkeypatch.setattr(balance_reconstruction, "SIGNATURE_PAGE", 2)
+    monkeypatch.setattr(balance_reconstruction, "TX_RETRY_DELAY", 0)
+
+
+def make_job(tmp_path, rpc, store):
+    return ReconstructionJob(WALLET, rpc=rpc, store=store, checkpoint_dir=str(tmp_path / "checkpoints"))
+
+
+def series(job):
+    return {mint: (ts.tolist(), balances.tolist()) for mint, (ts, balances) in job.timeline().items()}
+
+
+EXPECTED_TIMELINE = {
+    NATIVE_SOL: ([100, 200, 400], [6_000_010_000, 6_000_005_000, 5_000_000_000]),
+    SOL_MINT: ([400], [10 ** 9]),
+    USDC: ([200], [300_000_000]),
+}
+EXPECTED_VALUES = [6.00001 * SOL_PRICE, 6.000005 * SOL_PRICE + 300 * USDC_PRICE, 6 * SOL_PRICE + 300 * USDC_PRICE]
+
+
+def test_token_balances_are_parsed_per_owner():
+    block_time, deltas, decimals = transaction_deltas(TRANSACTIONS["sig2"], WALLET)
+    assert block_time == 200
+    assert deltas == {USDC: 300_000_000, NATIVE_SOL: -5000}
+    assert decimals == {USDC: 6, NATIVE_SOL: 9}
+
+    _, deltas, _ = transaction_deltas(TRANSACTIONS["sig2"], OTHER)
+    assert deltas == {USDC: -300_000_000}
+    assert transaction_deltas(TRANSACTIONS["sig3"], WALLET)[1] == {}
+
+
+def test_native_and_wrapped_sol_are_kept_apart():
+    _, deltas, decimals = transaction_deltas(TRANSACTIONS["sig4"], WALLET)
+    assert deltas == {NATIVE_SOL: -1_000_005_000, SOL_MINT: 10 ** 9}
+    assert decimals == {NATIVE_SOL: 9, SOL_MINT: 9}
+    # String account keys resolve the wallet's index the same way
+    assert transaction_deltas(TRANSACTIONS["sig1"], WALLET)[1] == {NATIVE_SOL: 6_000_010_000}
+
+
+def test_reconstructs_balances_and_values(tmp_path):
+    rpc, store = RecordedRpc(), PortfolioHistoryStore(str(tmp_path / "history"), num_shards=2)
+    state = make_job(tmp_path, rpc, store).run()
+    assert state["done"] and state["transactions"] == 4
+    # Stepping back through every transaction leaves the wallet empty before the first one
+    assert {mint: int(amount) for mint, amount in state["balances"].items() if int(amount)} == {}
+
+    assert series(make_job(tmp_path, rpc, store)) == EXPECTED_TIMELINE
+    timestamps, values = store.query(WALLET)
+    assert timestamps.tolist() == [100, 200, 400]
+    assert np.allclose(values, EXPECTED_VALUES, atol=0.01)
+
+
+def test_resumes_from_checkpoint_after_a_failed_page(tmp_path):
+    rpc, store = RecordedRpc(), PortfolioHistoryStore(str(tmp_path / "history"), num_shards=2)
+    rpc.missing.add("sig1")
+    job = make_job(tmp_path, rpc, store)
+    with pytest.raises(RuntimeError):
+        job.run()
+    assert rpc.count("getTransaction") == 2 + 2 + balance_reconstruction.TX_ATTEMPTS - 1
+    assert not store.has_history(WALLET)
+
+    # Rows written after the last checkpoint (a crash mid-page) are discarded on resume
+    with open(job.timeline_path, "a") as f:
+        f.write("150,partial,1\n")
+
+    rpc.missing.clear()
+    rpc.lamports = 1      # Current holdings come from the checkpoint, not a fresh read
+    rpc.calls.clear()
+    state = make_job(tmp_path, rpc, store).run()
+    assert state["done"] and state["transactions"] == 4
+    assert rpc.count("getBalance") == 0 and rpc.count("getTokenAccountsByOwner") == 0
+    assert sorted(sig for method, sig in rpc.calls if method == "getTransaction") == ["sig1", "sig2"]
+
+    assert series(job) == EXPECTED_TIMELINE
+    timestamps, values = store.query(WALLET)
+    assert timestamps.tolist() == [100, 200, 400]
+    assert np.allclose(values, EXPECTED_VALUES, atol=0.01)
+
+    # A finished job is not repeated
+    rpc.calls.clear()
+    assert make_job(tmp_path, rpc, store).run()["done"] and rpc.calls == []
@@ -0,0 +1,188 @@
+"""
+Copy-trade pipeline tests
+Run against a local quote stand-in and stubbed swap build and confirmation
+"""
+
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import copy_trading
+import social
+from copy_trading import MAX_ATTEMPTS, SOL_MINT, USDC_MINT, CopyTrader
+from jupiter_quotes import QuoteCache
+
+SIGNATURE = "5" * 88
+
+
+class SwapStandIn:
+    """Quotes at a fixed rate; builds and confirms on demand"""
+
+    def __init__(self, build_failures=0):
+        self.fetches = []
+        self.build_failures = build_failures
+        self.builds = 0
+        self.confirmations = []     # Results handed out in order; then the swap's own amounts
+        self._lock = threading.Lock()
+
+    def fetch(self, params):
+        with self._lock:
+            self.fetches.append(params)
+        return {"inAmount": str(params["amount"]), "outAmount": str(params["amount"] * 2)}
+
+    def build(self, job, quote):
+        with self._lock:
+            self.builds += 1
+            if self.builds <= self.build_failures:
+                raise RuntimeError("swap API unavailable")
+        return {"tx": f"tx-{job['key']}", "out_amount": int(quote["outAmount"])}
+
+    def confirm(self, job):
+        with self._lock:
+            result = self.confirmations.pop(0) if self.confirmations else "filled"
+        if isinstance(result, Exception):
+            raise result
+        if result == "filled":
+            return {"in_amount": job["amount"], "out_amount": job["out_amount"]}
+        return result
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(copy_trading, "RETRY_BACKOFF", 0.01)
+    monkeypatch.setattr(copy_trading, "CONFIRM_INTERVAL", 0.01)
+
+
+def make_trader(tmp_path, stand_in):
+    return CopyTrader(path=str(tmp_path / "copy_trades.db"), quotes=QuoteCache(fetch=stand_in.fetch),
+                      build=stand_in.build, confirm=stand_in.confirm, workers=2)
+
+
+def wait_for(trader, key, *statuses, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = trader.job(key)
+        if job is not None and job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"{key} never reached {statuses}: {trader.job(key)}")
+
+
+def signal(uid="sig-1", action="BUY"):
+    return {"id": 1, "uid": uid, "trader": "whale", "action": action, "token": "SOL", "price": "100"}
+
+
+def test_followers_on_a_pair_share_one_group_quote(tmp_path):
+    stand_in = SwapStandIn()
+    trader = make_trader(tmp_path, stand_in)
+    for wallet, amount in (("w1", 10), ("w2", 20), ("w3", 10)):
+        trader.enable(wallet, "whale", amount_usd=amount)
+    trader.enable("w4", "whale", amount_usd=10, slippage_bps=100)
+
+    assert trader.enqueue_signal(signal()) == 4
+    for wallet in ("w1", "w2", "w3", "w4"):
+        job = wait_for(trader, f"signal:sig-1:{wallet}", "awaiting_signature")
+        assert job["input_mint"] == USDC_MINT and job["output_mint"] == SOL_MINT
+        assert job["out_amount"] == job["amount"] * 2
+    # One group per (pair, slippage); the equal 10 USDC shares reuse one follower quote
+    assert trader.quote_requests == 2
+    assert trader.orders_quoted == 4
+    amounts = sorted((p["amount"], p["slippageBps"]) for p in stand_in.fetches)
+    assert amounts == [(10_000_000, 50), (10_000_000, 100), (20_000_000, 50), (40_000_000, 50)]
+
+
+def test_repeated_keys_create_one_job(tmp_path):
+    trader = make_trader(tmp_path, SwapStandIn())
+    trader.enable("w1", "whale")
+    assert trader.enqueue_signal(signal()) == 1
+    assert trader.enqueue_signal(signal()) == 0
+    assert trader.enqueue_signal(signal(uid="sig-2")) == 1
+
+    first = trader.submit("w9", "BUY", "SOL", "100", 1.0, key="client-key")
+    again = trader.submit("w9", "SELL", "SOL", "100", 5.0, key="client-key")
+    assert again["created_at"] == first["created_at"] and again["input_mint"] == USDC_MINT
+    assert sum(trader.stats()["jobs"].values()) == 3
+
+
+def test_build_is_retried_then_succeeds(tmp_path):
+    trader = make_trader(tmp_path, SwapStandIn(build_failures=1))
+    job = trader.submit("w1", "BUY", "SOL", "100", 1.0, key="retry")
+    job = wait_for(trader, job["key"], "awaiting_signature")
+    assert job["attempts"] == 2 and job["error"] is None
+
+
+def test_build_fails_after_max_attempts(tmp_path):
+    stand_in = SwapStandIn(build_failures=MAX_ATTEMPTS)
+    trader = make_trader(tmp_path, stand_in)
+    job = trader.submit("w1", "BUY", "SOL", "100", 1.0, key="doomed")
+    job = wait_for(trader, job["key"], "failed")
+    assert job["attempts"] == MAX_ATTEMPTS
+    assert "swap API unavailable" in job["error"]
+    assert stand_in.builds == MAX_ATTEMPTS
+
+
+def test_signature_flow_fills_and_notifies(tmp_path):
+    stand_in = SwapStandIn()
+    stand_in.confirmations = [None, None]   # Not yet confirmed twice, then filled
+    trader = make_trader(tmp_path, stand_in)
+    filled = []
+    trader.subscribe(filled.append)
+    job = trader.submit("w1", "BUY", "SOL", "100", 1.0, key="flow")
+    wait_for(trader, job["key"], "awaiting_signature")
+    assert [j["key"] for j in trader.pending("w1")] == ["flow"]
+
+    assert trader.submit_signature("flow", SIGNATURE)["status"] == "submitted"
+    job = wait_for(trader, "flow", "filled")
+    assert job["in_amount"] == job["amount"]
+    assert [j["key"] for j in filled] == ["flow"]
+    assert trader.pending("w1") == []
+    with pytest.raises(ValueError):
+        trader.submit_signature("flow", "6" * 88)
+
+
+def test_failed_swap_transaction_fails_job(tmp_path):
+    stand_in = SwapStandIn()
+    stand_in.confirmations = [ValueError("Swap transaction failed: slippage")]
+    trader = make_trader(tmp_path, stand_in)
+    trader.submit("w1", "SELL", "SOL", "100", 1.0, key="bad-tx")
+    wait_for(trader, "bad-tx", "awaiting_signature")
+    trader.submit_signature("bad-tx", SIGNATURE)
+    assert "slippage" in wait_for(trader, "bad-tx", "failed")["error"]
+
+
+def test_duplicate_signature_is_a_conflict(tmp_path, monkeypatch):
+    trader = make_trader(tmp_path, SwapStandIn())
+    monkeypatch.setattr(social, "copy_trader", trader)
+    app = FastAPI()
+    app.include_router(social.router)
+    client = TestClient(app)
+
+    for key in ("first", "second"):
+        trader.submit("w1", "BUY", "SOL", "100", 1.0, key=key)
+        wait_for(trader, key, "awaiting_signature")
+    url = "/api/social/copy-trade/{}/signature"
+    assert client.post(url.format("first"), json={"signature": SIGNATURE}).status_code == 200
+    response = client.post(url.format("second"), json={"signature": SIGNATURE})
+    assert response.status_code == 409
+    assert trader.job("second")["status"] == "awaiting_signature"
+    assert client.post(url.format("missing"), json={"signature": SIGNATURE}).status_code == 404
+
+
+def test_signals_after_a_restart_still_copy(tmp_path):
+    from signal_timelines import SignalTimelines
+
+    def store():
+        return SignalTimelines(followers_of=lambda trader: [], follower_count=lambda trader: 0,
+                               path=str(tmp_path / "signals.db"))
+
+    trader = make_trader(tmp_path, SwapStandIn())
+    trader.enable("w1", "whale")
+    first = store().publish({"trader": "whale", "action": "BUY", "token": "SOL", "price": "100"})
+    assert trader.enqueue_signal(first) == 1
+    # A second worker, or this one after a restart, opens its own store
+    second = store().publish({"trader": "whale", "action": "SELL", "token": "SOL", "price": "100"})
+    assert second["id"] != first["id"]
+    assert trader.enqueue_signal(second) == 1
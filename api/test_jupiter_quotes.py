@@ -0,0 +1,169 @@
+"""
+Jupiter quote cache tests
+Coalescing, TTL expiry and the exact, scaled and interpolated paths against
+a local fetch stand-in
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import jupiter_quotes
+from jupiter_quotes import QuoteCache, amount_bucket
+
+SOL = "So11111111111111111111111111111111111111112"
+USDC = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+
+
+class QuoteStandIn:
+    """Quotes at a rate that falls with size; optionally blocks until released"""
+
+    def __init__(self, block=False):
+        self.calls = []
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def __call__(self, params):
+        self.calls.append(params["amount"])
+        self.release.wait(5)
+        amount = params["amount"]
+        return {"inputMint": params["inputMint"], "outputMint": params["outputMint"],
+                "inAmount": str(amount), "outAmount": str(int(amount * self.rate(amount)))}
+
+    @staticmethod
+    def rate(amount):
+        return 2.0 if amount <= 1000 else 1.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_700_000_000.0)
+    monkeypatch.setattr(jupiter_quotes, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def test_concurrent_identical_requests_share_one_fetch():
+    stand_in = QuoteStandIn(block=True)
+    cache = QuoteCache(fetch=stand_in)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_quote(SOL, USDC, 500)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 5
+    while cache.stats()["coalesced"] < 7 and time.time() < deadline:
+        time.sleep(0.01)
+    stand_in.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert stand_in.calls == [500]
+    assert len(results) == 8 and all(r == results[0] for r in results)
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["in_flight"]) == (1, 7, 0)
+
+
+def test_followers_see_the_leaders_error():
+    release = threading.Event()
+    calls = []
+
+    def failing(params):
+        calls.append(params)
+        release.wait(5)
+        raise RuntimeError("quote API down")
+
+    cache = QuoteCache(fetch=failing)
+    errors = []
+
+    def request():
+        try:
+            cache.get_quote(SOL, USDC, 500)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=request) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 5
+    while cache.stats()["coalesced"] < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and errors == ["quote API down"] * 3
+    assert cache.stats()["entries"] == 0
+
+
+def test_quotes_expire_after_ttl(clock):
+    stand_in = QuoteStandIn()
+    cache = QuoteCache(fetch=stand_in, ttl=5)
+    first = cache.get_quote(SOL, USDC, 500)
+    clock.now += 4.9
+    assert cache.get_quote(SOL, USDC, 500) == first
+    clock.now += 0.2
+    cache.get_quote(SOL, USDC, 500)
+    assert stand_in.calls == [500, 500]
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 2)
+
+
+def test_exact_requests_refetch_within_a_bucket(clock):
+    stand_in = QuoteStandIn()
+    cache = QuoteCache(fetch=stand_in)
+    assert amount_bucket(500) == amount_bucket(510)
+    cache.get_quote(SOL, USDC, 500)
+
+    exact = cache.get_quote(SOL, USDC, 510)
+    assert stand_in.calls == [500, 510] and "approximate" not in exact
+
+    # The approximate path rescales the bucket's quote instead of fetching
+    scaled = cache.get_quote(SOL, USDC, 505, approximate=True)
+    assert stand_in.calls == [500, 510]
+    assert scaled["approximate"] and scaled["outAmount"] == str(int(1020 * 505 / 510))
+
+
+def test_approximate_quotes_interpolate_between_buckets(clock):
+    stand_in = QuoteStandIn()
+    cache = QuoteCache(fetch=stand_in)
+    cache.get_quote(SOL, USDC, 1000)     # Rate 2.0
+    cache.get_quote(SOL, USDC, 4000)     # Rate 1.0
+
+    # Half way between the two amounts on a log scale
+    estimate = cache.get_quote(SOL, USDC, 2000, approximate=True)
+    assert estimate["approximate"] and estimate["outAmount"] == str(int(2000 * 1.5))
+    assert stand_in.calls == [1000, 4000]
+
+    # Outside the cached range there is nothing to interpolate, so it fetches
+    cache.get_quote(SOL, USDC, 8000, approximate=True)
+    # Another pair or slippage does not borrow these quotes
+    cache.get_quote(USDC, SOL, 2000, approximate=True)
+    cache.get_quote(SOL, USDC, 2000, slippage_bps=100, approximate=True)
+    assert stand_in.calls == [1000, 4000, 8000, 2000, 2000]
+
+    clock.now += jupiter_quotes.QUOTE_TTL + 1
+    assert cache._interpolate(SOL, USDC, 2000, 50, clock.now) is None
+
+
+def test_http_errors_become_502(monkeypatch):
+    def unavailable(url, params=None, timeout=None):
+        response = requests.Response()
+        response.status_code = 503
+        response.url = url
+        response._content = b'{"error": "rate limited"}'
+        return response
+
+    monkeypatch.setattr(jupiter_quotes.requests, "get", unavailable)
+    monkeypatch.setattr(jupiter_quotes, "quote_cache", QuoteCache())
+    app = FastAPI()
+    app.include_router(jupiter_quotes.router)
+    client = TestClient(app)
+
+    response = client.get("/api/jupiter/quote", params={"inputMint": SOL, "outputMint": USDC, "amount": 500})
+    assert response.status_code == 502
+    assert "503" in response.json()["detail"]
+    assert jupiter_quotes.quote_cache.stats()["entries"] == 0
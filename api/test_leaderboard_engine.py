@@ -0,0 +1,124 @@
+"""
+Leaderboard engine tests
+Rolling windows checked against a brute-force aggregate of the raw fills,
+as time advances and after a reload
+"""
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import leaderboard_engine
+from leaderboard_engine import PERIODS, LeaderboardEngine
+
+START = 1_700_000_000.0
+DAY = 86400
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=START)
+    monkeypatch.setattr(leaderboard_engine, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def make_fills(count, seed=11):
+    rng = random.Random(seed)
+    return [
+        (f"trader{rng.randrange(12)}", rng.uniform(-50, 80), rng.uniform(10, 200), rng.random() < 0.6,
+         START - rng.uniform(0, 45 * DAY))
+        for _ in range(count)
+    ]
+
+
+def expected(fills, period, now):
+    seconds = PERIODS[period]
+    stats = {}
+    for trader, pnl, cost, closing, ts in fills:
+        if seconds is not None and ts <= now - seconds:
+            continue
+        s = stats.setdefault(trader, {"pnl": 0.0, "cost": 0.0, "trades": 0, "closed": 0, "wins": 0})
+        s["pnl"] += pnl
+        s["cost"] += cost
+        s["trades"] += 1
+        s["closed"] += closing
+        s["wins"] += closing and pnl > 0
+    return {
+        trader: {"pnl": s["pnl"], "roi": s["pnl"] / s["cost"] * 100,
+                 "win_rate": s["wins"] / s["closed"] * 100 if s["closed"] else 0.0, "trades": s["trades"]}
+        for trader, s in stats.items()
+    }
+
+
+def assert_matches(engine, fills, now):
+    for period in PERIODS:
+        rows, total = engine.top(period, limit=100)
+        want = expected(fills, period, now)
+        assert total == len(want)
+        assert [row["name"] for row in rows] == sorted(want, key=lambda t: -want[t]["pnl"])
+        for row in rows:
+            for field in ("pnl", "roi", "win_rate", "trades"):
+                assert row[field] == pytest.approx(want[row["name"]][field])
+
+
+def test_windows_match_brute_force(tmp_path, clock):
+    fills = make_fills(400)
+    engine = LeaderboardEngine(str(tmp_path / "fills.db"))
+    for start in range(0, len(fills), 50):
+        engine.record(fills[start:start + 50])
+    assert_matches(engine, fills, clock.now)
+
+
+def test_fills_expire_as_time_passes(tmp_path, clock):
+    fills = make_fills(300)
+    engine = LeaderboardEngine(str(tmp_path / "fills.db"))
+    engine.record(fills)
+    for days in (0.5, 3, 8, 20):
+        clock.now = START + days * DAY
+        assert_matches(engine, fills, clock.now)
+
+
+def test_late_fill_outside_window_only_counts_all_time(tmp_path, clock):
+    engine = LeaderboardEngine(str(tmp_path / "fills.db"))
+    engine.record([("alice", 10.0, 100.0, True, START - 1000)])
+    engine.record([("alice", 5.0, 50.0, True, START - 2 * DAY)])
+    assert engine.rank("daily", "alice")["pnl"] == 10.0
+    assert engine.rank("weekly", "alice")["pnl"] == 15.0
+    clock.now = START + DAY
+    assert engine.rank("daily", "alice") is None
+    assert engine.rank("all-time", "alice")["trades"] == 2
+
+
+def test_reload_rebuilds_windows(tmp_path, clock):
+    fills = make_fills(250)
+    path = str(tmp_path / "fills.db")
+    LeaderboardEngine(path).record(fills)
+    clock.now = START + 2 * DAY
+    assert_matches(LeaderboardEngine(path), fills, clock.now)
+
+
+def test_sort_fields_and_rank(tmp_path, clock):
+    engine = LeaderboardEngine(str(tmp_path / "fills.db"))
+    engine.record([
+        ("alice", 100.0, 1000.0, True, None),
+        ("bob", 50.0, 100.0, True, None),
+        ("bob", -10.0, 100.0, True, None),
+        ("carol", 0.0, 10.0, False, None),
+    ])
+    rows, _ = engine.top("daily", sort_by="roi")
+    assert [row["name"] for row in rows] == ["bob", "alice", "carol"]
+    rows, _ = engine.top("weekly", sort_by="trades", limit=1)
+    assert rows[0]["name"] == "bob" and rows[0]["trades"] == 2
+    assert engine.rank("monthly", "bob", sort_by="win_rate") == {
+        "rank": 2, "name": "bob", "pnl": 40.0, "roi": 20.0, "win_rate": 50.0, "trades": 2}
+
+
+def test_engines_on_one_database_see_each_others_fills(tmp_path, clock):
+    path = str(tmp_path / "fills.db")
+    first, second = LeaderboardEngine(path), LeaderboardEngine(path)
+    fills = make_fills(120)
+    first.record(fills[:60])
+    second.record(fills[60:])
+    assert_matches(first, fills, clock.now)
+    assert_matches(second, fills, clock.now)
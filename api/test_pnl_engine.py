@@ -0,0 +1,162 @@
+"""
+PnL engine tests
+Vectorised FIFO matching checked against a lot-by-lot reference, in one
+batch, split across batches and after a recompute
+"""
+
+import random
+from collections import deque
+
+import numpy as np
+import pytest
+
+from pnl_engine import PnlEngine, match_fifo, segmented_cummin
+
+
+def reference_fifo(group, is_buy, quantity, price):
+    """Lot queue per group; sells past the open quantity stay unmatched"""
+    lots = {}
+    matched, cost = np.zeros(len(group)), np.zeros(len(group))
+    entries = []
+    for i, (g, buy, qty, px) in enumerate(zip(group.tolist(), is_buy.tolist(), quantity.tolist(), price.tolist())):
+        queue = lots.setdefault(g, deque())
+        if buy:
+            lot = [qty, px, i]
+            queue.append(lot)
+            entries.append(lot)
+            continue
+        while qty > 1e-12 and queue:
+            lot = queue[0]
+            take = min(qty, lot[0])
+            matched[i] += take
+            cost[i] += take * lot[1]
+            lot[0] -= take
+            qty -= take
+            if lot[0] <= 1e-12:
+                queue.popleft()
+    remaining = np.zeros(len(group))
+    for qty, _, i in entries:
+        remaining[i] = qty
+    return matched, cost, remaining
+
+
+def random_events(rng, n, groups):
+    group = np.sort(rng.integers(0, groups, n))
+    is_buy = rng.random(n) < 0.55
+    quantity = rng.integers(1, 20, n).astype(float)
+    price = rng.uniform(0.5, 3.0, n)
+    return group, is_buy, quantity, price
+
+
+def test_segmented_cummin():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=200)
+    group = np.sort(rng.integers(0, 9, 200))
+    expected = values.copy()
+    for i in range(1, len(values)):
+        if group[i] == group[i - 1]:
+            expected[i] = min(expected[i], expected[i - 1])
+    assert np.array_equal(segmented_cummin(values, group), expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_match_fifo_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    events = random_events(rng, 500, 15)
+    for actual, want in zip(match_fifo(*events), reference_fifo(*events)):
+        assert np.allclose(actual, want)
+
+
+def test_match_fifo_oversold_and_partial_lots():
+    group = np.array([0, 0, 0, 0, 1, 1])
+    is_buy = np.array([True, True, False, False, False, True])
+    quantity = np.array([5.0, 5.0, 7.0, 10.0, 4.0, 2.0])
+    price = np.array([1.0, 2.0, 3.0, 3.0, 9.0, 4.0])
+    matched, cost, remaining = match_fifo(group, is_buy, quantity, price)
+    assert matched.tolist() == [0, 0, 7, 3, 0, 0]
+    assert cost.tolist() == [0, 0, 5 + 2 * 2, 3 * 2, 0, 0]
+    # A sell before any buy in its group leaves the later lot whole
+    assert remaining.tolist() == [0, 0, 0, 0, 0, 2]
+
+
+def random_fills(count, seed=5):
+    rng = random.Random(seed)
+    return [
+        (f"trader{rng.randrange(4)}", f"mint{rng.randrange(3)}", rng.choice(["buy", "buy", "sell"]),
+         float(rng.randint(1, 30)), round(rng.uniform(0.5, 3.0), 4), 1_700_000_000.0 + i)
+        for i in range(count)
+    ]
+
+
+def reference_positions(fills):
+    keys = sorted({(f[0], f[1]) for f in fills})
+    index = {key: i for i, key in enumerate(keys)}
+    ordered = sorted(fills, key=lambda f: (index[(f[0], f[1])], f[5]))
+    group = np.array([index[(f[0], f[1])] for f in ordered])
+    is_buy = np.array([f[2] == "buy" for f in ordered])
+    quantity = np.array([f[3] for f in ordered])
+    price = np.array([f[4] for f in ordered])
+    matched, cost, remaining = reference_fifo(group, is_buy, quantity, price)
+    realised = matched * price - cost
+    return {
+        key: {"realised_pnl": realised[group == i].sum(), "quantity": remaining[group == i].sum(),
+              "cost_basis": (remaining * price)[group == i].sum()}
+        for key, i in index.items()
+    }
+
+
+def assert_positions(engine, fills):
+    want = reference_positions(fills)
+    for (trader, mint), expected in want.items():
+        position = next(p for p in engine.positions(trader) if p["mint"] == mint)
+        for field, value in expected.items():
+            assert position[field] == pytest.approx(value, abs=1e-6)
+
+
+def test_engine_batches_match_reference(tmp_path):
+    fills = random_fills(600)
+    engine = PnlEngine(str(tmp_path / "trades.db"))
+    for start in range(0, len(fills), 37):
+        engine.process(fills[start:start + 37])
+    assert_positions(engine, fills)
+
+    # A fresh engine rebuilds the same state from the stored trades
+    assert_positions(PnlEngine(str(tmp_path / "trades.db")), fills)
+
+
+def test_summary_marks_open_positions(tmp_path):
+    engine = PnlEngine(str(tmp_path / "trades.db"))
+    results = engine.process([
+        ("alice", "SOL", "buy", 10, 2.0, 1.0),
+        ("alice", "SOL", "buy", 10, 4.0, 2.0),
+        ("alice", "SOL", "sell", 15, 5.0, 3.0),
+    ])
+    assert results[2]["matched_quantity"] == 15
+    assert results[2]["realised_pnl"] == pytest.approx(15 * 5.0 - (10 * 2.0 + 5 * 4.0))
+
+    summary = engine.summary("alice")
+    assert summary["realised_pnl"] == pytest.approx(35.0)
+    assert summary["unrealised_pnl"] == pytest.approx(5 * 5.0 - 5 * 4.0)   # Marked at the last fill
+    assert summary["invested"] == pytest.approx(60.0)
+    assert engine.summary("alice", marks={"SOL": 3.0})["unrealised_pnl"] == pytest.approx(-5.0)
+    assert engine.summary("nobody") is None
+
+
+def test_rejects_bad_fills(tmp_path):
+    engine = PnlEngine(str(tmp_path / "trades.db"))
+    with pytest.raises(ValueError):
+        engine.process([("alice", "SOL", "hold", 1, 1.0, None)])
+    with pytest.raises(ValueError):
+        engine.process([("alice", "SOL", "buy", 0, 1.0, None)])
+    assert engine.recompute() == 0
+
+
+def test_engines_on_one_database_see_each_others_trades(tmp_path):
+    path = str(tmp_path / "trades.db")
+    first, second = PnlEngine(path), PnlEngine(path)
+    first.process([("alice", "SOL", "buy", 10, 2.0, 1.0)])
+    # second matches its sell against the lot first wrote
+    result = second.process([("alice", "SOL", "sell", 4, 3.0, 2.0)])
+    assert result[0]["realised_pnl"] == pytest.approx(4.0)
+    assert first.summary("alice")["realised_pnl"] == pytest.approx(4.0)
+    assert first.positions("alice")[0]["quantity"] == pytest.approx(6.0)
@@ -0,0 +1,101 @@
+"""
+Portfolio history tests
+Chunked storage and downsampling, the enrolment cap and concurrent,
+uncached snapshot runs
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import portfolio
+import portfolio_history
+from portfolio_history import CHUNK_POINTS, PortfolioHistoryStore, TrackedWallets, downsample, run_snapshot
+
+START = 1_700_000_000
+WALLET = "So11111111111111111111111111111111111111112"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PortfolioHistoryStore(str(tmp_path), num_shards=4)
+
+
+def test_points_round_trip_across_chunks(store):
+    count = CHUNK_POINTS * 2 + 10
+    for i in range(count):
+        store.record("w1", 100 + i * 0.25, ts=START + i * 3600)
+    timestamps, values = store.query("w1")
+    assert timestamps.tolist() == [START + i * 3600 for i in range(count)]
+    assert np.allclose(values, [100 + i * 0.25 for i in range(count)])
+
+    timestamps, _ = store.query("w1", START + 10 * 3600, START + 19 * 3600)
+    assert len(timestamps) == 10
+    timestamps, values = store.query("w1", max_points=20)
+    assert len(timestamps) <= 20 and timestamps[-1] == START + (count - 1) * 3600
+
+    # Duplicate or older snapshots are ignored
+    store.record("w1", 1.0, ts=START)
+    assert len(store.query("w1")[0]) == count
+
+
+def test_downsample_rejects_non_positive_points():
+    timestamps = np.arange(10, dtype=np.int64)
+    with pytest.raises(ValueError):
+        downsample(timestamps, timestamps * 1.0, 0)
+    with pytest.raises(ValueError):
+        downsample(timestamps, timestamps * 1.0, -5)
+
+
+def test_performance_rejects_non_positive_points():
+    app = FastAPI()
+    app.include_router(portfolio.router)
+    client = TestClient(app)
+    assert client.get(f"/api/portfolio/performance/{WALLET}?points=-1").status_code == 400
+    assert client.get(f"/api/portfolio/performance/{WALLET}?days=0").status_code == 400
+    assert client.get(f"/api/portfolio/performance/{WALLET}?points=5").status_code == 200
+
+
+def test_tracking_is_capped(tmp_path):
+    tracked = TrackedWallets(str(tmp_path))
+    assert tracked.add("a", limit=2) and tracked.add("b", limit=2)
+    assert not tracked.add("c", limit=2)
+    assert tracked.add("a", limit=2)
+    assert [w for batch in tracked.iter_batches(size=1) for w in batch] == ["a", "b"]
+
+
+def test_snapshot_fetches_concurrently_without_the_file_cache(tmp_path, store, monkeypatch):
+    tracked = TrackedWallets(str(tmp_path))
+    wallets = [f"wallet{i:02d}" for i in range(40)]
+    for wallet in wallets:
+        tracked.add(wallet)
+
+    calls = []
+    in_flight = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def fetch(wallet, cached=True):
+        with lock:
+            calls.append(cached)
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        time.sleep(0.01)
+        with lock:
+            in_flight["now"] -= 1
+        if wallet == "wallet07":
+            raise RuntimeError("RPC unavailable")
+        return [portfolio.SOL_MINT], [int(wallet[-2:]) * 10 ** 9], [9]
+
+    monkeypatch.setattr(portfolio, "fetch_wallet_holdings", fetch)
+    monkeypatch.setattr(portfolio_history, "SNAPSHOT_CONCURRENCY", 4)
+
+    assert run_snapshot(store, tracked) == len(wallets) - 1
+    assert calls == [False] * len(wallets)
+    assert 1 < in_flight["peak"] <= 4
+    _, values = store.query("wallet03")
+    assert values.tolist() == [pytest.approx(3 * portfolio.token_prices[portfolio.SOL_MINT])]
+    assert not store.has_history("wallet07")
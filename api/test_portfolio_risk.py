@@ -0,0 +1,39 @@
+"""
+Portfolio risk endpoint tests
+Served through the main app with stubbed holdings and the mock candle history
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import portfolio
+
+WALLET = "So11111111111111111111111111111111111111112"
+USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def holdings(wallet, cached=True):
+        return [portfolio.SOL_MINT, USDC_MINT], [2 * 10 ** 9, 500 * 10 ** 6], [9, 6]
+
+    monkeypatch.setattr(portfolio, "fetch_wallet_holdings", holdings)
+    return TestClient(main.app)
+
+
+def test_risk_is_served_by_the_main_app(client):
+    response = client.get(f"/api/portfolio/risk/{WALLET}?window=10")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_value"] == pytest.approx(2 * 188.50 + 500)
+    risk = body["risk"]
+    assert risk["symbols"] == ["SOL", "USDC"]
+    assert risk["observations"] == 10
+    assert sum(risk["weights"]) == pytest.approx(1.0)
+    assert len(risk["correlation"]) == 2
+
+
+def test_risk_rejects_bad_input(client):
+    assert client.get(f"/api/portfolio/risk/{WALLET}?window=1").status_code == 400
+    assert client.get("/api/portfolio/risk/not-a-wallet").status_code == 400
@@ -0,0 +1,79 @@
+"""
+Post store tests
+Paging, lookups and replay across segments, the hot tail and restarts
+"""
+
+import os
+
+import pytest
+
+from post_store import INDEX_DTYPE, PostStore
+
+POSTS = 60
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Tiny segments and hot tail so reads cross segment boundaries and fall back to disk
+    store = PostStore(str(tmp_path), segment_bytes=512, hot_tail=8)
+    for i in range(POSTS):
+        store.append(f"wallet{i % 3}", {"wallet": f"wallet{i % 3}", "content": f"post {i}"})
+    return store
+
+
+def all_pages(store, limit):
+    ids, cursor = [], None
+    while True:
+        page, cursor = store.page(cursor, limit)
+        ids.extend(post["id"] for post in page)
+        if cursor is None:
+            return ids
+
+
+def test_pages_walk_every_post_newest_first(store):
+    assert len(store.segments) > 3
+    for limit in (1, 7, 20, POSTS):
+        assert all_pages(store, limit) == list(range(POSTS, 0, -1))
+
+
+def test_get_and_scan(store):
+    for post_id in (1, 17, POSTS - 10, POSTS):
+        assert store.get(post_id)["content"] == f"post {post_id - 1}"
+    assert store.get(0) is None
+    assert store.get(POSTS + 1) is None
+
+    assert [post["id"] for post in store.scan()] == list(range(1, POSTS + 1))
+    for after_id in (0, 5, 33, POSTS - 1, POSTS):
+        assert [post["id"] for post in store.scan(after_id)] == list(range(after_id + 1, POSTS + 1))
+
+
+def test_user_page(store):
+    page, cursor = store.user_page("wallet1", limit=5)
+    assert [post["id"] for post in page] == [59, 56, 53, 50, 47]
+    page, _ = store.user_page("wallet1", cursor, limit=2)
+    assert [post["id"] for post in page] == [44, 41]
+
+
+def test_subscribe_replays_then_follows(store):
+    seen = []
+    store.subscribe(lambda post: seen.append(post["id"]), after_id=POSTS - 3)
+    store.append("wallet0", {"content": "new"})
+    assert seen == [POSTS - 2, POSTS - 1, POSTS, POSTS + 1]
+
+
+def test_second_store_sees_appends(store):
+    other = PostStore(store.directory, segment_bytes=512, hot_tail=8)
+    store.append("wallet0", {"content": "late"})
+    page, _ = other.page(limit=1)
+    assert page[0]["content"] == "late"
+    assert other.append("wallet2", {"content": "next"})["id"] == POSTS + 2
+
+
+def test_recovery_drops_torn_record(store):
+    with open(store._segment_path(store.segments[-1]), "ab") as f:
+        f.write(b'{"id": 999, "trunc')
+    recovered = PostStore(store.directory, segment_bytes=512, hot_tail=8)
+    assert recovered.next_id == POSTS + 1
+    assert all_pages(recovered, 9) == list(range(POSTS, 0, -1))
+    assert recovered.append("wallet0", {"content": "after crash"})["id"] == POSTS + 1
+    assert os.path.getsize(recovered._index_path(recovered.segments[-1])) % INDEX_DTYPE.itemsize == 0
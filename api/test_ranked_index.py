@@ -0,0 +1,78 @@
+"""
+Ranked index tests
+RankedIndex and TokenIndex checked against plain sorted lists
+"""
+
+import random
+
+from ranked_index import RankedIndex
+from token_index import TokenIndex
+
+
+def expected_order(scores):
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def test_ranked_index_matches_sorted_list():
+    rng = random.Random(7)
+    index = RankedIndex(load=4)  # Small buckets so splits and empty buckets are exercised
+    scores = {}
+    for _ in range(2000):
+        item_id = f"id{rng.randrange(200)}"
+        if rng.random() < 0.2:
+            assert index.remove(item_id) == (item_id in scores)
+            scores.pop(item_id, None)
+        else:
+            score = float(rng.randrange(50))
+            index.update(item_id, score)
+            scores[item_id] = score
+
+    ordered = expected_order(scores)
+    assert len(index) == len(scores)
+    assert list(index.iter()) == ordered
+    assert index.top(10, offset=5) == ordered[5:15]
+    for rank, (item_id, score) in enumerate(ordered, start=1):
+        assert index.rank(item_id) == rank
+        assert index.score(item_id) == score
+
+
+def test_ranked_index_missing_items():
+    index = RankedIndex()
+    assert index.rank("missing") is None
+    assert index.score("missing") is None
+    assert not index.remove("missing")
+    assert index.top(5) == []
+
+
+def test_ranked_index_update_moves_item():
+    index = RankedIndex()
+    index.update("a", 1.0)
+    index.update("b", 2.0)
+    index.update("a", 3.0)
+    assert index.top(2) == [("a", 3.0), ("b", 2.0)]
+    assert "a" in index and len(index) == 2
+
+
+def test_token_index_ranks_and_totals():
+    tokens = TokenIndex()
+    tokens.update_token("AAA", price=2.0, supply=100.0, volume_24h=50.0, change_24h=-1.0)
+    tokens.update_token("BBB", price=1.0, supply=500.0, volume_24h=10.0, change_24h=4.0)
+    tokens.update_token("CCC", price=10.0, supply=10.0, volume_24h=90.0, change_24h=2.0)
+
+    assert [t["symbol"] for t in tokens.top(3)] == ["BBB", "AAA", "CCC"]
+    assert [t["symbol"] for t in tokens.top(3, sort_by="volume_24h")] == ["CCC", "AAA", "BBB"]
+    assert [t["rank"] for t in tokens.top(2, offset=1)] == [2, 3]
+    assert tokens.total_market_cap == 800.0
+    assert tokens.total_volume_24h == 150.0
+
+    # A partial update keeps the other fields and re-ranks
+    tokens.update_token("CCC", price=100.0)
+    assert tokens.get("CCC")["volume_24h"] == 90.0
+    assert tokens.rank("CCC") == 1
+    assert tokens.total_market_cap == 1700.0
+
+    tokens.remove_token("CCC")
+    assert tokens.get("CCC") is None
+    assert tokens.rank("CCC", "change_24h") is None
+    assert tokens.total_market_cap == 700.0
+    assert tokens.total_volume_24h == 60.0
@@ -0,0 +1,101 @@
+"""
+Search index tests
+Tokenisation, conjunctive matching against a brute-force scan, and
+checkpoint plus replay against a full rebuild
+"""
+
+import random
+
+import numpy as np
+
+from search_index import SearchIndex, tokenize
+
+SOL_MINT = "So11111111111111111111111111111111111111112"
+VOCABULARY = ["sol", "bonk", "moon", "pump", "dump", "long", "short", "$sol", "$wif", "breakout", SOL_MINT]
+
+
+def test_tokenize():
+    assert tokenize("Buying $SOL and $bonk NOW") == ["buying", "$sol", "sol", "$bonk", "bonk", "now"]
+    assert tokenize(f"mint {SOL_MINT}!") == ["mint", SOL_MINT]
+    assert tokenize("a I x the") == []
+    # A mint-length run without digits is an ordinary word
+    assert tokenize("A" * 40) == ["a" * 40]
+
+
+def make_posts(count, seed=3):
+    rng = random.Random(seed)
+    return [
+        {"id": i, "content": " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(1, 6)))}
+        for i in range(1, count + 1)
+    ]
+
+
+def build(posts, signals=(), **kwargs):
+    by_id = {post["id"]: post for post in posts}
+    signal_by_id = {signal["id"]: signal for signal in signals}
+    index = SearchIndex({"post": by_id.get, "signal": signal_by_id.get}, **kwargs)
+    for post in posts:
+        index.add_post(post)
+    for signal in signals:
+        index.add_signal(signal)
+    return index
+
+
+def result_ids(index, query, kind=None):
+    results, total = index.search(query, kind=kind, limit=1000)
+    assert total == len(results)
+    return [(r["type"], r["id"]) for r in results]
+
+
+def test_search_matches_brute_force():
+    posts = make_posts(300)
+    index = build(posts)
+    for query in ["sol", "moon pump", "$sol", "$wif breakout", SOL_MINT, "long short dump", "missing"]:
+        terms = set(tokenize(query))
+        expected = {post["id"] for post in posts if terms <= set(tokenize(post["content"]))}
+        results, total = index.search(query, limit=1000)
+        assert {r["id"] for r in results} == expected
+        assert total == len(expected)
+        scores = [r["score"] for r in results]
+        assert scores == sorted(scores, reverse=True)
+
+
+def test_kind_filter_and_signal_terms():
+    signals = [{"id": 1, "trader": "whale", "action": "buy", "token": "SOL"},
+               {"id": 2, "trader": "shrimp", "action": "sell", "token": SOL_MINT}]
+    index = build([{"id": 1, "content": "whale alert on $SOL"}], signals)
+    assert set(result_ids(index, "$sol")) == {("post", 1), ("signal", 1)}
+    assert result_ids(index, "whale", kind="signal") == [("signal", 1)]
+    assert result_ids(index, SOL_MINT) == [("signal", 2)]
+
+
+def test_checkpoint_and_replay_match_full_rebuild(tmp_path):
+    posts = make_posts(500)
+    path = str(tmp_path / "search_index.npz")
+    signals = [{"id": 1, "trader": "whale", "action": "buy", "token": "SOL"}]
+
+    first = build(posts[:320], signals, checkpoint_path=path, checkpoint_every=100)
+    first.checkpoint()
+
+    # Restart: load the checkpoint, then replay an overlapping tail
+    by_id = {post["id"]: post for post in posts}
+    restored = SearchIndex({"post": by_id.get, "signal": {}.get}, checkpoint_path=path)
+    assert restored.last_post_id == 320
+    for post in posts[250:]:
+        restored.add_post(post)
+
+    full = build(posts)
+    assert restored.doc_count == full.doc_count == len(posts)
+    for query in ["sol", "moon pump", "$sol", SOL_MINT, "breakout long"]:
+        expected, _ = full.search(query, limit=1000)
+        actual, _ = restored.search(query, limit=1000)
+        assert [(r["id"], r["score"]) for r in actual] == [(r["id"], r["score"]) for r in expected]
+    # Signals are rebuilt from their own store, never from the checkpoint
+    assert result_ids(restored, "whale") == []
+
+
+def test_checkpoint_written_every_n_posts(tmp_path):
+    path = tmp_path / "search_index.npz"
+    build(make_posts(99), checkpoint_path=str(path), checkpoint_every=50)
+    with np.load(path) as data:
+        assert int(data["last_post_id"]) == 50
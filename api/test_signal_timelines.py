@@ -0,0 +1,72 @@
+"""
+Signal timeline tests
+Persistent ids, cross-store catch-up and timelines rebuilt after eviction
+"""
+
+import pytest
+
+from signal_timelines import SignalTimelines
+
+FOLLOWERS = {"whale": ["w1", "w2"], "shrimp": ["w1"]}
+
+
+def make(path, **kwargs):
+    return SignalTimelines(
+        followers_of=lambda trader: FOLLOWERS.get(trader, []),
+        follower_count=lambda trader: len(FOLLOWERS.get(trader, [])),
+        path=path, **kwargs
+    )
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "signals.db")
+
+
+def publish(store, trader, action="BUY"):
+    return store.publish({"trader": trader, "action": action, "token": "SOL", "price": "1"})
+
+
+def test_ids_survive_restart(path):
+    first = make(path)
+    before = [publish(first, "whale")["id"] for _ in range(3)]
+    restarted = make(path)
+    signal = publish(restarted, "whale", "SELL")
+    assert signal["id"] == before[-1] + 1
+    assert signal["uid"] not in {first.get(i)["uid"] for i in before}
+    assert [s["id"] for s in restarted.recent(10)] == before + [signal["id"]]
+
+
+def test_second_store_sees_signals_and_notifies(path):
+    writer, reader = make(path), make(path)
+    seen = []
+    reader.subscribe(lambda signal: seen.append(signal["id"]))
+    published = [publish(writer, "whale")["id"], publish(writer, "shrimp")["id"]]
+    page, _ = reader.timeline("w1", {"whale", "shrimp"})
+    assert [s["id"] for s in page] == published[::-1]
+    assert seen == published
+
+
+def test_evicted_timelines_rebuild_from_rings(path):
+    store = make(path, max_timelines=1)
+    ids = [publish(store, trader)["id"] for trader in ("whale", "shrimp", "whale")]
+    assert [s["id"] for s in store.timeline("w1", {"whale", "shrimp"})[0]] == ids[::-1]
+    assert [s["id"] for s in store.timeline("w2", {"whale"})[0]] == [ids[2], ids[0]]
+    assert list(store.timelines) == ["w2"]
+
+    # w1 was evicted; its next read merges the rings again, including a signal pushed meanwhile
+    ids.append(publish(store, "shrimp")["id"])
+    page, cursor = store.timeline("w1", {"whale", "shrimp"}, limit=2)
+    assert [s["id"] for s in page] == [ids[3], ids[2]]
+    page, _ = store.timeline("w1", {"whale", "shrimp"}, cursor=cursor, limit=2)
+    assert [s["id"] for s in page] == [ids[1], ids[0]]
+
+
+def test_follow_and_unfollow_change_the_feed(path):
+    store = make(path)
+    whale = publish(store, "whale")["id"]
+    shrimp = publish(store, "shrimp")["id"]
+    assert [s["id"] for s in store.timeline("w2", {"whale"})[0]] == [whale]
+    store.on_follow("w2", "shrimp")
+    assert [s["id"] for s in store.timeline("w2", {"whale", "shrimp"})[0]] == [shrimp, whale]
+    assert [s["id"] for s in store.timeline("w2", {"shrimp"})[0]] == [shrimp]
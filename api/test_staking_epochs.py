@@ -0,0 +1,89 @@
+"""
+Epoch distribution tests
+Time-weighted rewards checked by hand across stake changes, an APY change
+and a position closed mid-epoch
+"""
+
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import staking_ledger
+from staking_epochs import distribute_epoch
+from staking_ledger import SECONDS_PER_YEAR, StakingLedger
+
+START = 1_700_000_000.0
+DAY = 86400
+POOLS = {"main": {"name": "Main", "apy": 36.5, "min_stake": 1}}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=START)
+    monkeypatch.setattr(staking_ledger, "time", SimpleNamespace(time=lambda: clock.now, monotonic=time.monotonic))
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "staking.db")
+
+
+def per_token(apy, seconds):
+    return apy / 100 * seconds / SECONDS_PER_YEAR
+
+
+def epoch_rewards(path, epoch_id):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT wallet, average_balance, reward FROM epoch_rewards WHERE epoch_id = ?",
+                        (epoch_id,)).fetchall()
+    conn.close()
+    return {wallet: (average, reward) for wallet, average, reward in rows}
+
+
+def test_epoch_rewards_follow_balance_and_rate_changes(path, clock):
+    ledger = StakingLedger(path, seed_pools=POOLS)
+    for wallet, amount in (("alice", 100), ("bob", 100), ("carol", 50)):
+        ledger.stake(wallet, "main", amount).result()
+
+    clock.now = START + DAY
+    ledger.stake("alice", "main", 100).result()
+    clock.now = START + 2 * DAY
+    ledger.set_apy("main", 73.0).result()
+    clock.now = START + 2.5 * DAY
+    ledger.unstake("carol", "main", 50).result()
+    ledger.claim("carol").result()      # Closes the position entirely
+    clock.now = START + 3 * DAY
+
+    result = distribute_epoch(ledger)
+    assert (result["start"], result["end"]) == (START, START + 3 * DAY)
+    assert result["positions"] == 3
+
+    first, second = per_token(36.5, DAY), per_token(73.0, DAY)
+    rewards = epoch_rewards(path, result["epoch_id"])
+    assert rewards["alice"][1] == pytest.approx(100 * first + 200 * first + 200 * second)
+    assert rewards["alice"][0] == pytest.approx(500 / 3)
+    assert rewards["bob"][1] == pytest.approx(100 * (2 * first + second))
+    assert rewards["carol"][1] == pytest.approx(50 * (2 * first + second / 2))
+    assert result["total_rewards"] == pytest.approx(sum(reward for _, reward in rewards.values()))
+
+    # Open positions are settled to the boundary, matching the epoch's own figures
+    for wallet in ("alice", "bob"):
+        assert ledger.wallet_stakes(wallet, now=clock.now)["main"]["pending_rewards"] == pytest.approx(
+            rewards[wallet][1])
+
+
+def test_next_epoch_starts_at_the_previous_boundary(path, clock):
+    ledger = StakingLedger(path, seed_pools=POOLS)
+    ledger.stake("alice", "main", 100).result()
+    clock.now = START + DAY
+    first = distribute_epoch(ledger)
+
+    clock.now = START + 3 * DAY
+    second = distribute_epoch(ledger)
+    assert second["start"] == first["end"]
+    assert epoch_rewards(path, second["epoch_id"])["alice"][1] == pytest.approx(100 * per_token(36.5, 2 * DAY))
+    assert ledger.recent_epochs()[0]["epoch_id"] == second["epoch_id"]
+
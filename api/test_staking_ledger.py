@@ -0,0 +1,136 @@
+"""
+Staking ledger tests
+Positions, pool totals, reward accounting and the staker ranking
+"""
+
+import sqlite3
+
+import pytest
+from fastapi import HTTPException
+
+from staking_ledger import StakingLedger
+
+POOLS = {
+    "main": {"name": "Main", "apy": 50.0, "min_stake": 10},
+    "lp": {"name": "LP", "apy": 20.0, "min_stake": 1},
+}
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return StakingLedger(str(tmp_path / "staking.db"), seed_pools=POOLS)
+
+
+def test_stake_and_unstake_track_pool_totals(ledger):
+    ledger.stake("alice", "main", 100).result()
+    ledger.stake("bob", "main", 50).result()
+    ledger.stake("alice", "main", 25).result()
+    ledger.unstake("bob", "main", 20).result()
+
+    pool = ledger.pools()["main"]
+    assert pool["total_staked"] == 155
+    assert pool["stakers"] == 2
+    assert ledger.wallet_stakes("alice")["main"]["amount"] == 125
+
+
+def test_pools_start_without_unowned_stake(ledger):
+    pools = ledger.pools()
+    assert all(pool["total_staked"] == 0 and pool["rewards_accrued"] == 0 for pool in pools.values())
+
+
+def test_rejected_operations_leave_no_trace(ledger):
+    ledger.stake("alice", "main", 100).result()
+    for future, status in [
+        (ledger.stake("alice", "main", 5), 400),       # Below min_stake
+        (ledger.stake("alice", "nope", 100), 404),
+        (ledger.unstake("alice", "main", 0), 400),
+        (ledger.unstake("alice", "main", -10), 400),
+        (ledger.unstake("alice", "main", 101), 400),
+        (ledger.unstake("bob", "main", 1), 400),
+        (ledger.stake("alice", "main", float("nan")), 400),
+        (ledger.stake("alice", "main", float("inf")), 400),
+        (ledger.unstake("alice", "main", float("nan")), 400),
+        (ledger.set_apy("main", float("nan")), 400),
+    ]:
+        with pytest.raises(HTTPException) as raised:
+            future.result()
+        assert raised.value.status_code == status
+
+    pool = ledger.pools()["main"]
+    assert pool["total_staked"] == 100 and pool["stakers"] == 1
+
+
+def test_non_finite_amount_does_not_fail_its_batch(ledger):
+    # Submitted together so they land in one writer batch
+    futures = [ledger.stake("alice", "main", 100), ledger.stake("bob", "main", float("nan")),
+               ledger.stake("carol", "main", 20)]
+    assert futures[0].result()["amount"] == 100
+    with pytest.raises(HTTPException):
+        futures[1].result()
+    assert futures[2].result()["amount"] == 20
+    assert ledger.pools()["main"]["total_staked"] == 120
+
+
+def test_accrued_rewards_equal_claimed_plus_pending(ledger):
+    ledger.stake("alice", "main", 1000).result()
+    ledger.stake("bob", "main", 3000).result()
+    ledger.stake("alice", "lp", 500).result()
+    ledger.claim("alice").result()
+    ledger.unstake("bob", "main", 3000).result()
+
+    now = ledger.pools()["main"]["last_update"] + 86400
+    pools = ledger.pools(now)
+    pending = {pool_id: 0.0 for pool_id in pools}
+    for wallet in ("alice", "bob"):
+        for pool_id, stake in ledger.wallet_stakes(wallet, now).items():
+            pending[pool_id] += stake["pending_rewards"]
+    for pool_id, pool in pools.items():
+        assert pool["rewards_accrued"] == pytest.approx(pool["rewards_claimed"] + pending[pool_id])
+
+
+def test_restart_drops_phantom_total(tmp_path):
+    path = str(tmp_path / "staking.db")
+    ledger = StakingLedger(path, seed_pools=POOLS)
+    ledger.stake("alice", "main", 100).result()
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE pools SET total_staked = total_staked + 18500000, rewards_accrued = 1e6")
+    conn.commit()
+    conn.close()
+
+    pool = StakingLedger(path, seed_pools=POOLS).pools()["main"]
+    assert pool["total_staked"] == 100
+    assert pool["stakers"] == 1
+    assert pool["rewards_accrued"] < 1
+
+
+def test_staker_ranking_follows_writes(ledger):
+    ledger.stake("alice", "main", 100).result()
+    ledger.stake("bob", "main", 300).result()
+    assert ledger.top_stakers("main", 10) == [("bob", 300), ("alice", 100)]
+
+    ledger.stake("carol", "main", 200).result()
+    ledger.unstake("bob", "main", 300).result()
+    assert ledger.top_stakers("main", 10) == [("carol", 200), ("alice", 100)]
+    assert ledger.staker_rank("main", "alice") == (2, 100)
+    assert ledger.staker_rank("main", "bob") is None
+    with pytest.raises(HTTPException):
+        ledger.staker_index("nope")
+
+
+def test_stakers_endpoint_pages_by_offset(ledger, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    import staking
+
+    monkeypatch.setattr(staking, "staking_ledger", ledger)
+    app = FastAPI()
+    app.include_router(staking.router)
+    client = TestClient(app)
+    for wallet, amount in (("alice", 100), ("bob", 300), ("carol", 200)):
+        ledger.stake(wallet, "main", amount).result()
+
+    body = client.get("/api/staking/pools/main/stakers?top=2&offset=1").json()
+    assert [(s["rank"], s["wallet"]) for s in body["stakers"]] == [(2, "carol"), (3, "alice")]
+    assert client.get("/api/staking/pools/main/stakers?offset=-1").status_code == 400
+    assert client.get("/api/staking/pools/nope/stakers").status_code == 404
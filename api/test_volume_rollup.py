@@ -0,0 +1,82 @@
+"""
+Volume rollup tests
+Window summaries and distributions checked against raw trades, including
+recycled ring slots
+"""
+
+import numpy as np
+import pytest
+
+from volume_rollup import VolumeRollup
+
+HOUR = 3600
+NOW = 1_700_000_000 - 1_700_000_000 % HOUR + 1800    # Half way through an hour
+
+
+def raw_window(trades, seconds, now):
+    current = now - now % HOUR
+    return [v for v, ts in trades if current - seconds < ts - ts % HOUR <= current]
+
+
+def test_summary_matches_raw_trades():
+    rng = np.random.default_rng(4)
+    volumes = rng.uniform(1, 500, 2000)
+    timestamps = NOW - rng.integers(0, 40 * 86400, 2000)
+    rollup = VolumeRollup()
+    rollup.add_trades(volumes[:1000], timestamps[:1000])
+    for v, ts in zip(volumes[1000:].tolist(), timestamps[1000:].tolist()):
+        rollup.add_trade(v, ts)
+
+    trades = list(zip(volumes.tolist(), timestamps.tolist()))
+    for seconds in (86400, 7 * 86400, 30 * 86400):
+        window = raw_window(trades, seconds, NOW)
+        summary = rollup.summary(seconds, now=NOW)
+        assert summary["total_trades"] == len(window)
+        assert summary["total_volume"] == pytest.approx(sum(window))
+        assert summary["min_trade"] == pytest.approx(min(window))
+        assert summary["max_trade"] == pytest.approx(max(window))
+
+
+def test_distribution_is_zero_filled():
+    rollup = VolumeRollup()
+    rollup.add_trade(10.0, NOW)
+    rollup.add_trade(5.0, NOW - 3 * HOUR)
+    buckets = rollup.distribution(86400, now=NOW)
+    assert len(buckets) == 24
+    assert [b["volume"] for b in buckets[-4:]] == [5.0, 0.0, 0.0, 10.0]
+    assert sum(b["trades"] for b in buckets) == 2
+    assert buckets[-1]["timestamp"].endswith(":00:00")
+
+
+def test_recycled_slots_do_not_leak_into_windows():
+    rollup = VolumeRollup(capacity=24)
+    rollup.add_trade(7.0, NOW - 2 * HOUR)
+    # A day later the same slot is reused; the old bucket must not be reported
+    later = NOW + 86400
+    rollup.add_trade(3.0, later - 2 * HOUR)
+    assert [b["volume"] for b in rollup.distribution(86400, now=later)[-3:]] == [3.0, 0.0, 0.0]
+    assert rollup.summary(2 * 86400, now=later)["total_volume"] == 3.0
+
+    # Trades older than the ring's current occupant are dropped
+    rollup.add_trade(100.0, NOW - 2 * HOUR)
+    assert rollup.summary(2 * 86400, now=later)["total_volume"] == 3.0
+
+
+def test_confirmed_copy_trades_count_towards_volume(monkeypatch):
+    import analytics
+    import main
+    from fastapi.testclient import TestClient
+    from copy_trading import SOL_MINT, USDC_MINT, copy_trader
+
+    # Mounting the analytics router is what registers the fill listener
+    assert TestClient(main.app).get("/api/analytics/volume").status_code == 200
+    assert analytics.record_trade_volume in copy_trader._listeners
+
+    rollup = VolumeRollup()
+    monkeypatch.setattr(analytics, "volume_rollup", rollup)
+    analytics.record_trade_volume({"input_mint": USDC_MINT, "output_mint": SOL_MINT, "in_amount": 250_000_000,
+                                   "out_amount": 2_000_000_000, "updated_at": NOW})
+    analytics.record_trade_volume({"input_mint": SOL_MINT, "output_mint": "other", "in_amount": 1,
+                                   "out_amount": 1, "updated_at": NOW})
+    summary = rollup.summary(86400, now=NOW)
+    assert summary["total_trades"] == 1 and summary["total_volume"] == pytest.approx(250.0)
@@ -0,0 +1,89 @@
+"""
+Top-K token index
+Keeps tokens ranked by market cap, 24h volume and 24h change, updated
+incrementally as prices or supplies change
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+from ranked_index import RankedIndex
+
+SORT_FIELDS = ("market_cap", "volume_24h", "change_24h")
+
+
+class TokenIndex:
+    """Token records plus one ranked index per sortable field"""
+
+    def __init__(self):
+        self.tokens: Dict[str, Dict] = {}
+        self.indexes = {field: RankedIndex() for field in SORT_FIELDS}
+        self.total_market_cap = 0.0
+        self.total_volume_24h = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def update_token(self, symbol: str, name: Optional[str] = None, price: Optional[float] = None,
+                     supply: Optional[float] = None, volume_24h: Optional[float] = None,
+                     change_24h: Optional[float] = None):
+        """Insert or update a token; only the supplied fields change"""
+        with self._lock:
+            token = self.tokens.get(symbol)
+            if token is None:
+                token = {"symbol": symbol, "name": name or symbol, "price": 0.0, "supply": 0.0,
+                         "market_cap": 0.0, "volume_24h": 0.0, "change_24h": 0.0}
+                self.tokens[symbol] = token
+
+            self.total_market_cap -= token["market_cap"]
+            self.total_volume_24h -= token["volume_24h"]
+
+            if name is not None:
+                token["name"] = name
+            if price is not None:
+                token["price"] = price
+            if supply is not None:
+                token["supply"] = supply
+            if volume_24h is not None:
+                token["volume_24h"] = volume_24h
+            if change_24h is not None:
+                token["change_24h"] = change_24h
+            token["market_cap"] = token["price"] * token["supply"]
+
+            self.total_market_cap += token["market_cap"]
+            self.total_volume_24h += token["volume_24h"]
+            for field, index in self.indexes.items():
+                index.update(symbol, token[field])
+
+    def remove_token(self, symbol: str):
+        with self._lock:
+            token = self.tokens.pop(symbol, None)
+            if token is None:
+                return
+            self.total_market_cap -= token["market_cap"]
+            self.total_volume_24h -= token["volume_24h"]
+            for index in self.indexes.values():
+                index.remove(symbol)
+
+    def top(self, limit: int = 10, sort_by: str = "market_cap", offset: int = 0) -> List[Dict]:
+        """Top tokens by the given field, with ranks"""
+        with self._lock:
+            entries = self.indexes[sort_by].top(limit, offset)
+            return [
+                {"rank": offset + i + 1, **self.tokens[symbol]}
+                for i, (symbol, _) in enumerate(entries)
+            ]
+
+    def rank(self, symbol: str, sort_by: str = "market_cap") -> Optional[int]:
+        with self._lock:
+            return self.indexes[sort_by].rank(symbol)
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        with self._lock:
+            token = self.tokens.get(symbol)
+            return dict(token) if token else None
+
+
+# Global token index instance
+token_index = TokenIndex()
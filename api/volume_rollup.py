@@ -0,0 +1,137 @@
+"""
+Time-bucketed volume rollups
+Trade events are folded into a fixed ring of time buckets holding running
+sums, counts and min/max trade sizes; stale buckets are recycled in place
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BUCKET_SECONDS = 3600          # Hourly buckets
+BUCKET_CAPACITY = 24 * 30      # 30 days of history
+
+WINDOWS = {
+    "24h": 86400,
+    "7d": 7 * 86400,
+    "30d": 30 * 86400
+}
+
+
+class VolumeRollup:
+    """Ring buffer of time buckets with running volume aggregates"""
+
+    def __init__(self, bucket_seconds: int = BUCKET_SECONDS, capacity: int = BUCKET_CAPACITY):
+        self.bucket_seconds = bucket_seconds
+        self.capacity = capacity
+        self.start = np.full(capacity, -1, dtype=np.int64)
+        self.volume = np.zeros(capacity, dtype=np.float64)
+        self.trades = np.zeros(capacity, dtype=np.int64)
+        self.min_trade = np.full(capacity, np.inf)
+        self.max_trade = np.zeros(capacity, dtype=np.float64)
+        self._lock = threading.Lock()
+
+    def _slot(self, ts: int) -> Optional[int]:
+        bucket = ts - ts % self.bucket_seconds
+        i = (bucket // self.bucket_seconds) % self.capacity
+        if self.start[i] != bucket:
+            if self.start[i] > bucket:
+                return None  # Older than anything the ring still holds
+            self.start[i] = bucket
+            self.volume[i] = 0.0
+            self.trades[i] = 0
+            self.min_trade[i] = np.inf
+            self.max_trade[i] = 0.0
+        return i
+
+    def add_trade(self, volume: float, ts: Optional[int] = None):
+        """Ingest a single trade event"""
+        ts = int(time.time()) if ts is None else int(ts)
+        with self._lock:
+            i = self._slot(ts)
+            if i is None:
+                return
+            self.volume[i] += volume
+            self.trades[i] += 1
+            if volume < self.min_trade[i]:
+                self.min_trade[i] = volume
+            if volume > self.max_trade[i]:
+                self.max_trade[i] = volume
+
+    def add_trades(self, volumes: np.ndarray, timestamps: np.ndarray):
+        """Ingest a batch of trade events with grouped array updates"""
+        volumes = np.asarray(volumes, dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        buckets = timestamps - timestamps % self.bucket_seconds
+        with self._lock:
+            for bucket in np.unique(buckets).tolist():
+                i = self._slot(bucket)
+                if i is None:
+                    continue
+                sel = volumes[buckets == bucket]
+                self.volume[i] += sel.sum()
+                self.trades[i] += len(sel)
+                self.min_trade[i] = min(self.min_trade[i], sel.min())
+                self.max_trade[i] = max(self.max_trade[i], sel.max())
+
+    def load_bucket(self, bucket_start: int, volume: float, trades: int,
+                    min_trade: float = 0.0, max_trade: float = 0.0):
+        """Set a bucket's aggregates directly, e.g. when backfilling history"""
+        with self._lock:
+            i = self._slot(bucket_start)
+            if i is None:
+                return
+            self.volume[i] = volume
+            self.trades[i] = trades
+            self.min_trade[i] = min_trade
+            self.max_trade[i] = max_trade
+
+    def _window_mask(self, seconds: int, now: int) -> np.ndarray:
+        current = now - now % self.bucket_seconds
+        return (self.start >= 0) & (self.start > current - seconds) & (self.start <= current)
+
+    def summary(self, seconds: int, now: Optional[int] = None) -> Dict:
+        """Totals and averages over the trailing window"""
+        now = int(time.time()) if now is None else int(now)
+        with self._lock:
+            mask = self._window_mask(seconds, now)
+            volume = float(self.volume[mask].sum())
+            trades = int(self.trades[mask].sum())
+            active = mask & (self.trades > 0)
+            min_trade = float(self.min_trade[active].min()) if active.any() else 0.0
+            max_trade = float(self.max_trade[active].max()) if active.any() else 0.0
+        buckets = seconds // self.bucket_seconds
+        return {
+            "total_volume": volume,
+            "total_trades": trades,
+            "avg_trade_size": volume / trades if trades else 0.0,
+            "avg_volume_per_bucket": volume / buckets if buckets else 0.0,
+            "min_trade": min_trade,
+            "max_trade": max_trade
+        }
+
+    def distribution(self, seconds: int, now: Optional[int] = None) -> List[Dict]:
+        """Per-bucket volume and trade counts over the trailing window, oldest first
+
+        Always one entry per bucket in the window; buckets with no trades are zero.
+        """
+        now = int(time.time()) if now is None else int(now)
+        current = now - now % self.bucket_seconds
+        count = max(1, seconds // self.bucket_seconds)
+        starts = current - np.arange(count - 1, -1, -1, dtype=np.int64) * self.bucket_seconds
+        slots = (starts // self.bucket_seconds) % self.capacity
+        with self._lock:
+            # A slot only holds a bucket if it has not been recycled for another period
+            valid = self.start[slots] == starts
+            volumes = np.round(np.where(valid, self.volume[slots], 0.0), 2).tolist()
+            trades = np.where(valid, self.trades[slots], 0).tolist()
+        timestamps = np.datetime_as_string(starts.astype("datetime64[s]")).tolist()
+        return [
+            {"timestamp": t, "volume": v, "trades": n}
+            for t, v, n in zip(timestamps, volumes, trades)
+        ]
+
+# Global volume rollup instance
+volume_rollup = VolumeRollup()
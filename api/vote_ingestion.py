@@ -0,0 +1,118 @@
+"""
+Governance vote ingestion
+A single writer thread drains queued votes and commits them to the shared
+event log in batches, so one lock acquisition, write and fsync cover many
+votes while duplicates are still rejected exactly per (wallet, proposal)
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from governance_store import GovernanceStore, make_event
+
+VOTE_BATCH = 512            # Votes committed per log append
+VOTE_BATCH_WAIT = 0.005     # Seconds the writer waits to fill a batch
+VOTE_QUEUE_LIMIT = 50000    # Queued votes before submissions are refused
+
+Validator = Callable[[GovernanceStore, Dict], None]
+
+
+class VoteIngestor:
+    """Single-writer queue in front of GovernanceStore.transact"""
+
+    def __init__(self, store: GovernanceStore, validate: Validator, batch_size: int = VOTE_BATCH,
+                 max_wait: float = VOTE_BATCH_WAIT, limit: int = VOTE_QUEUE_LIMIT):
+        self.store = store
+        self.validate = validate
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Tuple[Dict, Future]]" = queue.Queue(maxsize=limit)
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.committed = 0
+        self.rejected = 0
+
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, daemon=True)
+                self._writer.start()
+
+    def submit(self, vote: Dict) -> Future:
+        """Queue a vote {proposal_id, wallet, vote, amount}; the future resolves once it is logged"""
+        return self.submit_many([vote])[0]
+
+    def submit_many(self, votes: List[Dict]) -> List[Future]:
+        self._ensure_writer()
+        futures = []
+        for vote in votes:
+            future: Future = Future()
+            try:
+                self._queue.put_nowait((vote, future))
+            except queue.Full:
+                future.set_exception(HTTPException(503, "Vote queue is full, retry shortly"))
+            futures.append(future)
+        return futures
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[Dict, Future]]):
+        errors: Dict[int, Exception] = {}
+
+        def build(store: GovernanceStore) -> List[Dict]:
+            events = []
+            seen = set()
+            for i, (vote, _) in enumerate(batch):
+                key = (vote["wallet"], vote["proposal_id"])
+                try:
+                    if key in seen:
+                        raise HTTPException(400, "Already voted on this proposal")
+                    self.validate(store, vote)
+                except HTTPException as e:
+                    errors[i] = e
+                    continue
+                seen.add(key)
+                events.append(make_event("vote_cast", vote))
+            return events
+
+        try:
+            self.store.transact(build)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.rejected += len(errors)
+        self.committed += len(batch) - len(errors)
+        for i, (vote, future) in enumerate(batch):
+            if i in errors:
+                future.set_exception(errors[i])
+            else:
+                future.set_result(vote)
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "committed": self.committed,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,232 @@
+"""
+Governance voting-power snapshots
+Captures every S-IO holder's balance when a proposal is created as a compact
+sorted (owner, balance) array, so vote weight is an O(log n) lookup. The
+holder set is read in chunks over a short, bounded slot range, not at one slot
+"""
+
+import base64
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from solana_rpc_cache import rpc_cache, TOKEN_2022_PROGRAM_ID, TOKEN_PROGRAM_ID
+
+SNAPSHOT_DIR = os.path.join(os.getenv("GOVERNANCE_DATA_DIR", "governance_data"), "voting_snapshots")
+TOKEN_ACCOUNT_SIZE = 165
+OWNER_OFFSET = 32          # Token account layout: mint[0:32], owner[32:64], amount[64:72]
+SLICE_LENGTH = 40          # Owner + amount
+OWNER_PREFIX_CHUNKS = 256  # Holder set is fetched in one chunk per owner first byte
+SIO_DECIMALS = 6
+CACHE_SIZE = 16            # Snapshots kept in memory per worker
+MAX_SLOT_SPREAD = 1500     # About ten minutes; a build drifting further is rejected
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+B58_INDEX = {c: i for i, c in enumerate(B58_ALPHABET)}
+
+
+def b58encode(data: bytes) -> str:
+    n = int.from_bytes(data, "big")
+    out = ""
+    while n:
+        n, rem = divmod(n, 58)
+        out = B58_ALPHABET[rem] + out
+    pad = len(data) - len(data.lstrip(b"\0"))
+    return "1" * pad + out
+
+
+def b58decode(text: str, length: int = 32) -> bytes:
+    n = 0
+    for c in text:
+        n = n * 58 + B58_INDEX[c]
+    pad = len(text) - len(text.lstrip("1"))
+    body = n.to_bytes((n.bit_length() + 7) // 8, "big") if n else b""
+    data = b"\0" * pad + body
+    if len(data) != length:
+        raise ValueError("Invalid address length")
+    return data
+
+
+def is_address(text: str) -> bool:
+    """Whether text is base58 decoding to a 32-byte public key"""
+    if not 32 <= len(text) <= 44 or any(c not in B58_INDEX for c in text):
+        return False
+    try:
+        b58decode(text)
+    except ValueError:
+        return False
+    return True
+
+
+class VotingSnapshot:
+    """Owners sorted as raw 32-byte keys with their aggregated raw balances"""
+
+    def __init__(self, owners: np.ndarray, balances: np.ndarray, slot: int, decimals: int = SIO_DECIMALS,
+                 end_slot: Optional[int] = None):
+        self.owners = owners
+        self.balances = balances
+        self.slot = slot            # First chunk's slot
+        self.end_slot = slot if end_slot is None else end_slot
+        self.decimals = decimals
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+    @property
+    def total(self) -> float:
+        return float(self.balances.sum()) / 10 ** self.decimals
+
+    def weight(self, wallet: str) -> float:
+        """Balance held by a wallet at the snapshot slot, in UI units"""
+        try:
+            key = np.array(b58decode(wallet), dtype="S32")
+        except (KeyError, ValueError):
+            return 0.0
+        i = int(np.searchsorted(self.owners, key))
+        if i < len(self.owners) and self.owners[i] == key:
+            return float(self.balances[i]) / 10 ** self.decimals
+        return 0.0
+
+    def save(self, path: str):
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, owners=self.owners, balances=self.balances, slot=np.int64(self.slot),
+                            end_slot=np.int64(self.end_slot), decimals=np.int64(self.decimals))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "VotingSnapshot":
+        with np.load(path) as data:
+            end_slot = int(data["end_slot"]) if "end_slot" in data.files else None
+            return cls(data["owners"], data["balances"], int(data["slot"]), int(data["decimals"]), end_slot)
+
+
+def mint_program(mint: str, rpc: Callable) -> str:
+    """Token program owning the mint; all of its token accounts live under the same program"""
+    value = rpc("getAccountInfo", [mint, {"encoding": "base64", "dataSlice": {"offset": 0, "length": 0}}])["result"]["value"]
+    if value is None:
+        raise ValueError(f"Mint not found: {mint}")
+    if value["owner"] not in (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID):
+        raise ValueError(f"Not a token mint: {mint}")
+    return value["owner"]
+
+
+def _fetch_chunk(mint: str, prefix: int, rpc: Callable, program: str = TOKEN_PROGRAM_ID,
+                 min_slot: Optional[int] = None) -> Dict:
+    filters = [
+        {"memcmp": {"offset": 0, "bytes": mint}},
+        {"memcmp": {"offset": OWNER_OFFSET, "bytes": b58encode(bytes([prefix]))}}
+    ]
+    if program == TOKEN_PROGRAM_ID:
+        filters.insert(0, {"dataSize": TOKEN_ACCOUNT_SIZE})
+    # Token-2022 accounts carrying extensions are longer than 165 bytes but share the base layout
+    config = {
+        "encoding": "base64",
+        "withContext": True,
+        "dataSlice": {"offset": OWNER_OFFSET, "length": SLICE_LENGTH},
+        "filters": filters
+    }
+    if min_slot is not None:
+        config["minContextSlot"] = min_slot
+    return rpc("getProgramAccounts", [program, config])
+
+
+def _aggregate_chunk(accounts: List[Dict]):
+    """Decode one chunk of sliced accounts into sorted unique owners and summed balances"""
+    if not accounts:
+        return np.zeros(0, dtype="S32"), np.zeros(0, dtype=np.uint64)
+    raw = b"".join(base64.b64decode(a["account"]["data"][0]) for a in accounts)
+    rows = np.frombuffer(raw, dtype=np.uint8).reshape(-1, SLICE_LENGTH)
+    owners = rows[:, :32].copy().view("S32").ravel()
+    amounts = rows[:, 32:40].copy().view("<u8").ravel()
+
+    nonzero = amounts > 0
+    owners, amounts = owners[nonzero], amounts[nonzero]
+    unique, inverse = np.unique(owners, return_inverse=True)
+    totals = np.zeros(len(unique), dtype=np.uint64)
+    np.add.at(totals, inverse, amounts)
+    return unique, totals
+
+
+def build_voting_snapshot(mint: str, rpc: Optional[Callable] = None) -> VotingSnapshot:
+    """Stream the holder set chunk by chunk and assemble the sorted snapshot
+
+    Chunks partition owners by first byte and are fetched in byte order, so
+    concatenating the per-chunk results keeps the owner array sorted. RPC
+    cannot read historical account state, so the snapshot is approximate:
+    every chunk is pinned at or after the first chunk's slot, and the build
+    fails if the chunks span more than MAX_SLOT_SPREAD slots. Tokens moved
+    between owners in different chunks during that span can count twice or
+    not at all.
+    """
+    rpc = rpc or (lambda method, params: rpc_cache.call(method, params, cache_ttl=0))
+    program = mint_program(mint, rpc)
+    owner_parts, balance_parts = [], []
+    first_slot = last_slot = None
+    for prefix in range(OWNER_PREFIX_CHUNKS):
+        result = _fetch_chunk(mint, prefix, rpc, program, first_slot)["result"]
+        slot = result["context"]["slot"]
+        if first_slot is None:
+            first_slot = last_slot = slot
+        elif slot < first_slot:
+            raise ValueError(f"Chunk {prefix} read at slot {slot}, before the snapshot slot {first_slot}")
+        last_slot = max(last_slot, slot)
+        if last_slot - first_slot > MAX_SLOT_SPREAD:
+            raise ValueError(f"Holder set read over more than {MAX_SLOT_SPREAD} slots")
+        owners, balances = _aggregate_chunk(result["value"])
+        owner_parts.append(owners)
+        balance_parts.append(balances)
+
+    return VotingSnapshot(np.concatenate(owner_parts), np.concatenate(balance_parts), first_slot,
+                          end_slot=last_slot)
+
+
+class VotingSnapshots:
+    """Builds snapshots in the background and serves them from disk with a small cache"""
+
+    def __init__(self, directory: str = SNAPSHOT_DIR, workers: int = 1):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._cache: Dict[str, VotingSnapshot] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, proposal_id: str) -> str:
+        return os.path.join(self.directory, f"{proposal_id}.npz")
+
+    def schedule(self, proposal_id: str, mint: str, on_ready: Callable[[str, Optional[VotingSnapshot]], None],
+                 rpc: Optional[Callable] = None):
+        """Build a proposal's snapshot in the background; on_ready gets None if the build failed"""
+        def job():
+            try:
+                snapshot = build_voting_snapshot(mint, rpc)
+                snapshot.save(self._path(proposal_id))
+            except Exception as e:
+                print(f"Voting snapshot for {proposal_id} failed: {e}")
+                on_ready(proposal_id, None)
+                return
+            with self._lock:
+                self._cache[proposal_id] = snapshot
+            on_ready(proposal_id, snapshot)
+        return self._executor.submit(job)
+
+    def get(self, proposal_id: str) -> Optional[VotingSnapshot]:
+        with self._lock:
+            snapshot = self._cache.get(proposal_id)
+        if snapshot is not None:
+            return snapshot
+        path = self._path(proposal_id)
+        if not os.path.exists(path):
+            return None
+        snapshot = VotingSnapshot.load(path)
+        with self._lock:
+            if len(self._cache) >= CACHE_SIZE:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[proposal_id] = snapshot
+        return snapshot
+
+
+# Global snapshot manager instance
+voting_snapshots = VotingSnapshots()
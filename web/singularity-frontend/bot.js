@@ -276,7 +276,7 @@ async function executeTrade(strategy, baseToken, quoteToken, amount) {
         const decimals = fromToken === SOL_MINT ? 9 : await getTokenDecimals(fromToken);
         const inputAmount = Math.floor(amount * Math.pow(10, decimals));
 
-        const quoteUrl = `https://quote-api.jup.ag/v6/quote?inputMint=${fromToken}&outputMint=${toToken}&amount=${inputAmount}&slippageBps=100`;
+        const quoteUrl = `/api/jupiter/quote?inputMint=${fromToken}&outputMint=${toToken}&amount=${inputAmount}&slippageBps=100`;
         const quoteResp = await fetch(quoteUrl);
         const quote = await quoteResp.json();
 
@@ -368,7 +368,7 @@ function fallbackStrategy(strategy, baseToken, quoteToken) {
 
 async function getPrice(baseToken, quoteToken) {
     try {
-        const url = `https://quote-api.jup.ag/v6/quote?inputMint=${quoteToken}&outputMint=${baseToken}&amount=1000000000&slippageBps=50`;
+        const url = `/api/jupiter/quote?inputMint=${quoteToken}&outputMint=${baseToken}&amount=1000000000&slippageBps=50&approximate=true`;
         const resp = await fetch(url);
         const quote = await resp.json();
         return quote.outAmount / 1e9;
@@ -524,7 +524,7 @@ async function executeSingleTrade(fromToken, toToken, amount) {
         const decimals = fromToken === SOL_MINT ? 9 : await getTokenDecimals(fromToken);
         const inputAmount = Math.floor(amount * Math.pow(10, decimals));
         
-        const quoteUrl = `https://quote-api.jup.ag/v6/quote?inputMint=${fromToken}&outputMint=${toToken}&amount=${inputAmount}&slippageBps=100`;
+        const quoteUrl = `/api/jupiter/quote?inputMint=${fromToken}&outputMint=${toToken}&amount=${inputAmount}&slippageBps=100`;
         const quoteResp = await fetch(quoteUrl);
         const quote = await quoteResp.json();
         
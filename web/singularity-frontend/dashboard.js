@@ -1,6 +1,6 @@
 let revenueData = {};
 let wallet = null;
-let updateInterval;
+let liveSource;
 
 document.addEventListener('DOMContentLoaded', () => {
     document.getElementById('wallet-btn').addEventListener('click', connectWallet);
@@ -206,14 +206,16 @@ function generateRandomSymbol() {
 }
 
 function startRealTimeUpdates() {
-    updateInterval = setInterval(async () => {
-        await fetchRevenueMetrics();
-        updateMetrics();
-        drawRevenueChart();
-        loadActivityFeed();
-    }, 10000);
+    liveSource = subscribeLive(['revenue'], {
+        revenue: (metrics) => {
+            revenueData = metrics;
+            updateMetrics();
+            drawRevenueChart();
+            loadActivityFeed();
+        }
+    });
 }
 
 window.addEventListener('beforeunload', () => {
-    if (updateInterval) clearInterval(updateInterval);
+    if (liveSource) liveSource.close();
 });
\ No newline at end of file
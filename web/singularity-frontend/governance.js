@@ -1,6 +1,7 @@
+// Offline fallback; ids match the API's sample proposals so live tallies apply
 let proposals = [
     {
-        id: 1,
+        id: "prop_1",
         title: "Reduce Trading Fees to 0.05%",
         description: "Lower trading fees to increase volume and competitiveness",
         yesVotes: 12500000,
@@ -10,7 +11,7 @@ let proposals = [
         status: "active"
     },
     {
-        id: 2,
+        id: "prop_2",
         title: "Add Ethereum Bridge Support",
         description: "Implement cross-chain bridge for ETH and ERC-20 tokens",
         yesVotes: 8900000,
@@ -18,23 +19,13 @@ let proposals = [
         totalVotes: 15000000,
         endTime: Date.now() + 86400000 * 5,
         status: "active"
-    },
-    {
-        id: 3,
-        title: "Increase Bot Revenue Share to 15%",
-        description: "Share more trading profits with S-IO token holders",
-        yesVotes: 14200000,
-        noVotes: 1800000,
-        totalVotes: 16000000,
-        endTime: Date.now() + 86400000 * 2,
-        status: "active"
     }
 ];
 
 document.addEventListener('DOMContentLoaded', () => {
     document.getElementById('wallet-btn').addEventListener('click', connectWallet);
     loadGovernanceData();
-    setInterval(updateProposals, 30000);
+    subscribeLive(['governance'], { governance: applyTallies });
 });
 
 async function connectWallet() {
@@ -57,6 +48,28 @@ async function connectWallet() {
 function loadGovernanceData() {
     loadUserData();
     displayProposals();
+    loadProposals();
+}
+
+async function loadProposals() {
+    try {
+        const response = await fetch('/api/governance/proposals?status=active');
+        if (!response.ok) return;
+        const data = await response.json();
+        proposals = data.proposals.map(proposal => ({
+            id: proposal.id,
+            title: proposal.title,
+            description: proposal.description,
+            yesVotes: proposal.yes_votes,
+            noVotes: proposal.no_votes,
+            totalVotes: proposal.total_votes,
+            endTime: Date.parse(proposal.end_time),
+            status: proposal.status
+        }));
+        displayProposals();
+    } catch (error) {
+        console.error('Failed to load proposals:', error);
+    }
 }
 
 async function loadUserData() {
@@ -128,8 +141,8 @@ function displayProposals() {
                 </div>
                 
                 <div style="display: flex; gap: 1rem;">
-                    <button onclick="vote(${proposal.id}, true)" style="flex: 1; padding: 0.8rem; background: #00ff88; color: #000; border: none; border-radius: 4px; cursor: pointer;">Vote Yes</button>
-                    <button onclick="vote(${proposal.id}, false)" style="flex: 1; padding: 0.8rem; background: #ff4444; color: #fff; border: none; border-radius: 4px; cursor: pointer;">Vote No</button>
+                    <button onclick="vote('${proposal.id}', true)" style="flex: 1; padding: 0.8rem; background: #00ff88; color: #000; border: none; border-radius: 4px; cursor: pointer;">Vote Yes</button>
+                    <button onclick="vote('${proposal.id}', false)" style="flex: 1; padding: 0.8rem; background: #ff4444; color: #fff; border: none; border-radius: 4px; cursor: pointer;">Vote No</button>
                 </div>
             </div>
         `;
@@ -216,19 +229,15 @@ function createProposal() {
     alert('Proposal created successfully! Voting period: 7 days');
 }
 
-function updateProposals() {
-    // Simulate ongoing voting
+function applyTallies(tallies) {
     proposals.forEach(proposal => {
-        if (proposal.status === 'active' && Math.random() > 0.7) {
-            const voteAmount = Math.random() * 1000;
-            if (Math.random() > 0.5) {
-                proposal.yesVotes += voteAmount;
-            } else {
-                proposal.noVotes += voteAmount;
-            }
-            proposal.totalVotes += voteAmount;
+        const tally = tallies[proposal.id];
+        if (tally) {
+            proposal.yesVotes = tally.yes_votes;
+            proposal.noVotes = tally.no_votes;
+            proposal.totalVotes = tally.total_votes;
         }
     });
     
     displayProposals();
-}
\ No newline at end of file
+}
@@ -0,0 +1,57 @@
+// Live updates pushed by the API hub over server-sent events.
+// The browser reconnects on its own and the hub replays each topic's latest
+// state, so a dropped or resynced stream needs no polling. Deployments without
+// the hub (the stream is refused outright) poll each topic's REST endpoint.
+const LIVE_POLL = {
+    network: { url: '/api/network/stats', interval: 10000 },
+    neural: { url: '/api/neural/network', interval: 10000 },
+    revenue: { url: '/api/revenue/metrics', interval: 10000 },
+    governance: { url: '/api/governance/tallies', interval: 5000 }
+};
+
+function pollLive(topics, handlers) {
+    const timers = topics.filter(topic => LIVE_POLL[topic] && handlers[topic]).map(topic => {
+        const poll = async () => {
+            try {
+                const response = await fetch(LIVE_POLL[topic].url);
+                if (response.ok) handlers[topic](await response.json());
+            } catch (error) {
+                console.error(`Live poll failed for ${topic}:`, error);
+            }
+        };
+        poll();
+        return setInterval(poll, LIVE_POLL[topic].interval);
+    });
+    return () => timers.forEach(clearInterval);
+}
+
+function subscribeLive(topics, handlers) {
+    const source = new EventSource(`/api/live/stream?topics=${encodeURIComponent(topics.join(','))}`);
+    let stopPolling = null;
+
+    source.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.topic === '_resync') {
+            if (handlers.resync) handlers.resync(message.data.topics);
+            return;
+        }
+        const handler = handlers[message.topic];
+        if (handler) handler(message.data);
+    };
+
+    // EventSource only gives up (CLOSED) on a non-stream response such as a 404
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED && !stopPolling) {
+            stopPolling = pollLive(topics, handlers);
+        }
+    };
+
+    return {
+        close() {
+            source.close();
+            if (stopPolling) stopPolling();
+        }
+    };
+}
+
+window.subscribeLive = subscribeLive;
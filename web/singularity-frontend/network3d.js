@@ -176,12 +176,9 @@ function onWindowResize() {
 }
 
 // Update network
-async function updateNetwork3D() {
-    try {
-        await fetch('/api/neural/update', { method: 'POST' });
-        await loadNetwork3D();
-    } catch (error) {
-        console.error('Error updating network:', error);
+function updateNetwork3D(data) {
+    if (data.nodes && data.connections) {
+        createNetwork3D(data);
     }
 }
 
@@ -190,8 +187,8 @@ document.addEventListener('DOMContentLoaded', () => {
     initMatrix();
     init3D();
     
-    // Auto-update every 10 seconds
-    setInterval(updateNetwork3D, 10000);
+    // The server advances the network and pushes each new state
+    window.subscribeLive(['neural'], { neural: updateNetwork3D });
 });
 
 // Cleanup on page unload
@@ -23,6 +23,29 @@ async function connectWallet() {
     if (window.setWalletConnected) window.setWalletConnected(true);
     
     await loadRealPortfolio();
+    await loadPerformanceHistory();
+}
+
+async function loadPerformanceHistory() {
+    if (!window.globalWallet) return;
+    const wallet = window.globalWallet.toString();
+    
+    try {
+        // Enrol the wallet in the hourly snapshots; history fills in from the next one
+        await fetch('/api/portfolio/track', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ wallet_address: wallet })
+        });
+        
+        const response = await fetch(`/api/portfolio/performance/${wallet}?days=30&points=200`);
+        const data = await response.json();
+        if (data.performance && data.performance.length > 1) {
+            drawPerformanceChart(data.performance.map(point => point.value));
+        }
+    } catch (error) {
+        console.error('Failed to load performance history:', error);
+    }
 }
 
 async function loadRealPortfolio() {
@@ -138,14 +161,18 @@ function displayTransactions() {
     document.getElementById('transactions-list').innerHTML = html;
 }
 
-function drawPerformanceChart() {
+function drawPerformanceChart(data) {
     const canvas = document.getElementById('performance-chart');
     const ctx = canvas.getContext('2d');
     
-    const data = [];
-    for (let i = 0; i < 30; i++) {
-        data.push(5000 + Math.sin(i * 0.2) * 500 + Math.random() * 200);
+    if (!data) {
+        data = [];
+        for (let i = 0; i < 30; i++) {
+            data.push(5000 + Math.sin(i * 0.2) * 500 + Math.random() * 200);
+        }
     }
+    const min = Math.min(...data);
+    const range = Math.max(...data) - min || 1;
     
     ctx.clearRect(0, 0, canvas.width, canvas.height);
     ctx.strokeStyle = '#0066ff';
@@ -154,7 +181,7 @@ function drawPerformanceChart() {
     
     data.forEach((value, i) => {
         const x = (i / (data.length - 1)) * canvas.width;
-        const y = canvas.height - ((value - 4000) / 2000) * canvas.height;
+        const y = canvas.height - ((value - min) / range) * canvas.height;
         
         if (i === 0) ctx.moveTo(x, y);
         else ctx.lineTo(x, y);
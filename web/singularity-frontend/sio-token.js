@@ -62,7 +62,7 @@ async function getSIOPrice() {
         }
         
         // Fallback to Jupiter API
-        const jupResponse = await fetch(`https://quote-api.jup.ag/v6/quote?inputMint=${SIO_TOKEN_MINT}&outputMint=So11111111111111111111111111111111111111112&amount=1000000&slippageBps=50`);
+        const jupResponse = await fetch(`/api/jupiter/quote?inputMint=${SIO_TOKEN_MINT}&outputMint=So11111111111111111111111111111111111111112&amount=1000000&slippageBps=50`);
         const quote = await jupResponse.json();
         
         if (quote.outAmount) {
@@ -25,7 +25,7 @@ const communityPosts = [
 document.addEventListener('DOMContentLoaded', () => {
     document.getElementById('wallet-btn').addEventListener('click', connectWallet);
     loadSocialData();
-    setInterval(updateSignals, 30000);
+    subscribeLive(['signals'], { signals: addSignal });
 });
 
 async function connectWallet() {
@@ -49,13 +49,25 @@ function loadSocialData() {
 
 function loadUserData() {
     if (wallet) {
-        // Simulate user following data
-        copyPnL = 450 + Math.random() * 200;
-        document.getElementById('copy-pnl').textContent = `+$${copyPnL.toFixed(2)}`;
+        refreshCopyPnL();
+        loadPendingCopies();
     }
     displayFollowing();
 }
 
+async function refreshCopyPnL() {
+    // Realised plus unrealised PnL over the wallet's confirmed copy trades
+    try {
+        const response = await fetch(`/api/leaderboard/positions/${encodeURIComponent(wallet.toString())}`);
+        copyPnL = response.ok ? (await response.json()).total_pnl : 0;
+    } catch (error) {
+        return;
+    }
+    const element = document.getElementById('copy-pnl');
+    element.textContent = `${copyPnL >= 0 ? '+' : '-'}$${Math.abs(copyPnL).toFixed(2)}`;
+    element.style.color = copyPnL >= 0 ? '#00ff88' : '#ff4444';
+}
+
 function displayTopTraders() {
     const html = topTraders.map((trader, index) => `
         <div class="leaderboard-item">
@@ -171,6 +183,7 @@ async function followTrader(traderName) {
             alert(result.message);
             displayTopTraders();
             displayFollowing();
+            await enableCopyTrading(traderName);
         } else {
             alert(result.message);
         }
@@ -179,7 +192,38 @@ async function followTrader(traderName) {
     }
 }
 
-function unfollowTrader(traderName) {
+async function enableCopyTrading(traderName) {
+    const amount = prompt(`Copy ${traderName}'s signals automatically? Enter USDC per trade, or cancel:`, '10');
+    if (!amount || !(parseFloat(amount) > 0)) return;
+
+    const response = await fetch('/api/social/copy-settings', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            trader_name: traderName,
+            wallet: wallet.toString(),
+            amount_usd: parseFloat(amount)
+        })
+    });
+    const result = await response.json();
+    alert(result.message || result.detail);
+}
+
+async function unfollowTrader(traderName) {
+    try {
+        // Unfollowing on the server also stops copying the trader's signals
+        await fetch('/api/social/unfollow', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                trader_name: traderName,
+                wallet: wallet.toString()
+            })
+        });
+    } catch (error) {
+        alert('Failed to unfollow trader: ' + error.message);
+        return;
+    }
     following = following.filter(name => name !== traderName);
     displayTopTraders();
     displayFollowing();
@@ -208,17 +252,19 @@ async function copyTrade(action, token, price) {
             });
             
             const result = await response.json();
+            let job = result.success ? await waitForCopyTrade(result.job_id, BUILDING_STATUSES) : null;
+            if (job && job.status === 'awaiting_signature') {
+                job = await signCopyTrade(job);
+            }
             
-            if (result.success) {
-                alert(`Copy trade executed: ${action} ${amount} ${token} at ${price}\nTx: ${result.transaction_id}`);
+            if (job && job.status === 'filled') {
+                alert(`Copy trade executed: ${action} ${amount} ${token}\nTx: ${job.signature}`);
                 
-                // Update P&L
-                const pnlChange = (Math.random() - 0.3) * 50;
-                copyPnL += pnlChange;
-                document.getElementById('copy-pnl').textContent = `${copyPnL >= 0 ? '+' : ''}$${copyPnL.toFixed(2)}`;
-                document.getElementById('copy-pnl').style.color = copyPnL >= 0 ? '#00ff88' : '#ff4444';
+                refreshCopyPnL();
+            } else if (job && !job.done) {
+                alert(`Copy trade still processing (job ${job.key})`);
             } else {
-                alert('Trade failed: ' + result.message);
+                alert('Trade failed: ' + (job ? job.error : result.message || result.detail));
             }
         } catch (error) {
             alert('Copy trade failed: ' + error.message);
@@ -226,6 +272,78 @@ async function copyTrade(action, token, price) {
     }
 }
 
+const BUILDING_STATUSES = ['queued', 'executing'];
+const CONFIRMING_STATUSES = ['submitted'];
+
+async function waitForCopyTrade(jobId, pendingStatuses, attempts = 30) {
+    let job = null;
+    for (let i = 0; i < attempts; i++) {
+        const response = await fetch(`/api/social/copy-trade/${encodeURIComponent(jobId)}`);
+        job = await response.json();
+        if (!pendingStatuses.includes(job.status)) break;
+        await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+    return job;
+}
+
+async function signCopyTrade(job) {
+    // The server only builds the swap; the wallet signs and sends it, then the server confirms it on chain
+    if (job.tx_expired) {
+        await fetch(`/api/social/copy-trade/${encodeURIComponent(job.key)}/rebuild`, { method: 'POST' });
+        job = await waitForCopyTrade(job.key, BUILDING_STATUSES);
+        if (job.status !== 'awaiting_signature') return job;
+    }
+    
+    const txBytes = Uint8Array.from(atob(job.tx), c => c.charCodeAt(0));
+    const tx = solanaWeb3.VersionedTransaction.deserialize(txBytes);
+    const { signature } = await window.solana.signAndSendTransaction(tx);
+    
+    const response = await fetch(`/api/social/copy-trade/${encodeURIComponent(job.key)}/signature`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ signature })
+    });
+    if (!response.ok) {
+        const error = await response.json();
+        return { ...job, done: true, status: 'failed', error: error.detail };
+    }
+    return waitForCopyTrade(job.key, CONFIRMING_STATUSES);
+}
+
+async function loadPendingCopies() {
+    const container = document.getElementById('pending-copies');
+    if (!wallet || !container) return;
+    
+    try {
+        const response = await fetch(`/api/social/copy-trade/pending/${wallet.toString()}`);
+        const { jobs } = await response.json();
+        container.innerHTML = jobs.length ? `
+            <div style="color: #ccc; margin: 1rem 0 0.5rem;">Copy trades to sign</div>
+            ${jobs.map(job => `
+                <div style="display: flex; justify-content: space-between; align-items: center; padding: 0.5rem 0; border-bottom: 1px solid #333;">
+                    <span style="color: #fff;">${job.trader || 'Manual'} #${job.signal_id ?? ''}</span>
+                    <button onclick="signPendingCopy('${job.key}')" class="follow-btn">Sign</button>
+                </div>
+            `).join('')}
+        ` : '';
+    } catch (error) {
+        console.error('Failed to load pending copy trades:', error);
+    }
+}
+
+async function signPendingCopy(jobId) {
+    try {
+        const response = await fetch(`/api/social/copy-trade/${encodeURIComponent(jobId)}`);
+        const job = await signCopyTrade(await response.json());
+        alert(job.status === 'filled' ? `Copy trade executed\nTx: ${job.signature}` :
+              job.done ? 'Trade failed: ' + job.error : `Copy trade still processing (job ${job.key})`);
+    } catch (error) {
+        alert('Copy trade failed: ' + error.message);
+    }
+    loadPendingCopies();
+    refreshCopyPnL();
+}
+
 function sharePost() {
     if (!wallet) {
         alert('Please connect your wallet to share posts');
@@ -260,18 +378,8 @@ function likePost(user) {
     }
 }
 
-function updateSignals() {
-    // Simulate new trading signals
-    const newSignal = {
-        trader: topTraders[Math.floor(Math.random() * topTraders.length)].name,
-        action: Math.random() > 0.5 ? 'BUY' : 'SELL',
-        token: ['SOL', 'BONK', 'JUP', 'USDC'][Math.floor(Math.random() * 4)],
-        price: '$' + (Math.random() * 200).toFixed(2),
-        confidence: Math.floor(Math.random() * 20) + 80,
-        time: 'now'
-    };
-    
-    tradingSignals.unshift(newSignal);
+function addSignal(signal) {
+    tradingSignals.unshift({ ...signal, time: 'now' });
     if (tradingSignals.length > 5) tradingSignals.pop();
     
     displayTradingSignals();